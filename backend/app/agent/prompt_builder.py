@@ -6,6 +6,10 @@ prompt for the LLM.
 
 from app.domain import intents
 
+# Bump whenever the prompt text below changes; cached responses (see
+# services/response_cache) made with an older prompt are then ignored.
+PROMPT_VERSION = 1
+
 TUTOR_SYSTEM_PROMPT = """You are an enthusiastic, patient Science Olympiad tutor helping a high school student prepare for competition.
 
 Your style:
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
 
 from app.api.schemas.chat import ChatRequest, ChatResponse
 from app.api.deps import search_engine
 from app.core.auth import require_auth
-from app.services.chat_service import handle_chat, handle_chat_stream
+from app.services.chat_service import handle_chat, handle_chat_stream, resume_stream
 
 router = APIRouter()
 
@@ -24,17 +24,30 @@ async def chat_endpoint(request: ChatRequest, auth: dict = Depends(require_auth)
 
 
 @router.post("/chat/stream")
-async def chat_stream_endpoint(request: ChatRequest, auth: dict = Depends(require_auth)):
-    """Streaming chat endpoint — returns SSE events as tokens arrive."""
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    raw_request: Request,
+    auth: dict = Depends(require_auth),
+):
+    """
+    Streaming chat endpoint — returns SSE events as tokens arrive.
+
+    Stops generating (and stops the Gemini call) when the client disconnects.
+    Rate-limit and quota refusals happen before the first event, so they are
+    answered as plain 429 responses rather than as a stream.
+    """
     student_id = auth.get("email") or "default"
+    events = handle_chat_stream(
+        message=request.message,
+        student_id=student_id,
+        student_name=request.student_name,
+        conversation_history=request.conversation_history,
+        search_engine=search_engine,
+        is_disconnected=raw_request.is_disconnected,
+    )
+    first = await anext(events, None)
     return StreamingResponse(
-        handle_chat_stream(
-            message=request.message,
-            student_id=student_id,
-            student_name=request.student_name,
-            conversation_history=request.conversation_history,
-            search_engine=search_engine,
-        ),
+        resume_stream(first, events),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
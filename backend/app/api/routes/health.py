@@ -1,14 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.settings import GEMINI_API_KEY, GEMINI_MODEL
 from app.api.deps import search_engine
+from app.core.auth import require_auth
+from app.core.executors import executor_stats
+from app.core.telemetry import get_metrics
+from app.llm import quota
+from app.llm.gemini_client import breaker_stats
+from app.services import chat_history, response_cache
 
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
-    """System status check."""
+    """System status check; unauthenticated and cheap, for health probes."""
     gemini_configured = bool(GEMINI_API_KEY and GEMINI_API_KEY != "your_api_key_here")
     return {
         "status": "healthy" if gemini_configured else "ok",
@@ -16,4 +22,18 @@ async def health_check():
         "gemini_model": GEMINI_MODEL,
         "materials_loaded": len(search_engine.chunks) > 0,
         "stats": search_engine.get_stats(),
+        "index_version": search_engine.version,
+    }
+
+
+@router.get("/health/details")
+async def health_details(auth: dict = Depends(require_auth)):
+    """Runtime internals: pools, counters, LLM cache, quota, circuit and history queue."""
+    return {
+        "executors": executor_stats(),
+        "metrics": get_metrics(),
+        "llm_cache": await response_cache.stats(),
+        "llm_quota": quota.scheduler.stats(),
+        "llm_circuit": breaker_stats(),
+        "chat_history": chat_history.stats(),
     }
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.api.schemas.quiz import (
-    QuizSubmission, QuizResult, QuizGenerateRequest, QuizGenerateResponse,
+    QuizSubmission, QuizResult, QuizBatchSubmission, QuizBatchResult,
+    QuizGenerateRequest, QuizGenerateResponse, QuizBatchResponse,
 )
 from app.api.deps import search_engine
 from app.core.auth import require_auth
-from app.services.quiz_service import submit_answer, generate_quiz
+from app.services.quiz_service import (
+    MAX_QUIZ_BATCH, submit_answer, submit_answers, generate_quiz, generate_quizzes,
+)
 
 router = APIRouter()
 
@@ -14,7 +17,7 @@ router = APIRouter()
 async def submit_quiz(submission: QuizSubmission, auth: dict = Depends(require_auth)):
     """Record a quiz answer for progress tracking."""
     student_id = auth.get("email") or "default"
-    result = submit_answer(
+    result = await submit_answer(
         student_id=student_id,
         student_name=submission.student_name,
         topic=submission.topic,
@@ -25,12 +28,46 @@ async def submit_quiz(submission: QuizSubmission, auth: dict = Depends(require_a
     return QuizResult(**result)
 
 
-@router.post("/quiz/generate", response_model=QuizGenerateResponse)
-async def generate_quiz_endpoint(request: QuizGenerateRequest, auth: dict = Depends(require_auth)):
-    """Generate a quiz question for a specific topic."""
-    _ = auth.get("email") or "default"
-    result = await generate_quiz(
+@router.post("/quiz/submit-batch", response_model=QuizBatchResult)
+async def submit_quiz_batch(batch: QuizBatchSubmission, auth: dict = Depends(require_auth)):
+    """Record up to 500 quiz answers at once (offline sync, practice tests), in order."""
+    student_id = auth.get("email") or "default"
+    results = await submit_answers(
+        student_id=student_id,
+        student_name=batch.student_name,
+        answers=[answer.model_dump() for answer in batch.answers],
+    )
+    return QuizBatchResult(
+        results=[QuizResult(**r) for r in results],
+        correct=sum(r["is_correct"] for r in results),
+    )
+
+
+@router.post("/quiz/generate", response_model=QuizGenerateResponse | QuizBatchResponse)
+async def generate_quiz_endpoint(
+    request: QuizGenerateRequest,
+    count: int = Query(1, ge=1, le=MAX_QUIZ_BATCH),
+    auth: dict = Depends(require_auth),
+):
+    """
+    Get quiz questions for a topic — from the quiz bank when they are ready.
+
+    With count=1 (the default) returns a single question; with count=N
+    returns {"questions": [...]} with up to N questions, generated in one
+    LLM call when the bank runs short.
+    """
+    student_id = auth.get("email") or "default"
+    if count == 1:
+        result = await generate_quiz(
+            topic=request.topic,
+            search_engine=search_engine,
+            student_id=student_id,
+        )
+        return QuizGenerateResponse(**result)
+    questions = await generate_quizzes(
         topic=request.topic,
         search_engine=search_engine,
+        student_id=student_id,
+        count=count,
     )
-    return QuizGenerateResponse(**result)
+    return QuizBatchResponse(questions=[QuizGenerateResponse(**q) for q in questions])
@@ -9,4 +9,4 @@ router = APIRouter()
 @router.get("/search")
 async def search_endpoint(query: str, top_k: int = 5):
     """Search materials directly."""
-    return search_materials(query, top_k, search_engine)
+    return await search_materials(query, top_k, search_engine)
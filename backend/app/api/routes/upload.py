@@ -1,15 +1,34 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 
 from app.api.deps import search_engine
-from app.services.upload_service import handle_upload
+from app.api.schemas.upload import UploadJobResponse
+from app.services.upload_service import get_upload_job, handle_upload, upload_job_events
 from app.settings import DISABLE_UPLOADS
 
 router = APIRouter()
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=202, response_model=UploadJobResponse)
 async def upload_materials(files: list[UploadFile] = File(...)):
-    """Upload and process study material files."""
+    """Upload study material files and queue them for processing."""
     if DISABLE_UPLOADS:
         raise HTTPException(status_code=403, detail="Uploads are disabled in this environment")
     return await handle_upload(files=files, search_engine=search_engine)
+
+
+@router.get("/upload/jobs/{job_id}", response_model=UploadJobResponse)
+async def upload_job_status(job_id: str):
+    """Progress of an upload's ingestion job."""
+    return get_upload_job(job_id)
+
+
+@router.get("/upload/jobs/{job_id}/events")
+async def upload_job_stream(job_id: str):
+    """SSE stream of an ingestion job's progress until it finishes."""
+    get_upload_job(job_id)  # 404 before the stream starts
+    return StreamingResponse(
+        upload_job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,19 @@
 from pydantic import BaseModel, Field
 
 
-class QuizSubmission(BaseModel):
+class QuizAnswer(BaseModel):
     question: str
     student_answer: str
     correct_answer: str
     topic: str
+
+
+class QuizSubmission(QuizAnswer):
+    student_name: str = "default"
+
+
+class QuizBatchSubmission(BaseModel):
+    answers: list[QuizAnswer] = Field(..., min_length=1, max_length=500)
     student_name: str = "default"
 
 
@@ -14,6 +22,11 @@ class QuizResult(BaseModel):
     correct_answer: str
 
 
+class QuizBatchResult(BaseModel):
+    results: list[QuizResult]
+    correct: int
+
+
 class QuizGenerateRequest(BaseModel):
     topic: str = Field(..., min_length=1, max_length=200)
     student_name: str = Field("default", max_length=50)
@@ -25,3 +38,7 @@ class QuizGenerateResponse(BaseModel):
     correct_letter: str
     explanation: str
     topic: str
+
+
+class QuizBatchResponse(BaseModel):
+    questions: list[QuizGenerateResponse]
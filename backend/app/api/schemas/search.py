@@ -4,3 +4,4 @@ from pydantic import BaseModel
 class SearchResponse(BaseModel):
     query: str
     results: list[dict]
+    docs_scored: int = 0
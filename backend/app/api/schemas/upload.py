@@ -5,9 +5,18 @@ class FileResult(BaseModel):
     filename: str
     status: str
     chunks: int
+    pages_done: int = 0
+    pages_total: int = 0
+    error: str | None = None
 
 
-class UploadResponse(BaseModel):
-    files_processed: list[FileResult]
-    total_chunks: int
-    stats: dict
+class UploadJobResponse(BaseModel):
+    job_id: str
+    status: str
+    files: list[FileResult]
+    created_at: float
+    finished_at: float | None = None
+    total_chunks: int = 0
+    stats: dict | None = None
+    error: str | None = None
+    version: int = 0
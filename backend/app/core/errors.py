@@ -16,8 +16,67 @@ class UnsupportedFileError(AppError):
 
 
 class LLMError(AppError):
-    def __init__(self, message: str):
-        super().__init__(message, status_code=502)
+    """A Gemini call failed. `retryable` failures may succeed if tried again."""
+
+    retryable = False
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message, status_code=status_code)
+
+
+class LLMTimeoutError(LLMError):
+    retryable = True
+
+    def __init__(self):
+        super().__init__("Gemini took too long to respond. Please try again.", status_code=504)
+
+
+class LLMRateLimitedError(LLMError):
+    """Gemini itself refused the call for quota (HTTP 429)."""
+
+    retryable = True
+
+    def __init__(self):
+        super().__init__(
+            "Hit the daily API limit (1,000 req/day). Try again tomorrow, or upgrade to the paid tier.",
+            status_code=429,
+        )
+
+
+class LLMUnavailableError(LLMError):
+    """Gemini is unreachable or answering with server errors."""
+
+    retryable = True
+
+    def __init__(self, detail: str = ""):
+        message = "Gemini is unavailable right now. Please try again in a minute."
+        super().__init__(f"{message} ({detail})" if detail else message, status_code=503)
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Calls are failing fast while Gemini recovers."""
+
+    retryable = False
+
+    def __init__(self, retry_after: float):
+        super().__init__("circuit open")
+        self.retry_after = retry_after
+
+
+class LLMAuthError(LLMError):
+    def __init__(self):
+        super().__init__(
+            "Invalid API key. Check your GEMINI_API_KEY in .env. "
+            "Get a free key at https://aistudio.google.com/apikey"
+        )
+
+
+class QuotaExceededError(LLMError):
+    """The shared Gemini quota cannot serve a call in time."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Too many requests to the tutor right now. Please try again shortly.", status_code=429)
+        self.retry_after = retry_after
 
 
 class NoMaterialsError(AppError):
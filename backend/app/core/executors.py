@@ -0,0 +1,264 @@
+"""
+Executor layer — keeps blocking and CPU-bound work off the asyncio event loop.
+
+Three pools, created on first use:
+
+    search  threads    short BM25 queries                     SEARCH_THREADS
+    db      threads    SQLite repository calls                DB_THREADS
+    cpu     processes  document extraction and index builds  CPU_WORKERS
+
+CPU_WORKERS=0 runs CPU work inline in the calling thread (small instances,
+tests). Each pool tracks submitted / in-flight / completed counts;
+executor_stats() reports them with the queue depth (in-flight tasks beyond
+the pool's worker count).
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from app.settings import CPU_WORKERS, DB_THREADS, SEARCH_THREADS
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_search_pool: ThreadPoolExecutor | None = None
+_db_pool: ThreadPoolExecutor | None = None
+_cpu_pool: ProcessPoolExecutor | None = None
+_stats = {
+    name: {"submitted": 0, "in_flight": 0, "completed": 0, "failed": 0}
+    for name in ("search", "db", "cpu")
+}
+
+# Progress from CPU workers travels back over a queue, tagged with a token
+# that maps to the reporter registered by the submitting thread.
+_progress_queue = None
+_reporters: dict[int, Any] = {}
+_tokens = itertools.count(1)
+_in_cpu_worker = False
+_DRAIN_TIMEOUT = 1.0
+
+
+def in_cpu_worker() -> bool:
+    """True inside a CPU pool process."""
+    return _in_cpu_worker
+
+
+def submit_search(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """Run fn on the search thread pool."""
+    global _search_pool
+    with _lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="search")
+        pool = _search_pool
+    return _track("search", pool.submit(fn, *args, **kwargs))
+
+
+async def run_search(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) on the search thread pool."""
+    return await asyncio.wrap_future(submit_search(fn, *args, **kwargs))
+
+
+def submit_db(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """Run fn on the database thread pool."""
+    global _db_pool
+    with _lock:
+        if _db_pool is None:
+            _db_pool = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+        pool = _db_pool
+    return _track("db", pool.submit(fn, *args, **kwargs))
+
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Await a storage call, e.g. run_db(get_progress, student_id), on the
+    database thread pool. Disk I/O and SQLite lock waits then never block
+    the event loop, and a separate pool keeps slow writes from delaying
+    searches.
+    """
+    return await asyncio.wrap_future(submit_db(fn, *args, **kwargs))
+
+
+def run_cpu_sync(fn: Callable[..., Any], *args, reporter=None, **kwargs) -> Any:
+    """
+    Run fn in the CPU process pool and block until it returns.
+
+    fn and its arguments must be picklable. If `reporter` is given,
+    extraction progress reported inside the worker (see
+    retrieval.processor.progress) is forwarded to it in this process.
+    """
+    if CPU_WORKERS <= 0:
+        return _call_inline(fn, args, kwargs, reporter)
+
+    pool = _get_cpu_pool()
+    token = 0
+    drained = threading.Event()
+    if reporter is not None:
+        token = next(_tokens)
+        _reporters[token] = (reporter, drained)
+    try:
+        result, errors = _track("cpu", pool.submit(_call_in_worker, token, fn, args, kwargs)).result()
+        if token:
+            # Let page updates queued before the result reach the reporter
+            drained.wait(_DRAIN_TIMEOUT)
+    except BrokenProcessPool:
+        # A worker died (crash, OOM kill); start a fresh pool next time
+        _discard_cpu_pool(pool)
+        raise
+    finally:
+        _reporters.pop(token, None)
+    # Errors come back with the result rather than over the progress queue,
+    # so none is lost to the race with the return.
+    for message in errors:
+        reporter.on_error(message)
+    return result
+
+
+async def run_cpu(fn: Callable[..., Any], *args, reporter=None, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) in the CPU process pool without blocking the loop."""
+    return await asyncio.to_thread(run_cpu_sync, fn, *args, reporter=reporter, **kwargs)
+
+
+def executor_stats() -> dict:
+    """Per-pool counters plus worker count and queue depth."""
+    workers = {"search": SEARCH_THREADS, "db": DB_THREADS, "cpu": CPU_WORKERS}
+    with _lock:
+        snapshot = {name: dict(counts) for name, counts in _stats.items()}
+    for name, counts in snapshot.items():
+        counts["workers"] = workers[name]
+        counts["queue_depth"] = max(0, counts["in_flight"] - workers[name])
+    return snapshot
+
+
+def shutdown_executors() -> None:
+    """Stop the pools; called on application shutdown."""
+    global _search_pool, _db_pool, _cpu_pool, _progress_queue
+    with _lock:
+        search_pool, db_pool, cpu_pool, queue = _search_pool, _db_pool, _cpu_pool, _progress_queue
+        _search_pool = _db_pool = _cpu_pool = _progress_queue = None
+    if search_pool is not None:
+        search_pool.shutdown(wait=False, cancel_futures=True)
+    if db_pool is not None:
+        # Let queued writes finish before the connections are closed
+        db_pool.shutdown(wait=True)
+    if cpu_pool is not None:
+        cpu_pool.shutdown(wait=False, cancel_futures=True)
+    if queue is not None:
+        queue.put(None)
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool, _progress_queue
+    with _lock:
+        if _cpu_pool is None:
+            # spawn: forking a process that already runs server threads is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            _progress_queue = ctx.Queue()
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=CPU_WORKERS,
+                mp_context=ctx,
+                initializer=_init_cpu_worker,
+                initargs=(_progress_queue,),
+            )
+            threading.Thread(
+                target=_forward_progress, args=(_progress_queue,), name="cpu-progress", daemon=True,
+            ).start()
+        return _cpu_pool
+
+
+def _discard_cpu_pool(pool: ProcessPoolExecutor) -> None:
+    global _cpu_pool, _progress_queue
+    with _lock:
+        if _cpu_pool is not pool:
+            return
+        queue = _progress_queue
+        _cpu_pool = _progress_queue = None
+    log.warning("CPU worker pool broke; it will be restarted")
+    pool.shutdown(wait=False, cancel_futures=True)
+    # The next pool gets its own queue and forwarder; stop this one's
+    if queue is not None:
+        queue.put(None)
+
+
+def _track(name: str, future: Future) -> Future:
+    counts = _stats[name]
+    with _lock:
+        counts["submitted"] += 1
+        counts["in_flight"] += 1
+
+    def done(f: Future) -> None:
+        with _lock:
+            counts["in_flight"] -= 1
+            if f.cancelled() or f.exception() is not None:
+                counts["failed"] += 1
+            else:
+                counts["completed"] += 1
+
+    future.add_done_callback(done)
+    return future
+
+
+def _call_inline(fn, args, kwargs, reporter):
+    if reporter is None:
+        return fn(*args, **kwargs)
+    from app.retrieval.processor.progress import report_to
+
+    with report_to(reporter):
+        return fn(*args, **kwargs)
+
+
+def _forward_progress(queue) -> None:
+    while True:
+        message = queue.get()
+        if message is None:
+            return
+        token, done, total = message
+        registered = _reporters.get(token)
+        if registered is None:
+            continue
+        reporter, drained = registered
+        if done is None:  # end of task
+            drained.set()
+            continue
+        try:
+            reporter.on_pages(done, total)
+        except Exception:
+            log.exception("Progress reporter failed")
+
+
+# ── Runs inside CPU pool processes ─────────────────────────────
+
+
+def _init_cpu_worker(queue) -> None:
+    global _progress_queue, _in_cpu_worker
+    _progress_queue = queue
+    _in_cpu_worker = True
+
+
+class _WorkerReporter:
+    """Streams page progress to the parent; keeps errors to return with the result."""
+
+    def __init__(self, token: int) -> None:
+        self.token = token
+        self.errors: list[str] = []
+
+    def on_pages(self, done: int, total: int) -> None:
+        _progress_queue.put((self.token, done, total))
+
+    def on_error(self, message: str) -> None:
+        self.errors.append(message)
+
+
+def _call_in_worker(token: int, fn, args, kwargs) -> tuple[Any, list[str]]:
+    if not token:
+        return fn(*args, **kwargs), []
+    reporter = _WorkerReporter(token)
+    try:
+        return _call_inline(fn, args, kwargs, reporter), reporter.errors
+    finally:
+        _progress_queue.put((token, None, None))
@@ -1,5 +1,7 @@
 """CORS and error-handling middleware."""
 
+import math
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -22,7 +24,14 @@ def register_middleware(app: FastAPI) -> None:
 
     @app.exception_handler(AppError)
     async def app_error_handler(_request: Request, exc: AppError) -> JSONResponse:
+        headers = None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            # A daily budget that cannot cover the call is retried tomorrow
+            seconds = 86400 if math.isinf(retry_after) else max(1, math.ceil(retry_after))
+            headers = {"Retry-After": str(seconds)}
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.message},
+            headers=headers,
         )
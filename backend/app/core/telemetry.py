@@ -11,9 +11,9 @@ _counters: dict[str, int] = {}
 _timings: dict[str, list[float]] = {}
 
 
-def count(metric: str) -> None:
+def count(metric: str, amount: int = 1) -> None:
     """Increment a counter."""
-    _counters[metric] = _counters.get(metric, 0) + 1
+    _counters[metric] = _counters.get(metric, 0) + amount
 
 
 def timed(label: str):
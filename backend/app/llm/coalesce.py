@@ -0,0 +1,128 @@
+"""
+Single-flight request coalescing for LLM calls.
+
+Identical calls that overlap in time (same prompt fingerprint) share one
+upstream request: the first caller starts it, later callers wait on its
+result, or for streams receive every chunk so far and then each new one.
+The upstream call is cancelled only when every caller has gone away.
+
+Counts go to telemetry: llm.upstream for calls that reached Gemini,
+llm.coalesced for calls that joined one already in flight.
+"""
+
+import asyncio
+import hashlib
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from app.core.telemetry import count
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of everything that determines a call's output."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.task: asyncio.Task | None = None
+        self.waiters = 0
+
+
+class _StreamFlight(_Flight):
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """In-flight call registry; one per kind of call."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Flight] = {}
+        self._streams: dict[str, _StreamFlight] = {}
+
+    async def call(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the identical call already running under key."""
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Flight()
+            flight.task = asyncio.ensure_future(fn())
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            count("llm.upstream")
+        else:
+            count("llm.coalesced")
+
+        flight.waiters += 1
+        try:
+            # shield: one caller being cancelled must not cancel the others' call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(self._calls, key, flight)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Yield the chunks of factory(), shared with identical streams in flight."""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _StreamFlight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, factory))
+            count("llm.upstream")
+        else:
+            count("llm.coalesced")
+
+        flight.waiters += 1
+        sent = 0
+        try:
+            while True:
+                if sent < len(flight.chunks):
+                    yield flight.chunks[sent]
+                    sent += 1
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.changed.wait()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.done:
+                # Nobody is listening any more; stop the upstream stream
+                flight.task.cancel()
+                self._forget(self._streams, key, flight)
+
+    async def _pump(self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator[str]]) -> None:
+        upstream = factory()
+        try:
+            async for chunk in upstream:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._forget(self._streams, key, flight)
+            flight.notify()
+            aclose = getattr(upstream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    @staticmethod
+    def _forget(registry: dict, key: str, flight: _Flight) -> None:
+        # A cancelled flight may already have been replaced under the same key
+        if registry.get(key) is flight:
+            del registry[key]
+
+    def in_flight(self) -> int:
+        """Calls and streams currently running."""
+        return len(self._calls) + len(self._streams)
@@ -3,36 +3,126 @@ Google Gemini API client.
 Uses the free tier (1,000 requests/day, no credit card needed).
 
 Get your key at: https://aistudio.google.com/apikey
+
+All calls go through the SDK's async interface (client.aio), so a request
+waiting on Gemini never blocks the event loop. One client is shared by the
+whole process and reuses its HTTP connections, and identical calls made at
+the same time are coalesced into one. Each call that does reach Gemini
+first waits its turn for the shared quota (see llm.quota).
+
+Failures are raised as LLMError subclasses (core.errors), never returned
+as text. Transient ones are retried with backoff behind a circuit breaker
+(see llm.resilience), so callers only see errors retrying could not fix.
 """
 
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 
-from app.settings import GEMINI_API_KEY, GEMINI_MODEL
+from app.core.errors import LLMAuthError, LLMError, LLMRateLimitedError, LLMTimeoutError, LLMUnavailableError
+from app.llm import quota
+from app.llm.coalesce import SingleFlight, fingerprint
+from app.llm.resilience import CircuitBreaker, RetryPolicy, call_with_retry
+from app.settings import GEMINI_API_KEY, GEMINI_BASE_URL, GEMINI_MODEL, GEMINI_TIMEOUT_SECONDS
 
 _client: genai.Client | None = None
+# Identical concurrent calls share one upstream request (see llm.coalesce)
+_flights = SingleFlight()
+_retry = RetryPolicy()
+_breaker = CircuitBreaker()
+
+EMPTY_RESPONSE = "I had trouble generating a response. Could you try rephrasing?"
+
+
+def is_configured() -> bool:
+    """True if an API key is set."""
+    return bool(GEMINI_API_KEY and GEMINI_API_KEY != "your_api_key_here")
 
 
 def _get_client() -> genai.Client:
     """Get or create the Gemini client (singleton)."""
     global _client
     if _client is None:
-        if not GEMINI_API_KEY or GEMINI_API_KEY == "your_api_key_here":
+        if not is_configured():
             raise ValueError(
                 "GEMINI_API_KEY not set. "
                 "Get a free key at https://aistudio.google.com/apikey "
                 "and add it to backend/.env"
             )
-        _client = genai.Client(api_key=GEMINI_API_KEY)
+        _client = genai.Client(
+            api_key=GEMINI_API_KEY,
+            # Socket-level limit (milliseconds); per-call limits are below
+            http_options=types.HttpOptions(
+                timeout=int(GEMINI_TIMEOUT_SECONDS * 1000),
+                base_url=GEMINI_BASE_URL or None,
+            ),
+        )
     return _client
 
 
+def breaker_stats() -> dict:
+    """Circuit breaker state, for /api/health."""
+    return _breaker.stats()
+
+
+def _as_llm_error(e: Exception) -> LLMError:
+    """Map an SDK or transport exception to the LLMError subclass callers handle."""
+    if isinstance(e, LLMError):
+        return e
+    if isinstance(e, TimeoutError):
+        return LLMTimeoutError()
+    if isinstance(e, genai_errors.APIError):
+        if e.code == 429:
+            return LLMRateLimitedError()
+        if e.code in (401, 403):
+            return LLMAuthError()
+        if e.code >= 500:
+            return LLMUnavailableError(f"{e.code} {e.status}")
+    elif isinstance(e, httpx.TransportError):
+        return LLMUnavailableError(type(e).__name__)
+    error_msg = str(e)
+    if "quota" in error_msg.lower() or "429" in error_msg:
+        return LLMRateLimitedError()
+    if "api_key" in error_msg.lower() or "401" in error_msg:
+        return LLMAuthError()
+    return LLMError(f"Error from Gemini: {error_msg}")
+
+
+def _build_request(
+    messages: list[dict],
+    system_prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> tuple[list[types.Content], types.GenerateContentConfig]:
+    contents = []
+    for msg in messages:
+        role = "user" if msg["role"] == "user" else "model"
+        contents.append(
+            types.Content(
+                role=role,
+                parts=[types.Part(text=msg["content"])],
+            )
+        )
+    config = types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        max_output_tokens=max_tokens,
+        temperature=temperature,
+    )
+    return contents, config
+
+
 async def chat(
     messages: list[dict],
     system_prompt: str,
     model: str | None = None,
     max_tokens: int = 2048,
     temperature: float = 0.7,
+    timeout: float | None = None,
+    priority: int = quota.INTERACTIVE,
 ) -> str:
     """
     Send a chat request to Gemini and return the response text.
@@ -43,92 +133,128 @@ async def chat(
         model: Model name (defaults to GEMINI_MODEL setting)
         max_tokens: Maximum response tokens
         temperature: Creativity level (0.0 - 1.0)
+        timeout: Seconds to wait for the whole response (defaults to
+            GEMINI_TIMEOUT_SECONDS)
+        priority: Quota priority class (quota.INTERACTIVE or quota.BACKGROUND)
 
     Returns:
         The model's response text
+
+    Raises:
+        QuotaExceededError: the shared quota cannot serve the call in time
+        LLMError: Gemini failed (a subclass says how) even after retries
     """
     client = _get_client()
     model_name = model or GEMINI_MODEL
+    key = fingerprint("chat", model_name, system_prompt, messages, max_tokens, temperature)
+    return await _flights.call(
+        key,
+        lambda: _generate(client, model_name, messages, system_prompt, max_tokens, temperature, timeout, priority),
+    )
 
-    contents = []
-    for msg in messages:
-        role = "user" if msg["role"] == "user" else "model"
-        contents.append(
-            types.Content(
-                role=role,
-                parts=[types.Part(text=msg["content"])],
-            )
-        )
 
-    try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-            ),
-        )
-        return response.text or "I had trouble generating a response. Could you try rephrasing?"
-
-    except Exception as e:
-        error_msg = str(e)
-        if "quota" in error_msg.lower() or "429" in error_msg:
-            return (
-                "Hit the daily API limit (1,000 req/day). "
-                "Try again tomorrow, or upgrade to the paid tier."
-            )
-        if "api_key" in error_msg.lower() or "401" in error_msg:
-            return (
-                "Invalid API key. Check your GEMINI_API_KEY in .env. "
-                "Get a free key at https://aistudio.google.com/apikey"
-            )
-        return f"Error from Gemini: {error_msg}"
+async def _generate(client, model_name, messages, system_prompt, max_tokens, temperature, timeout, priority) -> str:
+    contents, config = _build_request(messages, system_prompt, max_tokens, temperature)
 
+    async def attempt() -> str:
+        await quota.scheduler.acquire(priority)
+        try:
+            async with asyncio.timeout(timeout or GEMINI_TIMEOUT_SECONDS):
+                response = await client.aio.models.generate_content(
+                    model=model_name,
+                    contents=contents,
+                    config=config,
+                )
+        except Exception as e:
+            raise _as_llm_error(e) from e
+        if not response.text:
+            raise LLMError(EMPTY_RESPONSE)
+        return response.text
 
-def chat_stream(
+    return await call_with_retry(attempt, _breaker, _retry)
+
+
+async def chat_stream(
     messages: list[dict],
     system_prompt: str,
     model: str | None = None,
     max_tokens: int = 2048,
     temperature: float = 0.7,
-):
+    timeout: float | None = None,
+    priority: int = quota.INTERACTIVE,
+) -> AsyncIterator[str]:
     """
     Stream a chat response from Gemini, yielding text chunks.
 
-    Yields str chunks as they arrive from the model.
+    Yields str chunks as they arrive from the model. `timeout` bounds the
+    wait for each chunk (defaults to GEMINI_TIMEOUT_SECONDS), so a long
+    answer that keeps arriving is never cut off. Raises QuotaExceededError
+    before the first chunk when the shared quota cannot serve the call, and
+    LLMError when Gemini fails. Only failures before the first chunk are
+    retried, and streams are never hedged: both would send text twice.
     """
     client = _get_client()
     model_name = model or GEMINI_MODEL
+    key = fingerprint("stream", model_name, system_prompt, messages, max_tokens, temperature)
+    async for chunk in _flights.stream(
+        key,
+        lambda: _generate_stream(
+            client, model_name, messages, system_prompt, max_tokens, temperature, timeout, priority,
+        ),
+    ):
+        yield chunk
 
-    contents = []
-    for msg in messages:
-        role = "user" if msg["role"] == "user" else "model"
-        contents.append(
-            types.Content(
-                role=role,
-                parts=[types.Part(text=msg["content"])],
-            )
-        )
 
+async def _generate_stream(
+    client, model_name, messages, system_prompt, max_tokens, temperature, timeout, priority,
+) -> AsyncIterator[str]:
+    contents, config = _build_request(messages, system_prompt, max_tokens, temperature)
+    timeout = timeout or GEMINI_TIMEOUT_SECONDS
+
+    async def next_chunk(stream):
+        try:
+            async with asyncio.timeout(timeout):
+                return await anext(stream)
+        except StopAsyncIteration:
+            raise
+        except Exception as e:
+            raise _as_llm_error(e) from e
+
+    async def open_stream():
+        """Start a stream and wait for its first chunk, so failures up to then can be retried."""
+        await quota.scheduler.acquire(priority)
+        stream = None
+        try:
+            async with asyncio.timeout(timeout):
+                stream = await client.aio.models.generate_content_stream(
+                    model=model_name,
+                    contents=contents,
+                    config=config,
+                )
+            return stream, await next_chunk(stream)
+        except StopAsyncIteration:
+            return stream, None
+        except BaseException as e:
+            await _close(stream)
+            if isinstance(e, Exception):
+                raise _as_llm_error(e) from e
+            raise
+
+    stream, chunk = await call_with_retry(open_stream, _breaker, _retry, hedge=False)
     try:
-        for chunk in client.models.generate_content_stream(
-            model=model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-            ),
-        ):
+        while chunk is not None:
             if chunk.text:
                 yield chunk.text
-    except Exception as e:
-        error_msg = str(e)
-        if "quota" in error_msg.lower() or "429" in error_msg:
-            yield "Hit the daily API limit (1,000 req/day). Try again tomorrow."
-        elif "api_key" in error_msg.lower() or "401" in error_msg:
-            yield "Invalid API key. Check your GEMINI_API_KEY in .env."
-        else:
-            yield f"Error from Gemini: {error_msg}"
+            try:
+                chunk = await next_chunk(stream)
+            except StopAsyncIteration:
+                break
+    finally:
+        # Release the HTTP response if the caller stopped early
+        await _close(stream)
+
+
+async def _close(stream) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
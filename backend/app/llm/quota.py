@@ -0,0 +1,177 @@
+"""
+Project-wide Gemini quota scheduler.
+
+Every upstream Gemini call takes a token from two buckets first: one sized
+to the per-minute limit and one to the per-day limit, each refilling at a
+steady rate. Callers that find the buckets empty queue up, interactive chat
+ahead of background quiz pre-generation, and background calls also leave
+GEMINI_BACKGROUND_RESERVE of the daily budget untouched for students.
+
+Admission is decided up front: when the predicted wait for a token is
+longer than the caller's deadline the call fails at once with
+QuotaExceededError (HTTP 429 with Retry-After) instead of hanging.
+
+Bucket levels are saved through an optional store (attach_store) so a
+restart does not hand out a fresh daily budget.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections.abc import Callable
+
+from app.core.errors import QuotaExceededError
+from app.core.telemetry import count
+from app.settings import (
+    GEMINI_BACKGROUND_QUEUE_SECONDS,
+    GEMINI_BACKGROUND_RESERVE,
+    GEMINI_QUEUE_SECONDS,
+    GEMINI_RPD,
+    GEMINI_RPM,
+)
+
+# Priority classes; lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_MAX_WAIT = {INTERACTIVE: GEMINI_QUEUE_SECONDS, BACKGROUND: GEMINI_BACKGROUND_QUEUE_SECONDS}
+
+
+class TokenBucket:
+    """`capacity` tokens, refilled continuously over `period` seconds."""
+
+    def __init__(self, name: str, capacity: int, period: float, clock: Callable[[], float] = time.time) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, needed: float) -> float:
+        """Seconds until the bucket holds `needed` tokens (inf if it never can)."""
+        self.refill()
+        if needed > self.capacity:
+            return math.inf
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class QuotaScheduler:
+    """Token-bucket admission for upstream LLM calls, served in priority order."""
+
+    def __init__(
+        self,
+        per_minute: int = GEMINI_RPM,
+        per_day: int = GEMINI_RPD,
+        background_reserve: int = GEMINI_BACKGROUND_RESERVE,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # A limit of 0 means no bucket for that window
+        self._buckets = [
+            TokenBucket(name, capacity, period, clock)
+            for name, capacity, period in (("minute", per_minute, 60.0), ("day", per_day, 86400.0))
+            if capacity > 0
+        ]
+        self._reserve = {"day": background_reserve}
+        self._waiting: list[tuple[int, int]] = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._changed = asyncio.Event()
+        self._save: Callable[[str, float, float], None] | None = None
+
+    def attach_store(
+        self,
+        load: Callable[[], dict[str, tuple[float, float]]],
+        save: Callable[[str, float, float], None],
+    ) -> None:
+        """Restore bucket levels saved by a previous run and save them after every grant."""
+        saved = load()
+        for bucket in self._buckets:
+            if bucket.name in saved:
+                bucket.tokens, bucket.updated = saved[bucket.name]
+                bucket.tokens = min(bucket.tokens, bucket.capacity)
+        self._save = save
+
+    async def acquire(self, priority: int = INTERACTIVE, max_wait: float | None = None) -> None:
+        """
+        Wait for a token in priority order.
+
+        Raises QuotaExceededError at once if the predicted wait exceeds
+        max_wait (defaulting to the priority's configured queue limit), or
+        if the token has still not come by then.
+        """
+        max_wait = _MAX_WAIT[priority] if max_wait is None else max_wait
+        ticket = (priority, next(self._arrivals))
+        predicted = self._predicted_wait(ticket)
+        if predicted > max_wait:
+            count("llm.quota.rejected")
+            raise QuotaExceededError(predicted)
+
+        heapq.heappush(self._waiting, ticket)
+        try:
+            async with asyncio.timeout(max_wait):
+                while True:
+                    wait = self._wait_as_head(ticket)
+                    if wait == 0:
+                        break
+                    changed = self._changed
+                    try:
+                        await asyncio.wait_for(changed.wait(), wait if wait != math.inf else None)
+                    except TimeoutError:
+                        pass
+        except TimeoutError:
+            count("llm.quota.rejected")
+            raise QuotaExceededError(self._predicted_wait(ticket)) from None
+        finally:
+            self._leave(ticket)
+
+        for bucket in self._buckets:
+            bucket.take()
+            if self._save is not None:
+                self._save(bucket.name, bucket.tokens, bucket.updated)
+        count("llm.quota.granted")
+
+    def _needed(self, bucket: TokenBucket, priority: int, ahead: int) -> float:
+        reserve = self._reserve.get(bucket.name, 0) if priority == BACKGROUND else 0
+        return ahead + 1 + reserve
+
+    def _predicted_wait(self, ticket: tuple[int, int]) -> float:
+        # Everyone queued ahead of this ticket is served first
+        ahead = sum(1 for other in self._waiting if other < ticket)
+        return max((b.wait_for(self._needed(b, ticket[0], ahead)) for b in self._buckets), default=0.0)
+
+    def _wait_as_head(self, ticket: tuple[int, int]) -> float | None:
+        """0 when ticket may take its token now, else seconds to sleep (None: until woken)."""
+        if self._waiting[0] != ticket:
+            return None
+        return max((b.wait_for(self._needed(b, ticket[0], 0)) for b in self._buckets), default=0.0)
+
+    def _leave(self, ticket: tuple[int, int]) -> None:
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+        # Wake the waiters so the new head of the queue re-checks the buckets
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def stats(self) -> dict:
+        """Tokens left per bucket and callers waiting."""
+        for bucket in self._buckets:
+            bucket.refill()
+        return {
+            "buckets": {b.name: {"tokens": round(b.tokens, 2), "capacity": b.capacity} for b in self._buckets},
+            "waiting": len(self._waiting),
+        }
+
+
+# Shared by every Gemini call in the process
+scheduler = QuotaScheduler()
@@ -0,0 +1,139 @@
+"""
+Retries, hedging and a circuit breaker for upstream LLM calls.
+
+call_with_retry runs one attempt function, which must raise LLMError
+subclasses (see core.errors). Retryable failures are tried again after a
+jittered exponential backoff ("full jitter": a random delay up to
+base * 2**attempt, capped), and with hedging enabled an attempt still
+unanswered after `hedge_after` seconds gets a duplicate raced against it.
+
+The circuit breaker counts retryable failures in a row. Once it opens,
+calls fail fast with CircuitOpenError instead of adding load to an API
+that is down; after `reset_seconds` one call is let through to probe, and
+its success closes the circuit again.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from app.core.errors import CircuitOpenError, LLMError
+from app.core.telemetry import count
+from app.settings import (
+    GEMINI_BREAKER_FAILURES,
+    GEMINI_BREAKER_RESET_SECONDS,
+    GEMINI_HEDGE_AFTER_SECONDS,
+    GEMINI_RETRY_ATTEMPTS,
+    GEMINI_RETRY_BASE_SECONDS,
+    GEMINI_RETRY_MAX_SECONDS,
+)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = GEMINI_RETRY_ATTEMPTS
+    base_delay: float = GEMINI_RETRY_BASE_SECONDS
+    max_delay: float = GEMINI_RETRY_MAX_SECONDS
+    hedge_after: float = GEMINI_HEDGE_AFTER_SECONDS  # 0 = no hedging
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """closed → open after `failures` retryable failures in a row → half-open probe."""
+
+    def __init__(
+        self,
+        failures: int = GEMINI_BREAKER_FAILURES,
+        reset_seconds: float = GEMINI_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def check(self) -> None:
+        """Raise CircuitOpenError while open; let one probe through once cooled down."""
+        if self.state == "closed":
+            return
+        waited = self.clock() - self._opened_at
+        if waited < self.reset_seconds:
+            count("llm.circuit.rejected")
+            raise CircuitOpenError(self.reset_seconds - waited)
+        # This call is the probe; others keep failing fast for another period
+        self.state = "half_open"
+        self._opened_at = self.clock()
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or (self.threshold > 0 and self._failures >= self.threshold):
+            if self.state == "closed":
+                count("llm.circuit.opened")
+            self.state = "open"
+            self._opened_at = self.clock()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+
+async def call_with_retry(
+    attempt: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy,
+    hedge: bool = True,
+) -> T:
+    """Run attempt() under the breaker, retrying retryable LLMErrors per policy."""
+    failures = 0
+    while True:
+        breaker.check()
+        try:
+            if hedge and policy.hedge_after > 0:
+                result = await _hedged(attempt, policy.hedge_after)
+            else:
+                result = await attempt()
+        except LLMError as e:
+            if e.retryable:
+                breaker.record_failure()
+            failures += 1
+            if not e.retryable or failures >= policy.attempts:
+                raise
+            count("llm.retry")
+            await asyncio.sleep(policy.delay(failures - 1))
+        else:
+            breaker.record_success()
+            return result
+
+
+async def _hedged(attempt: Callable[[], Awaitable[T]], hedge_after: float) -> T:
+    """First successful result of attempt(), racing a second copy after hedge_after seconds."""
+    tasks = {asyncio.ensure_future(attempt())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            count("llm.hedged")
+            tasks.add(asyncio.ensure_future(attempt()))
+        error: BaseException | None = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
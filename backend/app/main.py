@@ -8,6 +8,7 @@ Docs:  http://localhost:8000/docs
 import logging
 import os
 from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
 
 from fastapi import Depends, FastAPI
@@ -16,9 +17,15 @@ from fastapi.responses import FileResponse
 
 log = logging.getLogger(__name__)
 
-from app.settings import UPLOAD_DIR, IMAGES_DIR, INDEX_DIR, CHUNKS_PATH, SOURCE_LINKS_PATH
+from app.settings import UPLOAD_DIR, IMAGES_DIR, INDEX_DIR, CHUNKS_PATH, SEARCH_INDEX_PATH, SOURCE_LINKS_PATH
+from app.core.executors import shutdown_executors, submit_db
 from app.core.middleware import register_middleware
-from app.storage.db import init_db
+from app.llm import quota
+from app.services.chat_history import start_history_writer, stop_history_writer
+from app.services.quiz_bank import start_pregeneration, stop_pregeneration
+from app.services.upload_service import clear_staging
+from app.storage.db import close_db, init_db
+from app.storage.quota_repo import load_quota_buckets, save_quota_bucket
 from app.api.deps import search_engine
 
 from app.core.auth import require_auth, router as auth_router
@@ -29,10 +36,10 @@ STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 
 def _reload_search_index() -> None:
-    """Rebuild the search index from chunks file."""
+    """Map the persisted search index, rebuilding it from the chunks file if stale."""
     chunks_path = str(CHUNKS_PATH)
     if os.path.exists(chunks_path):
-        search_engine.load_chunks(chunks_path)
+        search_engine.load_index(chunks_path, str(SEARCH_INDEX_PATH))
     else:
         log.info("No chunks found. Upload materials to get started.")
     search_engine.load_source_links(str(SOURCE_LINKS_PATH))
@@ -40,13 +47,22 @@ def _reload_search_index() -> None:
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    """Startup: init DB, create dirs, load search index."""
+    """Startup: create dirs, drop stale staged uploads, init DB, restore quota levels, load search index."""
     os.makedirs(str(UPLOAD_DIR), exist_ok=True)
     os.makedirs(str(IMAGES_DIR), exist_ok=True)
     os.makedirs(str(INDEX_DIR), exist_ok=True)
+    clear_staging()
     init_db()
+    # Saves run on the db pool so granting a call never waits on disk
+    quota.scheduler.attach_store(load_quota_buckets, partial(submit_db, save_quota_bucket))
     _reload_search_index()
+    start_pregeneration(search_engine)
+    start_history_writer()
     yield
+    await stop_pregeneration()
+    await stop_history_writer()
+    shutdown_executors()
+    close_db()
 
 
 app = FastAPI(
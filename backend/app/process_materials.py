@@ -4,34 +4,55 @@ CLI to process study materials into the search index.
 Usage:
     cd backend
     python -m app.process_materials ../materials
+    python -m app.process_materials ../materials --jobs 4        # extract in 4 worker processes
+    python -m app.process_materials ../materials --clear-cache   # re-extract everything
 """
 
+import argparse
 import logging
 import sys
+from dataclasses import asdict
 from pathlib import Path
 
-from app.retrieval.processor import process_directory, save_chunks
-from app.settings import CHUNKS_PATH
+from app.retrieval.index.store import persist_index
+from app.retrieval.processor import directory_sources, process_directory, save_chunks
+from app.retrieval.processor.cache import extraction_cache
+from app.settings import CHUNKS_PATH, SEARCH_INDEX_PATH
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 
 
 def main() -> None:
-    if len(sys.argv) < 2:
-        print("Usage: python -m app.process_materials <materials_directory>")
-        sys.exit(1)
-
-    materials_dir = Path(sys.argv[1]).resolve()
+    parser = argparse.ArgumentParser(prog="python -m app.process_materials")
+    parser.add_argument("materials_directory")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="extract files in N worker processes (0 = one per CPU)")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="discard cached extractions before processing")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="extract every file without reading or writing the cache")
+    args = parser.parse_args()
+
+    materials_dir = Path(args.materials_directory).resolve()
     if not materials_dir.is_dir():
         print(f"Error: {materials_dir} is not a directory")
         sys.exit(1)
 
-    chunks = process_directory(str(materials_dir))
+    if args.clear_cache:
+        extraction_cache.clear()
+
+    chunks = process_directory(
+        str(materials_dir), None if args.no_cache else extraction_cache, jobs=args.jobs,
+    )
     if not chunks:
         print("No chunks produced. Check that the directory contains supported files.")
         sys.exit(1)
 
     save_chunks(chunks, str(CHUNKS_PATH))
+    persist_index(
+        [asdict(c) for c in chunks], str(CHUNKS_PATH), str(SEARCH_INDEX_PATH),
+        sources=directory_sources(str(materials_dir)),
+    )
     print(f"\nDone — {len(chunks)} chunks saved to {CHUNKS_PATH}")
 
 
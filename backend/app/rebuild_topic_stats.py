@@ -0,0 +1,34 @@
+"""
+CLI to rebuild the per-topic quiz totals (topic_stats) from quiz_results.
+
+Usage:
+    cd backend
+    python -m app.rebuild_topic_stats
+
+The server keeps topic_stats up to date as answers come in and fills it
+once for databases created before it existed; run this after editing
+quiz_results by hand or restoring it from a backup.
+"""
+
+import argparse
+import logging
+
+from app.settings import DB_PATH
+from app.storage.db import close_db, init_db
+from app.storage.progress_repo import rebuild_topic_stats
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.rebuild_topic_stats")
+    parser.parse_args()
+
+    init_db()
+    rows = rebuild_topic_stats()
+    close_db()
+    print(f"Done — {rows} topic totals rebuilt in {DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
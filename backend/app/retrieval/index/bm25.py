@@ -1,25 +1,27 @@
-"""BM25 index builder — wraps rank-bm25 with build/load/save."""
+"""BM25 index builder — builds the postings index and queries it."""
 
-from rank_bm25 import BM25Okapi
+from app.retrieval.index.postings import BM25Index
 from app.retrieval.index.tokenizer import tokenize
 
 
-def build_index(chunks: list[dict]) -> tuple[BM25Okapi, list[list[str]]]:
+def tokenize_chunk(chunk: dict) -> list[str]:
+    """Tokens indexed for a chunk: its section title plus content."""
+    return tokenize(f"{chunk['section_title']} {chunk['content']}")
+
+
+def build_index(chunks: list[dict]) -> tuple[BM25Index | None, list[list[str]]]:
     """
     Build a BM25 index from chunk dicts.
 
     Returns (bm25_index, tokenized_corpus).
     """
-    corpus = [
-        tokenize(f"{c['section_title']} {c['content']}")
-        for c in chunks
-    ]
-    bm25 = BM25Okapi(corpus) if corpus else None
+    corpus = [tokenize_chunk(c) for c in chunks]
+    bm25 = BM25Index(corpus) if corpus else None
     return bm25, corpus
 
 
 def query_index(
-    bm25: BM25Okapi,
+    bm25: BM25Index | None,
     chunks: list[dict],
     query: str,
     top_k: int = 5,
@@ -31,14 +33,11 @@ def query_index(
     if not tokens or bm25 is None:
         return []
 
-    scores = bm25.get_scores(tokens)
-    ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
-
+    hits, _ = bm25.top_k(tokens, top_k)
     results = []
-    for idx, score in ranked:
-        if score > 0:
-            chunk = chunks[idx].copy()
-            chunk["relevance_score"] = round(float(score), 3)
-            results.append(chunk)
+    for idx, score in hits:
+        chunk = chunks[idx].copy()
+        chunk["relevance_score"] = round(float(score), 3)
+        results.append(chunk)
 
     return results
@@ -0,0 +1,106 @@
+"""
+Background persistence of the live index after uploads.
+
+Uploads tombstone a file's old chunks and append its new ones in memory.
+Rebuilding the whole index after every upload would undo that, so the
+background pass compacts (drops tombstones, rebuilds, writes search.idx)
+only once INDEX_COMPACT_TOMBSTONE_RATIO of the chunks are dead or
+INDEX_COMPACT_MAX_SEGMENTS updates have been appended. Otherwise it saves
+just the live chunks and manifest, which is enough to restore the same
+content (and skip re-extraction) after a restart.
+"""
+
+import logging
+import threading
+
+from app.core.executors import run_cpu_sync
+from app.retrieval.index.bm25 import build_index
+from app.retrieval.index.manifest import build_manifest, save_manifest
+from app.retrieval.index.snapshot import IndexSnapshot
+from app.retrieval.index.store import file_checksum, persist_index
+from app.retrieval.processor import save_chunks
+from app.settings import (
+    CHUNKS_PATH,
+    INDEX_COMPACT_MAX_SEGMENTS,
+    INDEX_COMPACT_TOMBSTONE_RATIO,
+    SEARCH_INDEX_PATH,
+)
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_requested = False
+_running = False
+
+
+def compact_and_persist(search_engine) -> bool:
+    """
+    Compact the live index and write chunks.json, search.idx and the manifest.
+
+    Returns False when an update raced the rebuild; a later pass picks it up.
+    """
+    compacted = search_engine.compact(build=lambda live: run_cpu_sync(build_index, live))
+    if compacted is None:
+        return False
+    chunks, bm25, sources = compacted
+    save_chunks(chunks, str(CHUNKS_PATH))
+    persist_index(chunks, str(CHUNKS_PATH), str(SEARCH_INDEX_PATH), bm25, sources)
+    return True
+
+
+def needs_compaction(snapshot: IndexSnapshot) -> bool:
+    """Whether enough tombstones or appended updates have piled up to rebuild."""
+    if snapshot.bm25 is None or not snapshot.chunks:
+        return False
+    dead = len(snapshot.bm25.deleted) / len(snapshot.chunks)
+    return dead >= INDEX_COMPACT_TOMBSTONE_RATIO or snapshot.segments >= INDEX_COMPACT_MAX_SEGMENTS
+
+
+def persist_live(search_engine) -> None:
+    """
+    Write the live chunks and manifest without rebuilding the index.
+
+    search.idx is left as it was; its checksum no longer matches, so the
+    next start rebuilds it from chunks.json (with these sources).
+    """
+    snapshot = search_engine.snapshot
+    deleted = snapshot.bm25.deleted if snapshot.bm25 else set()
+    live = [c for i, c in enumerate(snapshot.chunks) if i not in deleted]
+    save_chunks(live, str(CHUNKS_PATH))
+    save_manifest(build_manifest(live, file_checksum(str(CHUNKS_PATH)), dict(snapshot.sources)))
+
+
+def schedule_compaction(search_engine) -> None:
+    """
+    Persist the live index on a background thread, compacting it first
+    when needs_compaction says so.
+
+    Requests made while one is running coalesce into a single follow-up pass.
+    """
+    global _requested, _running
+    with _lock:
+        _requested = True
+        if _running:
+            return
+        _running = True
+    threading.Thread(
+        target=_worker, args=(search_engine,), name="index-compaction", daemon=True,
+    ).start()
+
+
+def _worker(search_engine) -> None:
+    global _requested, _running
+    while True:
+        with _lock:
+            if not _requested:
+                _running = False
+                return
+            _requested = False
+        try:
+            if not needs_compaction(search_engine.snapshot):
+                persist_live(search_engine)
+            elif not compact_and_persist(search_engine):
+                with _lock:
+                    _requested = True
+        except Exception:
+            log.exception("Index compaction failed")
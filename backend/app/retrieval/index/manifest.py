@@ -22,3 +22,19 @@ def load_manifest() -> IndexManifest | None:
     with open(MANIFEST_PATH, "r") as f:
         data = json.load(f)
     return IndexManifest(**data)
+
+
+def build_manifest(chunks: list[dict], checksum: str, sources: dict[str, str] | None = None) -> IndexManifest:
+    """Describe a freshly built index."""
+    from app.retrieval.index.store import INDEX_FORMAT_VERSION
+
+    files = sorted({c["source_file"] for c in chunks})
+    return IndexManifest(
+        version=INDEX_FORMAT_VERSION,
+        total_chunks=len(chunks),
+        total_files=len(files),
+        total_words=sum(c.get("word_count", 0) for c in chunks),
+        files=files,
+        checksum=checksum,
+        sources=dict(sources or {}),
+    )
@@ -0,0 +1,318 @@
+"""Inverted-index BM25 — per-term postings with precomputed IDF and norms."""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+import math
+
+# Relative slack on score estimates. Pruning sums contributions in a
+# different order than the exact score, so allow for float rounding.
+_BOUND_SLACK = 1 + 1e-9
+
+
+class BM25Index:
+    """
+    Okapi BM25 over postings lists.
+
+    Scores are bit-for-bit identical to rank_bm25.BM25Okapi (same IDF floor,
+    same k1/b defaults, same float operation order), but a query only touches
+    documents that contain at least one of its terms.
+
+    The index also accepts live updates: add_documents() appends documents and
+    delete_documents() tombstones them. Like Lucene, tombstoned documents keep
+    counting toward N, df and avgdl until the index is rebuilt (compacted).
+    """
+
+    def __init__(
+        self,
+        corpus: list[list[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.corpus_size = len(corpus)
+        self.doc_len = array("i", (len(doc) for doc in corpus))
+        self.avgdl = sum(self.doc_len) / self.corpus_size if self.corpus_size else 0.0
+        self.deleted: set[int] = set()
+
+        # term -> (doc_ids, term_freqs), doc ids ascending. Insertion order
+        # follows first appearance in the corpus, which keeps the average-IDF
+        # sum below in the same order rank_bm25 uses.
+        postings: dict[str, tuple[array, array]] = {}
+        added = _append_postings(postings, corpus, 0)
+        self.idf = self._calc_idf(postings, self.corpus_size)
+        self.norms = self._calc_norms(self.doc_len, self.avgdl)
+
+        # tf_bound[t] is the largest tf part, tf * (k1 + 1) / (tf + norm), of
+        # any posting of t, measured with norms at bound_avgdl. Scaled by
+        # max(1, avgdl / bound_avgdl) it stays a valid bound after updates.
+        self.bound_avgdl = self.avgdl
+        self.tf_bound = self._raise_tf_bounds({}, postings, self.doc_len, added)
+        self.postings = postings
+
+    @classmethod
+    def from_arrays(
+        cls,
+        *,
+        doc_len,
+        norms,
+        postings,
+        idf: dict[str, float],
+        tf_bound: dict[str, float],
+        bound_avgdl: float,
+        k1: float,
+        b: float,
+        epsilon: float,
+        avgdl: float,
+    ) -> "BM25Index":
+        """
+        Rebuild an index from precomputed parts (e.g. a memory-mapped file).
+
+        doc_len / norms / postings values may be any int/float sequences,
+        including memoryviews; postings only needs get/[]/in. Read-only parts
+        are copied into arrays on the first live update.
+        """
+        index = cls.__new__(cls)
+        index.k1 = k1
+        index.b = b
+        index.epsilon = epsilon
+        index.corpus_size = len(doc_len)
+        index.doc_len = doc_len
+        index.avgdl = avgdl
+        index.deleted = set()
+        index.postings = postings
+        index.idf = idf
+        index.norms = norms
+        index.tf_bound = tf_bound
+        index.bound_avgdl = bound_avgdl
+        return index
+
+    @property
+    def live_count(self) -> int:
+        """Number of documents that are not tombstoned."""
+        return self.corpus_size - len(self.deleted)
+
+    def max_score(self, term: str) -> float:
+        """Upper bound on a single occurrence of `term`'s contribution to any document."""
+        scale = self.avgdl / self.bound_avgdl if self.bound_avgdl and self.avgdl > self.bound_avgdl else 1.0
+        return max(0.0, self.idf[term]) * self.tf_bound[term] * scale
+
+    def add_documents(self, corpus: list[list[str]]) -> range:
+        """
+        Append tokenized documents and return their doc ids.
+
+        IDF and length norms are recomputed for the new corpus statistics.
+        Touched postings are copied rather than appended in place, and the
+        postings dict is published last, so a concurrent query that picked up
+        the new postings also sees norms and IDF covering the new documents.
+        """
+        first = self.corpus_size
+        corpus_size = first + len(corpus)
+        doc_len = array("i", self.doc_len)
+        doc_len.extend(len(doc) for doc in corpus)
+        avgdl = sum(doc_len) / corpus_size if corpus_size else 0.0
+
+        postings = dict(self.postings.items())
+        added = _append_postings(postings, corpus, first)
+        idf = self._calc_idf(postings, corpus_size)
+        norms = self._calc_norms(doc_len, avgdl)
+        tf_bound = self._raise_tf_bounds(dict(self.tf_bound), postings, doc_len, added)
+
+        self.doc_len, self.norms, self.idf, self.tf_bound = doc_len, norms, idf, tf_bound
+        self.corpus_size, self.avgdl = corpus_size, avgdl
+        self.postings = postings
+        return range(first, corpus_size)
+
+    def delete_documents(self, doc_ids) -> None:
+        """Tombstone documents so queries skip them."""
+        self.deleted = self.deleted | set(doc_ids)
+
+    def _calc_norms(self, doc_len, avgdl: float) -> array:
+        """k1 * (1 - b + b * |d| / avgdl), precomputed per document."""
+        avgdl = avgdl or 1.0
+        return array("d", (
+            self.k1 * (1 - self.b + self.b * dl / avgdl) for dl in doc_len
+        ))
+
+    def _calc_idf(self, postings, corpus_size: int) -> dict[str, float]:
+        """IDF with rank_bm25's floor of epsilon * average_idf for common terms."""
+        idf: dict[str, float] = {}
+        if not postings:
+            return idf
+
+        idf_sum = 0.0
+        negative: list[str] = []
+        for term, (ids, _) in postings.items():
+            df = len(ids)
+            value = math.log(corpus_size - df + 0.5) - math.log(df + 0.5)
+            idf[term] = value
+            idf_sum += value
+            if value < 0:
+                negative.append(term)
+
+        eps = self.epsilon * (idf_sum / len(idf))
+        for term in negative:
+            idf[term] = eps
+        return idf
+
+    def _raise_tf_bounds(self, tf_bound: dict[str, float], postings, doc_len, starts: dict[str, int]) -> dict[str, float]:
+        """Fold postings from position starts[term] onward into tf_bound."""
+        k1_plus_1 = self.k1 + 1
+        bound_avgdl = self.bound_avgdl or 1.0
+        for term, start in starts.items():
+            ids, tfs = postings[term]
+            best = tf_bound.get(term, 0.0)
+            for pos in range(start, len(ids)):
+                tf = tfs[pos]
+                norm = self.k1 * (1 - self.b + self.b * doc_len[ids[pos]] / bound_avgdl)
+                part = tf * k1_plus_1 / (tf + norm)
+                if part > best:
+                    best = part
+            tf_bound[term] = best
+        return tf_bound
+
+    def get_scores(self, query: list[str]) -> dict[int, float]:
+        """
+        Score every document that contains a query term.
+
+        Returns {doc_id: score}; documents absent from the dict score 0.
+        Repeated query terms count once per occurrence, as in rank_bm25.
+        """
+        postings = self.postings
+        k1_plus_1 = self.k1 + 1
+        norms = self.norms
+        deleted = self.deleted
+        scores: dict[int, float] = {}
+        for term in query:
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in zip(*posting):
+                if doc_id in deleted:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                    tf * k1_plus_1 / (tf + norms[doc_id])
+                )
+        return scores
+
+    def top_k(self, query: list[str], k: int) -> tuple[list[tuple[int, float]], int]:
+        """
+        Return (hits, docs_scored) for the k best positively-scoring documents.
+
+        hits are (doc_id, score) pairs, best first, with ties in corpus order —
+        the same ranking a stable sort over get_scores() gives. docs_scored is
+        how many documents were fully scored; MaxScore pruning keeps it well
+        below the number of documents matching any query term.
+        """
+        postings = self.postings
+        weights = Counter(term for term in query if term in postings)
+        if k <= 0 or not weights:
+            return [], 0
+
+        k1_plus_1 = self.k1 + 1
+        norms = self.norms
+        deleted = self.deleted
+        # Terms ordered by upper bound, lowest first. prefix[i] bounds the
+        # score a document can get from terms[0..i] alone.
+        terms = sorted(weights, key=lambda t: weights[t] * self.max_score(t))
+        bounds = [weights[t] * self.max_score(t) for t in terms]
+        prefix = []
+        running = 0.0
+        for bound in bounds:
+            running += bound
+            prefix.append(running)
+        lists = [postings[t] for t in terms]
+        idfs = [self.idf[t] for t in terms]
+        cursors = [0] * len(terms)
+
+        heap: list[tuple[float, int]] = []  # (score, -doc_id), worst on top
+        threshold = 0.0
+        # Terms below `essential` cannot lift a document past the threshold
+        # on their own, so they never generate candidates.
+        essential = 0
+        docs_scored = 0
+
+        while True:
+            while essential < len(terms) and prefix[essential] * _BOUND_SLACK <= threshold:
+                essential += 1
+            if essential == len(terms):
+                break
+
+            doc_id = -1
+            for i in range(essential, len(terms)):
+                ids = lists[i][0]
+                if cursors[i] < len(ids) and (doc_id < 0 or ids[cursors[i]] < doc_id):
+                    doc_id = ids[cursors[i]]
+            if doc_id < 0:
+                break
+
+            contributions = [0.0] * len(terms)
+            partial = 0.0
+            for i in range(essential, len(terms)):
+                ids, tfs = lists[i]
+                pos = cursors[i]
+                if pos < len(ids) and ids[pos] == doc_id:
+                    tf = tfs[pos]
+                    contributions[i] = idfs[i] * (tf * k1_plus_1 / (tf + norms[doc_id]))
+                    partial += weights[terms[i]] * contributions[i]
+                    cursors[i] = pos + 1
+            if doc_id in deleted:
+                continue
+
+            pruned = False
+            for i in range(essential - 1, -1, -1):
+                if (partial + prefix[i]) * _BOUND_SLACK <= threshold:
+                    pruned = True
+                    break
+                ids, tfs = lists[i]
+                pos = bisect_left(ids, doc_id, cursors[i])
+                cursors[i] = pos
+                if pos < len(ids) and ids[pos] == doc_id:
+                    tf = tfs[pos]
+                    contributions[i] = idfs[i] * (tf * k1_plus_1 / (tf + norms[doc_id]))
+                    partial += weights[terms[i]] * contributions[i]
+            if pruned or partial * _BOUND_SLACK <= threshold:
+                continue
+
+            # Exact score, accumulated in query order like get_scores()
+            docs_scored += 1
+            by_term = dict(zip(terms, contributions))
+            score = 0.0
+            for term in query:
+                score += by_term.get(term, 0.0)
+            if score <= threshold:
+                continue
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -doc_id))
+            else:
+                heapq.heapreplace(heap, (score, -doc_id))
+            if len(heap) == k:
+                threshold = heap[0][0]
+
+        hits = sorted(((-neg_id, score) for score, neg_id in heap), key=lambda h: (-h[1], h[0]))
+        return hits, docs_scored
+
+
+def _append_postings(postings: dict, corpus: list[list[str]], first: int) -> dict[str, int]:
+    """
+    Append postings for `corpus`, numbered from doc id `first`.
+
+    Each touched list is copied once before appending. Returns
+    {term: position of its first new posting}.
+    """
+    added: dict[str, int] = {}
+    for doc_id, doc in enumerate(corpus, first):
+        for term, tf in Counter(doc).items():
+            if term not in added:
+                ids, tfs = postings.get(term, ((), ()))
+                added[term] = len(ids)
+                postings[term] = (array("i", ids), array("i", tfs))
+            ids, tfs = postings[term]
+            ids.append(doc_id)
+            tfs.append(tf)
+    return added
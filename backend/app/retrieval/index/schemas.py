@@ -1,6 +1,6 @@
 """Schemas for chunk storage and index manifest."""
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import Optional
 
 
@@ -27,6 +27,8 @@ class IndexManifest:
     total_files: int
     total_words: int
     files: list[str]
+    checksum: str = ""  # SHA-256 of chunks.json the index was built from
+    sources: dict[str, str] = field(default_factory=dict)  # file name → SHA-256 of indexed bytes
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -0,0 +1,114 @@
+"""
+Immutable index snapshot — everything a query reads, published as one object.
+
+StudySearch never mutates a snapshot; writers build a new one and swap it in
+with a single reference assignment, so a query that grabbed a snapshot sees
+chunks, postings, sources and stats that belong together for its whole run.
+"""
+
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from app.retrieval.index.postings import BM25Index
+from app.retrieval.index.store import collection_stats
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    # Fingerprint of the indexed content (see content_version); caches key on it
+    version: int = 0
+    chunks: Sequence[dict] = ()
+    bm25: BM25Index | None = None
+    # file name → SHA-256 of the bytes indexed for it
+    sources: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    stats: Mapping = field(default_factory=lambda: MappingProxyType(collection_stats([])[0]))
+    topics: tuple[str, ...] = ()
+    # Chunk batches appended by replace_source since the last full build
+    segments: int = 0
+
+    @classmethod
+    def build(
+        cls,
+        chunks: Sequence[dict],
+        bm25: BM25Index | None,
+        sources: Mapping[str, str],
+        stats: dict | None = None,
+        topics: list[str] | None = None,
+        segments: int = 0,
+    ) -> "IndexSnapshot":
+        """Freeze the parts into a snapshot, computing stats from live chunks if not given."""
+        if stats is None or topics is None:
+            stats, topics = collection_stats(_live(chunks, bm25))
+        return cls(
+            version=content_version(chunks, bm25, sources, stats),
+            chunks=chunks,
+            bm25=bm25,
+            sources=MappingProxyType(dict(sources)),
+            stats=MappingProxyType(dict(stats)),
+            topics=tuple(topics),
+            segments=segments,
+        )
+
+
+def content_version(
+    chunks: Sequence[dict],
+    bm25: BM25Index | None,
+    sources: Mapping[str, str],
+    stats: Mapping,
+) -> int:
+    """
+    Version number derived from what is indexed, not from when.
+
+    The same content gets the same version after a restart or a compaction,
+    so caches keyed on it stay valid. When every indexed file has a content
+    hash in `sources` those stand in for its chunks; otherwise the live
+    chunks themselves are hashed.
+    """
+    digest = hashlib.sha256(json.dumps([stats["total_chunks"], stats["total_words"]]).encode("utf-8"))
+    files = stats["files"]
+    if files and all(name in sources for name in files):
+        for name in files:
+            digest.update(f"{name}\0{sources[name]}\0".encode("utf-8"))
+    else:
+        for chunk in _live(chunks, bm25):
+            digest.update(f"{chunk.get('id')}\0{chunk.get('content', '')}\0".encode("utf-8"))
+    # 56 bits: fits SQLite's signed 64-bit INTEGER
+    return int.from_bytes(digest.digest()[:7], "big")
+
+
+def _live(chunks: Sequence[dict], bm25: BM25Index | None) -> Sequence[dict]:
+    deleted = bm25.deleted if bm25 else set()
+    return [c for i, c in enumerate(chunks) if i not in deleted] if deleted else chunks
+
+
+def replace_file_stats(
+    stats: Mapping,
+    topics: Sequence[str],
+    source_file: str,
+    removed: Sequence[dict],
+    added: Sequence[dict],
+) -> tuple[dict, list[str]]:
+    """
+    (stats, topics) after one file's live chunks `removed` became `added`.
+
+    Topics are prefixed with their file name, so only that file's entries
+    change; the rest of the collection is not rescanned.
+    """
+    added_stats, added_topics = collection_stats(added)
+    prefix = f"{source_file} → "
+    files = set(stats["files"]) - {source_file} | set(added_stats["files"])
+    new_stats = {
+        "total_chunks": stats["total_chunks"] - len(removed) + len(added),
+        "total_files": len(files),
+        "files": sorted(files),
+        "total_words": (
+            stats["total_words"]
+            - sum(c.get("word_count", 0) for c in removed)
+            + added_stats["total_words"]
+        ),
+    }
+    new_topics = sorted({t for t in topics if not t.startswith(prefix)} | set(added_topics))
+    return new_stats, new_topics
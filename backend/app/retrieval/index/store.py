@@ -0,0 +1,274 @@
+"""
+Persisted binary search index — written at index time, memory-mapped at startup.
+
+Layout (native byte order, every section 8-byte aligned):
+
+    magic "SCIOLYIX" | u32 format version | u32 header length | header JSON
+    doc_len      int32[N]        tokens per chunk
+    norms        float64[N]      k1 * (1 - b + b * |d| / avgdl)
+    vocab        utf-8           terms joined by "\\n"
+    idf          float64[T]
+    tf_bound     float64[T]      best tf part per term (see BM25Index)
+    term_starts  int64[T + 1]    postings offsets per term
+    doc_ids      int32[P]
+    tfs          int32[P]
+    chunk_starts int64[N + 1]    byte offsets into chunk_data
+    chunk_data   utf-8           one compact JSON object per chunk
+
+The header records the chunks.json checksum it was built from, so a stale
+index is detected and rebuilt instead of served.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+from app.retrieval.index.bm25 import build_index
+from app.retrieval.index.manifest import build_manifest, save_manifest
+from app.retrieval.index.postings import BM25Index
+
+log = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 2
+_MAGIC = b"SCIOLYIX"
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def collection_stats(chunks: Sequence[dict]) -> tuple[dict, list[str]]:
+    """Compute (stats, topics) in the shape StudySearch serves them."""
+    files = set()
+    topics = set()
+    total_words = 0
+    for chunk in chunks:
+        files.add(chunk["source_file"])
+        topics.add(f"{chunk['source_file']} → {chunk['section_title']}")
+        total_words += chunk.get("word_count", 0)
+    stats = {
+        "total_chunks": len(chunks),
+        "total_files": len(files),
+        "files": sorted(files),
+        "total_words": total_words,
+    }
+    return stats, sorted(topics)
+
+
+class ChunkTable(Sequence):
+    """Read-only chunk list backed by the index file; decodes chunks on access."""
+
+    def __init__(self, starts: memoryview, data: memoryview) -> None:
+        self._starts = starts
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        raw = self._data[self._starts[idx]:self._starts[idx + 1]]
+        return json.loads(bytes(raw))
+
+
+class _MappedPostings(Mapping):
+    """term -> (doc_ids, tfs) slices over the mapped postings arrays."""
+
+    def __init__(self, terms: dict[str, int], starts: memoryview, doc_ids: memoryview, tfs: memoryview) -> None:
+        self._terms = terms
+        self._starts = starts
+        self._doc_ids = doc_ids
+        self._tfs = tfs
+
+    def __getitem__(self, term: str) -> tuple[memoryview, memoryview]:
+        ordinal = self._terms[term]
+        lo, hi = self._starts[ordinal], self._starts[ordinal + 1]
+        return self._doc_ids[lo:hi], self._tfs[lo:hi]
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._terms
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+def write_index(path: str, chunks: list[dict], bm25: BM25Index, checksum: str) -> None:
+    """Serialize the index and chunks to `path` atomically."""
+    if bm25.deleted:
+        raise ValueError("Compact the index before writing it; it has tombstoned documents")
+    terms = list(bm25.postings)
+    term_starts = array("q", [0])
+    doc_ids = array("i")
+    tfs = array("i")
+    for term in terms:
+        ids, freqs = bm25.postings[term]
+        doc_ids.extend(ids)
+        tfs.extend(freqs)
+        term_starts.append(len(doc_ids))
+
+    chunk_starts = array("q", [0])
+    chunk_data = bytearray()
+    for chunk in chunks:
+        chunk_data += json.dumps(chunk, separators=(",", ":")).encode()
+        chunk_starts.append(len(chunk_data))
+
+    sections = [
+        ("doc_len", array("i", bm25.doc_len).tobytes()),
+        ("norms", array("d", bm25.norms).tobytes()),
+        ("vocab", "\n".join(terms).encode()),
+        ("idf", array("d", (bm25.idf[t] for t in terms)).tobytes()),
+        ("tf_bound", array("d", (bm25.tf_bound[t] for t in terms)).tobytes()),
+        ("term_starts", term_starts.tobytes()),
+        ("doc_ids", doc_ids.tobytes()),
+        ("tfs", tfs.tobytes()),
+        ("chunk_starts", chunk_starts.tobytes()),
+        ("chunk_data", bytes(chunk_data)),
+    ]
+
+    stats, topics = collection_stats(chunks)
+    header = {
+        "checksum": checksum,
+        "byteorder": sys.byteorder,
+        "k1": bm25.k1,
+        "b": bm25.b,
+        "epsilon": bm25.epsilon,
+        "avgdl": bm25.avgdl,
+        "bound_avgdl": bm25.bound_avgdl,
+        "num_terms": len(terms),
+        "stats": stats,
+        "topics": topics,
+    }
+    # Section offsets depend on the header length, which depends on the
+    # offsets; grow the body start until the header fits in front of it.
+    relative = {}
+    offset = 0
+    for name, blob in sections:
+        relative[name] = offset
+        offset += _padded(len(blob))
+    body_start = 0
+    while True:
+        header["sections"] = {
+            name: [body_start + relative[name], len(blob)] for name, blob in sections
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode()
+        needed = _padded(_PREAMBLE.size + len(header_bytes))
+        if needed <= body_start:
+            break
+        body_start = needed
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, INDEX_FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (body_start - _PREAMBLE.size - len(header_bytes)))
+        for _, blob in sections:
+            f.write(blob)
+            f.write(b"\0" * (_padded(len(blob)) - len(blob)))
+    os.replace(tmp_path, path)
+    log.info("Search index written: %s (%d chunks, %d terms)", path, len(chunks), len(terms))
+
+
+def open_index(path: str, checksum: str | None = None) -> tuple[BM25Index, ChunkTable, dict] | None:
+    """
+    Memory-map a persisted index.
+
+    Returns (bm25, chunks, header) or None when the file is missing, from an
+    older format, or (if `checksum` is given) built from different chunks.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+
+    try:
+        magic, version, header_len = _PREAMBLE.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != INDEX_FORMAT_VERSION:
+            log.info("Search index %s has an unsupported format; ignoring", path)
+            return None
+        header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size + header_len])
+    except (struct.error, ValueError):
+        log.warning("Search index %s is unreadable; ignoring", path)
+        return None
+    if header.get("byteorder") != sys.byteorder:
+        return None
+    if checksum is not None and header["checksum"] != checksum:
+        log.info("Search index %s is stale (checksum mismatch)", path)
+        return None
+
+    view = memoryview(mapped)
+
+    def section(name: str, fmt: str | None = None) -> memoryview:
+        start, length = header["sections"][name]
+        raw = view[start:start + length]
+        return raw.cast(fmt) if fmt else raw
+
+    terms = bytes(section("vocab")).decode().split("\n") if header["num_terms"] else []
+    ordinals = dict(zip(terms, range(len(terms))))
+    postings = _MappedPostings(ordinals, section("term_starts", "q"), section("doc_ids", "i"), section("tfs", "i"))
+
+    bm25 = BM25Index.from_arrays(
+        doc_len=section("doc_len", "i"),
+        norms=section("norms", "d"),
+        postings=postings,
+        idf=dict(zip(terms, section("idf", "d"))),
+        tf_bound=dict(zip(terms, section("tf_bound", "d"))),
+        bound_avgdl=header["bound_avgdl"],
+        k1=header["k1"],
+        b=header["b"],
+        epsilon=header["epsilon"],
+        avgdl=header["avgdl"],
+    )
+    chunks = ChunkTable(section("chunk_starts", "q"), section("chunk_data"))
+    return bm25, chunks, header
+
+
+def persist_index(
+    chunks: list[dict],
+    chunks_path: str,
+    index_path: str,
+    bm25: BM25Index | None = None,
+    sources: dict[str, str] | None = None,
+) -> BM25Index | None:
+    """
+    Write the binary index and manifest for the chunks saved at `chunks_path`.
+
+    Pass `bm25` when the index is already built to skip re-tokenizing, and
+    `sources` (file name → content hash) to record which file versions it holds.
+    Returns the BM25 index written (None for an empty corpus).
+    """
+    if bm25 is None:
+        bm25, _ = build_index(chunks)
+    if bm25 is None:
+        return None
+    checksum = file_checksum(chunks_path)
+    write_index(index_path, chunks, bm25, checksum)
+    save_manifest(build_manifest(chunks, checksum, sources))
+    return bm25
+
+
+def _padded(length: int) -> int:
+    return (length + _ALIGN - 1) // _ALIGN * _ALIGN
@@ -1,3 +1,5 @@
-from app.retrieval.processor.chunking import process_file, process_directory, save_chunks, load_chunks
+from app.retrieval.processor.chunking import (
+    process_file, process_directory, directory_sources, save_chunks, load_chunks,
+)
 
-__all__ = ["process_file", "process_directory", "save_chunks", "load_chunks"]
+__all__ = ["process_file", "process_directory", "directory_sources", "save_chunks", "load_chunks"]
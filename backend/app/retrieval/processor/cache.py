@@ -0,0 +1,129 @@
+"""Content-hash extraction cache — skip re-extracting files whose bytes haven't changed."""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from urllib.parse import unquote
+
+from app.domain.documents import Chunk
+from app.settings import EXTRACT_CACHE_DIR, IMAGES_DIR
+
+log = logging.getLogger(__name__)
+
+# Bump when any extractor's output changes so stale entries stop matching.
+EXTRACTOR_VERSION = 2
+
+_IMAGE_REF = re.compile(r"/api/images/([^)\s]+)")
+
+
+def file_sha256(filepath: str) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def referenced_images(chunks: list[Chunk]) -> list[str]:
+    """Image filenames the chunks link to via /api/images/."""
+    images: list[str] = []
+    for chunk in chunks:
+        for ref in _IMAGE_REF.findall(chunk.content):
+            name = unquote(ref)
+            if name not in images:
+                images.append(name)
+    return images
+
+
+class ExtractionCache:
+    """
+    Extracted chunks and generated images, keyed by content hash.
+
+    One JSON file per entry, written atomically, so several processes can
+    share the cache directory. The key covers the file's bytes, its name
+    (chunk ids and image names derive from it) and EXTRACTOR_VERSION.
+    """
+
+    def __init__(self, directory: Path, images_dir: Path = IMAGES_DIR) -> None:
+        self.directory = Path(directory)
+        self.images_dir = Path(images_dir)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def key_for(filepath: str, content_hash: str | None = None) -> str:
+        content_hash = content_hash or file_sha256(filepath)
+        raw = f"{content_hash}:{Path(filepath).name}:{EXTRACTOR_VERSION}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> tuple[list[Chunk], list[str]] | None:
+        """Return (chunks, images) for a key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            chunks = [Chunk(**c) for c in entry["chunks"]]
+            images = entry["images"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count("misses")
+            return None
+
+        # Generated images live outside the cache; if any were removed the
+        # entry can't be served as-is.
+        if any(not (self.images_dir / name).exists() for name in images):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return chunks, images
+
+    def put(self, key: str, chunks: list[Chunk], images: list[str]) -> None:
+        """Store an extraction result."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"chunks": [asdict(c) for c in chunks], "images": images}, f)
+        os.replace(tmp, path)
+        self._count("stores")
+
+    def clear(self) -> int:
+        """Delete every entry. Returns how many were removed."""
+        removed = sum(1 for _ in self.directory.rglob("*.json")) if self.directory.exists() else 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+        log.info("Extraction cache cleared: %d entries", removed)
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus on-disk size."""
+        entries = 0
+        size = 0
+        if self.directory.exists():
+            for path in self.directory.rglob("*.json"):
+                entries += 1
+                size += path.stat().st_size
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+extraction_cache = ExtractionCache(EXTRACT_CACHE_DIR)
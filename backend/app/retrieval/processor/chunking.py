@@ -10,11 +10,15 @@ from pathlib import Path
 log = logging.getLogger(__name__)
 
 from app.domain.documents import Chunk
+from app.retrieval.processor.cache import ExtractionCache, extraction_cache, file_sha256, referenced_images
 from app.retrieval.processor.extract_docx import extract_docx
 from app.retrieval.processor.extract_pptx import extract_pptx
 from app.retrieval.processor.extract_pdf import extract_pdf
 from app.retrieval.processor.extract_xlsx import extract_xlsx
 from app.retrieval.processor.extract_text import extract_text
+from app.retrieval.processor.parallel import WorkerFailed, run_isolated
+from app.retrieval.processor.progress import report_error
+from app.settings import EXTRACT_MEMORY_LIMIT_MB, EXTRACT_TIMEOUT_SECONDS
 
 EXTRACTORS = {
     ".docx": extract_docx,
@@ -38,42 +42,55 @@ def _has_image_ref(content: str) -> bool:
     return "![" in content and "/api/images/" in content
 
 
-def process_file(filepath: str) -> list[Chunk]:
-    """Process a single file and return chunks."""
-    ext = Path(filepath).suffix.lower()
-    extractor = EXTRACTORS.get(ext)
+def process_file(
+    filepath: str,
+    cache: ExtractionCache | None = extraction_cache,
+    content_hash: str | None = None,
+) -> list[Chunk]:
+    """
+    Process a single file and return chunks.
 
-    if not extractor:
+    Results are served from / stored in `cache` (keyed by content hash);
+    pass cache=None to always extract. Callers that already hashed the file
+    can pass its SHA-256 as `content_hash` to skip re-reading it.
+    """
+    ext = Path(filepath).suffix.lower()
+    if ext not in EXTRACTORS:
         log.warning("Unsupported: %s (%s)", ext, filepath)
         return []
 
     try:
-        raw_chunks = extractor(filepath)
-
-        # Filter noisy low-signal chunks (keep image references regardless)
-        filtered = [
-            c for c in raw_chunks
-            if c.word_count >= _MIN_CHUNK_WORDS or _has_image_ref(c.content)
-        ]
-
-        # Assign sequential chunk_index per source file
-        for idx, chunk in enumerate(filtered):
-            chunk.chunk_index = idx
-
-        dropped = len(raw_chunks) - len(filtered)
-        if dropped:
-            log.info("%s: %d chunks (%d short chunks dropped)", Path(filepath).name, len(filtered), dropped)
-        else:
-            log.info("%s: %d chunks", Path(filepath).name, len(filtered))
+        key, cached = _cache_lookup(filepath, cache, content_hash)
+    except OSError as e:
+        log.error("Error reading %s: %s", filepath, e)
+        report_error(str(e))
+        return []
+    if cached is not None:
+        return cached
 
-        return filtered
+    try:
+        chunks = _extract_file(filepath)
     except Exception as e:
         log.error("Error processing %s: %s", filepath, e)
+        report_error(str(e))
         return []
-
-
-def process_directory(directory: str) -> list[Chunk]:
-    """Process all supported files in a directory (recursive)."""
+    _cache_store(cache, key, filepath, chunks)
+    return chunks
+
+
+def process_directory(
+    directory: str,
+    cache: ExtractionCache | None = extraction_cache,
+    jobs: int = 1,
+) -> list[Chunk]:
+    """
+    Process all supported files in a directory (recursive).
+
+    With jobs > 1 (0 = one per CPU), cache misses are extracted in isolated
+    worker processes subject to EXTRACT_TIMEOUT_SECONDS and
+    EXTRACT_MEMORY_LIMIT_MB; a file that fails or hangs contributes no
+    chunks. Output order is the same as a sequential run.
+    """
     all_chunks: list[Chunk] = []
     dir_path = Path(directory)
 
@@ -81,24 +98,129 @@ def process_directory(directory: str) -> list[Chunk]:
         log.error("Directory not found: %s", directory)
         return []
 
-    supported_files = []
-    for ext in EXTRACTORS:
-        supported_files.extend(dir_path.rglob(f"*{ext}"))
+    files = _supported_files(dir_path)
+    log.info("Found %d files in %s", len(files), directory)
 
-    log.info("Found %d files in %s", len(supported_files), directory)
-
-    for filepath in sorted(supported_files):
-        chunks = process_file(str(filepath))
-        all_chunks.extend(chunks)
+    jobs = jobs if jobs > 0 else os.cpu_count() or 1
+    if jobs == 1:
+        for filepath in files:
+            all_chunks.extend(process_file(filepath, cache))
+    else:
+        for chunks in _process_parallel(files, cache, jobs):
+            all_chunks.extend(chunks)
 
     log.info("Total: %d chunks, %d words", len(all_chunks), sum(c.word_count for c in all_chunks))
+    if cache is not None:
+        stats = cache.stats()
+        log.info("Extraction cache: %d hits, %d misses, %d entries (%.1f MB)",
+                 stats["hits"], stats["misses"], stats["entries"], stats["size_bytes"] / 1e6)
     return all_chunks
 
 
-def save_chunks(chunks: list[Chunk], output_path: str) -> None:
-    """Save processed chunks to JSON."""
+def directory_sources(directory: str) -> dict[str, str]:
+    """
+    File name → SHA-256 for every supported file in a directory, as the
+    index manifest records them; lets later uploads of an unchanged file
+    skip extraction.
+    """
+    dir_path = Path(directory)
+    if not dir_path.exists():
+        return {}
+    return {Path(f).name: file_sha256(f) for f in _supported_files(dir_path)}
+
+
+def _supported_files(dir_path: Path) -> list[str]:
+    supported_files = []
+    for ext in EXTRACTORS:
+        supported_files.extend(dir_path.rglob(f"*{ext}"))
+    return [str(p) for p in sorted(supported_files)]
+
+
+def _process_parallel(files: list[str], cache: ExtractionCache | None, jobs: int) -> list[list[Chunk]]:
+    """Per-file chunk lists, in `files` order, extracting cache misses in workers."""
+    results: list[list[Chunk]] = [[] for _ in files]
+    misses: list[tuple[int, str | None]] = []
+    for pos, filepath in enumerate(files):
+        try:
+            key, cached = _cache_lookup(filepath, cache)
+        except OSError as e:
+            log.error("Error reading %s: %s", filepath, e)
+            continue
+        if cached is not None:
+            results[pos] = cached
+        else:
+            misses.append((pos, key))
+
+    log.info("Extracting %d files with %d workers", len(misses), jobs)
+    outcomes = run_isolated(
+        _extract_file,
+        [(files[pos],) for pos, _ in misses],
+        jobs=jobs,
+        timeout=EXTRACT_TIMEOUT_SECONDS,
+        memory_limit_mb=EXTRACT_MEMORY_LIMIT_MB,
+    )
+    for (pos, key), outcome in zip(misses, outcomes):
+        if isinstance(outcome, WorkerFailed):
+            log.error("Error processing %s: %s", files[pos], outcome)
+            continue
+        results[pos] = outcome
+        _cache_store(cache, key, files[pos], outcome)
+    return results
+
+
+def _extract_file(filepath: str) -> list[Chunk]:
+    """Run the file's extractor and drop low-signal chunks."""
+    extractor = EXTRACTORS[Path(filepath).suffix.lower()]
+    raw_chunks = extractor(filepath)
+
+    # Filter noisy low-signal chunks (keep image references regardless)
+    filtered = [
+        c for c in raw_chunks
+        if c.word_count >= _MIN_CHUNK_WORDS or _has_image_ref(c.content)
+    ]
+
+    # Assign sequential chunk_index per source file
+    for idx, chunk in enumerate(filtered):
+        chunk.chunk_index = idx
+
+    dropped = len(raw_chunks) - len(filtered)
+    if dropped:
+        log.info("%s: %d chunks (%d short chunks dropped)", Path(filepath).name, len(filtered), dropped)
+    else:
+        log.info("%s: %d chunks", Path(filepath).name, len(filtered))
+    return filtered
+
+
+def _cache_lookup(
+    filepath: str,
+    cache: ExtractionCache | None,
+    content_hash: str | None = None,
+) -> tuple[str | None, list[Chunk] | None]:
+    """(cache key, cached chunks or None); raises OSError if the file can't be read."""
+    if cache is None:
+        return None, None
+    key = cache.key_for(filepath, content_hash)
+    cached = cache.get(key)
+    if cached is None:
+        return key, None
+    chunks, _ = cached
+    log.info("%s: %d chunks (cached)", Path(filepath).name, len(chunks))
+    return key, chunks
+
+
+def _cache_store(cache: ExtractionCache | None, key: str | None, filepath: str, chunks: list[Chunk]) -> None:
+    if cache is None:
+        return
+    try:
+        cache.put(key, chunks, referenced_images(chunks))
+    except OSError as e:
+        log.warning("Could not cache %s: %s", filepath, e)
+
+
+def save_chunks(chunks: list[Chunk] | list[dict], output_path: str) -> None:
+    """Save processed chunks (dataclasses or dicts) to JSON."""
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    data = [asdict(c) for c in chunks]
+    data = [c if isinstance(c, dict) else asdict(c) for c in chunks]
     with open(output_path, "w") as f:
         json.dump(data, f, indent=2)
     log.info("Saved %d chunks to %s", len(chunks), output_path)
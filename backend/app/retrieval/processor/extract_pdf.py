@@ -1,12 +1,27 @@
-"""Extract text from PDF, chunked by page."""
+"""
+Extract text from PDF, chunked by page.
+
+Two tiers: text, images and page rendering come from pypdfium2, which is
+fast. pdfplumber's table finder — the slow part — only runs on pages whose
+vector graphics look like table rulings.
+"""
 
 import logging
+import os
 from pathlib import Path
 from urllib.parse import quote
 
 from app.domain.documents import Chunk
 from app.retrieval.processor.chunking_utils import split_text_to_chunks
-from app.settings import IMAGES_DIR
+from app.retrieval.processor.parallel import WorkerFailed, in_worker, run_isolated
+from app.retrieval.processor.progress import report_pages
+from app.settings import (
+    EXTRACT_MEMORY_LIMIT_MB,
+    EXTRACT_TIMEOUT_SECONDS,
+    IMAGES_DIR,
+    PDF_PAGE_WORKERS,
+    PDF_PARALLEL_MIN_PAGES,
+)
 
 log = logging.getLogger(__name__)
 
@@ -14,41 +29,162 @@ log = logging.getLogger(__name__)
 # Filters out tiny icons, logos, and decorative elements
 _MIN_IMAGE_AREA = 50_000  # ~224x224 pixels
 
+# Smallest page range handed to a worker; below this, reopening the PDF in
+# each worker costs more than it saves.
+_MIN_RANGE_PAGES = 8
+
+# A path thinner than this (points) in one dimension counts as a ruling line.
+_RULE_THICKNESS = 2.0
+# pdfplumber's "lines" strategy needs crossing rules; a page needs rules at
+# this many distinct heights and at this many distinct x positions (a grid)
+# before the table pass runs.
+_MIN_TABLE_EDGES = 2
+
+
+def _bounds(obj) -> tuple[float, float, float, float]:
+    """(left, bottom, right, top) of a page object; get_pos() before pypdfium2 5."""
+    get_bounds = getattr(obj, "get_bounds", None) or obj.get_pos
+    return get_bounds()
+
 
 def _has_meaningful_images(page) -> bool:
     """Check if a page has images large enough to be diagrams/figures."""
-    for img in page.images:
-        w = abs(img.get("x1", 0) - img.get("x0", 0))
-        h = abs(img.get("bottom", 0) - img.get("top", 0))
-        if w * h >= _MIN_IMAGE_AREA:
+    import pypdfium2.raw as pdfium_c
+
+    for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]):
+        left, bottom, right, top = _bounds(obj)
+        if abs(right - left) * abs(top - bottom) >= _MIN_IMAGE_AREA:
+            return True
+    return False
+
+
+def _may_have_tables(page) -> bool:
+    """
+    Cheap pre-check: does the page draw a grid of thin horizontal and
+    vertical rules for pdfplumber to find a ruled table in? Boxes, frames
+    and callouts (paths that are wide in both directions) don't count.
+    """
+    import pypdfium2.raw as pdfium_c
+
+    rows: set[int] = set()
+    columns: set[int] = set()
+    for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH]):
+        left, bottom, right, top = _bounds(obj)
+        width, height = abs(right - left), abs(top - bottom)
+        if height <= _RULE_THICKNESS < width:
+            rows.add(round((top + bottom) / 2))
+        elif width <= _RULE_THICKNESS < height:
+            columns.add(round((left + right) / 2))
+        if len(rows) >= _MIN_TABLE_EDGES and len(columns) >= _MIN_TABLE_EDGES:
             return True
     return False
 
 
 def extract_pdf(filepath: str) -> list[Chunk]:
-    import pdfplumber
+    """
+    Extract a PDF page by page.
+
+    Documents of PDF_PARALLEL_MIN_PAGES or more are split into page ranges
+    extracted in worker processes and merged back in page order, unless this
+    is already running inside an extraction worker (process_directory --jobs).
+    """
+    import pypdfium2 as pdfium
+
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        page_count = len(pdf)
+        workers = PDF_PAGE_WORKERS or os.cpu_count() or 1
+        if page_count < PDF_PARALLEL_MIN_PAGES or workers < 2 or in_worker():
+            return _extract_pages(pdf, filepath, 1, page_count, report=True)
+    finally:
+        pdf.close()
 
+    ranges = _page_ranges(page_count, workers)
+    pages_done = 0
+
+    def range_done(idx: int, _result) -> None:
+        nonlocal pages_done
+        first, last = ranges[idx]
+        pages_done += last - first + 1
+        report_pages(pages_done, page_count)
+
+    log.info("%s: %d pages in %d ranges across %d workers", Path(filepath).name, page_count, len(ranges), workers)
+    outcomes = run_isolated(
+        _extract_page_range,
+        [(filepath, first, last) for first, last in ranges],
+        jobs=workers,
+        timeout=EXTRACT_TIMEOUT_SECONDS,
+        memory_limit_mb=EXTRACT_MEMORY_LIMIT_MB,
+        on_result=range_done,
+    )
+    chunks: list[Chunk] = []
+    for (first, last), outcome in zip(ranges, outcomes):
+        if isinstance(outcome, WorkerFailed):
+            raise RuntimeError(f"pages {first}-{last}: {outcome}")
+        chunks.extend(outcome)
+    return chunks
+
+
+def _page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    """Split 1..page_count into contiguous ranges, a few per worker for balance."""
+    size = max(_MIN_RANGE_PAGES, -(-page_count // (workers * 4)))
+    return [(first, min(first + size - 1, page_count)) for first in range(1, page_count + 1, size)]
+
+
+def _extract_page_range(filepath: str, first: int, last: int) -> list[Chunk]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        return _extract_pages(pdf, filepath, first, last)
+    finally:
+        pdf.close()
+
+
+def _extract_pages(pdf, filepath: str, first: int, last: int, report: bool = False) -> list[Chunk]:
+    """
+    Chunks for pages first..last (1-based, inclusive) of an open pypdfium2
+    document. With report=True, each finished page is reported as progress.
+    """
     fname = Path(filepath).name
     stem = Path(filepath).stem
     chunks: list[Chunk] = []
+    plumber = None  # opened on the first page that needs a table pass
 
-    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        for page_num in range(first, last + 1):
+            page = pdf[page_num - 1]
+            try:
+                textpage = page.get_textpage()
+                text = textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+                textpage.close()
+
+                # Only render page if it has large enough images to be diagrams
+                page_image_md = ""
+                if _has_meaningful_images(page):
+                    try:
+                        filename = f"{stem}_p{page_num}.png"
+                        out_path = IMAGES_DIR / filename
+                        img = page.render(scale=150 / 72).to_pil()
+                        img.save(str(out_path), format="PNG")
+                        page_image_md = f"![Page {page_num}](/api/images/{quote(filename)})"
+                    except Exception:
+                        log.warning("Could not render page %d of %s", page_num, fname, exc_info=True)
 
-    with pdfplumber.open(filepath) as pdf:
-        for page_num, page in enumerate(pdf.pages, 1):
-            text = page.extract_text()
-
-            # Only render page if it has large enough images to be diagrams
-            page_image_md = ""
-            if page.images and _has_meaningful_images(page):
-                try:
-                    filename = f"{stem}_p{page_num}.png"
-                    out_path = IMAGES_DIR / filename
-                    img = page.to_image(resolution=150)
-                    img.save(str(out_path), format="PNG")
-                    page_image_md = f"![Page {page_num}](/api/images/{quote(filename)})"
-                except Exception:
-                    log.warning("Could not render page %d of %s", page_num, fname, exc_info=True)
+                tables = []
+                if _may_have_tables(page):
+                    if plumber is None:
+                        import pdfplumber
+                        plumber = pdfplumber.open(filepath)
+                    plumber_page = plumber.pages[page_num - 1]
+                    tables = plumber_page.extract_tables()
+                    # pdfplumber caches parsed layout per page; drop it so
+                    # memory stays flat across long documents.
+                    plumber_page.close()
+            finally:
+                page.close()
 
             if text and text.strip():
                 content = text.strip()
@@ -71,7 +207,6 @@ def extract_pdf(filepath: str) -> list[Chunk]:
                     content=page_image_md, page_or_slide=page_num,
                 ))
 
-            tables = page.extract_tables()
             for t_idx, table in enumerate(tables):
                 if table:
                     rows = []
@@ -84,4 +219,10 @@ def extract_pdf(filepath: str) -> list[Chunk]:
                         content="\n".join(rows), page_or_slide=page_num,
                     ))
 
+            if report:
+                report_pages(page_num, last)
+    finally:
+        if plumber is not None:
+            plumber.close()
+
     return chunks
@@ -6,6 +6,7 @@ from urllib.parse import quote
 
 from app.domain.documents import Chunk
 from app.retrieval.processor.chunking_utils import split_text_to_chunks
+from app.retrieval.processor.progress import report_pages
 from app.settings import IMAGES_DIR
 
 log = logging.getLogger(__name__)
@@ -43,6 +44,7 @@ def extract_pptx(filepath: str) -> list[Chunk]:
 
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 
+    slide_count = len(prs.slides)
     for slide_num, slide in enumerate(prs.slides, 1):
         title = ""
         body_parts: list[str] = []
@@ -102,4 +104,6 @@ def extract_pptx(filepath: str) -> list[Chunk]:
                         content=chunk_text, page_or_slide=slide_num,
                     ))
 
+        report_pages(slide_num, slide_count)
+
     return chunks
@@ -0,0 +1,128 @@
+"""Isolated worker processes for CPU-heavy extraction work."""
+
+import logging
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+_in_worker = False
+
+
+class WorkerFailed(Exception):
+    """A task raised, ran out of memory, crashed its worker, or timed out."""
+
+
+def run_isolated(
+    fn: Callable[..., Any],
+    tasks: list[tuple],
+    jobs: int,
+    timeout: float,
+    memory_limit_mb: int = 0,
+    on_result: Callable[[int, Any], None] | None = None,
+) -> list[Any]:
+    """
+    Run fn(*args) for each task in its own worker process, up to `jobs` at once.
+
+    Results come back in task order. A task that raises, exceeds
+    `memory_limit_mb` (address space, Unix only), dies, or runs longer than
+    `timeout` seconds yields a WorkerFailed in its slot instead of stopping
+    the batch. One process per task keeps memory from leaking between files;
+    extraction tasks are long enough that process startup is noise.
+
+    on_result(index, result) is called in this process as each task finishes.
+    Workers are spawned, so `fn` must be importable by name.
+    """
+    # spawn: forking a process that already runs server threads is unsafe
+    ctx = multiprocessing.get_context("spawn")
+    results: list[Any] = [None] * len(tasks)
+    pending = deque(enumerate(tasks))
+    running: dict = {}  # receiving end -> (task index, process, deadline)
+
+    try:
+        while pending or running:
+            while pending and len(running) < max(1, jobs):
+                idx, args = pending.popleft()
+                recv, send = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_worker, args=(send, fn, args, memory_limit_mb))
+                proc.start()
+                send.close()
+                running[recv] = (idx, proc, time.monotonic() + timeout)
+
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            for conn in wait(list(running), timeout=max(0.0, next_deadline - time.monotonic())):
+                idx, proc, _ = running.pop(conn)
+                try:
+                    ok, payload = conn.recv()
+                except EOFError:
+                    proc.join()
+                    ok, payload = False, f"worker exited with code {proc.exitcode}"
+                conn.close()
+                proc.join()
+                results[idx] = payload if ok else WorkerFailed(payload)
+                if on_result is not None:
+                    on_result(idx, results[idx])
+
+            now = time.monotonic()
+            for conn, (idx, proc, deadline) in list(running.items()):
+                if now >= deadline:
+                    _stop(proc)
+                    conn.close()
+                    del running[conn]
+                    results[idx] = WorkerFailed(f"timed out after {timeout:g}s")
+                    if on_result is not None:
+                        on_result(idx, results[idx])
+    finally:
+        for conn, (_, proc, _) in running.items():
+            _stop(proc)
+            conn.close()
+    return results
+
+
+def in_worker() -> bool:
+    """
+    True inside a run_isolated worker or a CPU pool process, where nested
+    pools would oversubscribe.
+    """
+    from app.core.executors import in_cpu_worker
+
+    return _in_worker or in_cpu_worker()
+
+
+def _worker(conn, fn: Callable[..., Any], args: tuple, memory_limit_mb: int) -> None:
+    global _in_worker
+    _in_worker = True
+    _limit_memory(memory_limit_mb)
+    try:
+        result = fn(*args)
+    except BaseException as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    else:
+        conn.send((True, result))
+    finally:
+        conn.close()
+
+
+def _limit_memory(memory_limit_mb: int) -> None:
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        log.warning("Could not set worker memory limit: %s", e)
+
+
+def _stop(proc) -> None:
+    proc.terminate()
+    proc.join(5)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
@@ -0,0 +1,42 @@
+"""
+Extraction progress hooks.
+
+Extractors call report_pages() as they go and process_file calls
+report_error() when a file fails. Both are no-ops unless the caller
+installed a reporter with report_to(), so batch runs pay nothing.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Protocol
+
+
+class ProgressReporter(Protocol):
+    def on_pages(self, done: int, total: int) -> None: ...
+
+    def on_error(self, message: str) -> None: ...
+
+
+_reporter: ContextVar[ProgressReporter | None] = ContextVar("extraction_progress", default=None)
+
+
+@contextmanager
+def report_to(reporter: ProgressReporter):
+    """Route progress from extraction in this context to `reporter`."""
+    token = _reporter.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _reporter.reset(token)
+
+
+def report_pages(done: int, total: int) -> None:
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter.on_pages(done, total)
+
+
+def report_error(message: str) -> None:
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter.on_error(message)
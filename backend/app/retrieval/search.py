@@ -3,10 +3,18 @@ BM25 search engine for study materials.
 Free, local, no embeddings needed.
 """
 
+import copy
 import json
 import logging
-from rank_bm25 import BM25Okapi
-
+import os
+import threading
+from collections.abc import Mapping, Sequence
+
+from app.retrieval.index.bm25 import build_index, tokenize_chunk
+from app.retrieval.index.manifest import load_manifest
+from app.retrieval.index.postings import BM25Index
+from app.retrieval.index.snapshot import IndexSnapshot, replace_file_stats
+from app.retrieval.index.store import file_checksum, open_index, persist_index
 from app.retrieval.index.tokenizer import tokenize
 
 log = logging.getLogger(__name__)
@@ -16,14 +24,37 @@ class StudySearch:
     """Search engine using BM25 — same algorithm behind Elasticsearch."""
 
     def __init__(self) -> None:
-        self.chunks: list[dict] = []
-        self.bm25: BM25Okapi | None = None
-        self._tokenized: list[list[str]] = []
         self.source_links: dict[str, str] = {}
+        # Everything queries read; replaced whole, never modified (see
+        # IndexSnapshot)
+        self._snapshot = IndexSnapshot()
+        self._write_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """The index currently being served."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot; changes whenever indexed content does, and only then."""
+        return self._snapshot.version
+
+    @property
+    def chunks(self) -> Sequence[dict]:
+        return self._snapshot.chunks
+
+    @property
+    def bm25(self) -> BM25Index | None:
+        return self._snapshot.bm25
+
+    @property
+    def sources(self) -> Mapping[str, str]:
+        """File name → SHA-256 of the bytes currently indexed for it."""
+        return self._snapshot.sources
 
     def load_source_links(self, path: str) -> None:
         """Load filename → Google Drive URL mapping."""
-        import os
         if os.path.exists(path):
             with open(path, "r") as f:
                 self.source_links = json.load(f)
@@ -32,52 +63,158 @@ class StudySearch:
     def load_chunks(self, chunks_path: str) -> None:
         """Load chunks from JSON and build the search index."""
         with open(chunks_path, "r") as f:
-            self.chunks = json.load(f)
+            chunks = json.load(f)
 
-        self._tokenized = [
-            tokenize(f"{c['section_title']} {c['content']}")
-            for c in self.chunks
-        ]
-        self.bm25 = BM25Okapi(self._tokenized)
+        self.load_chunks_from_list(chunks)
         log.info("Index built: %d chunks", len(self.chunks))
 
-    def load_chunks_from_list(self, chunks: list[dict]) -> None:
+    def load_chunks_from_list(self, chunks: list[dict], sources: Mapping[str, str] | None = None) -> None:
         """Build index from an in-memory list of chunk dicts."""
-        self.chunks = chunks
-        self._tokenized = [
-            tokenize(f"{c['section_title']} {c['content']}")
-            for c in self.chunks
-        ]
-        self.bm25 = BM25Okapi(self._tokenized) if self._tokenized else None
+        bm25, _ = build_index(chunks)
+        with self._write_lock:
+            current = self._snapshot
+            self._publish(IndexSnapshot.build(
+                chunks, bm25,
+                current.sources if sources is None else sources,
+            ))
+
+    def load_index(self, chunks_path: str, index_path: str) -> None:
+        """
+        Memory-map the persisted index, or rebuild it from chunks_path.
+
+        The mapped index is used only when the manifest checksum matches
+        chunks.json; otherwise chunks are re-tokenized and the index file is
+        rewritten so the next start is fast again.
+        """
+        manifest = load_manifest()
+        current = bool(manifest and manifest.checksum) and file_checksum(chunks_path) == manifest.checksum
+        if current:
+            opened = open_index(index_path, manifest.checksum)
+            if opened:
+                bm25, chunks, header = opened
+                with self._write_lock:
+                    self._publish(IndexSnapshot.build(
+                        chunks, bm25, manifest.sources,
+                        header["stats"], header["topics"],
+                    ))
+                log.info("Index mapped: %d chunks from %s", len(chunks), index_path)
+                return
+
+        log.info("Persisted index missing or stale; rebuilding from %s", chunks_path)
+        with open(chunks_path, "r") as f:
+            chunks = json.load(f)
+        # Uploads between compactions save chunks.json and the manifest but
+        # not search.idx; the manifest's sources still describe these chunks
+        sources = manifest.sources if current else {}
+        self.load_chunks_from_list(chunks, sources=sources)
+        log.info("Index built: %d chunks", len(chunks))
+        try:
+            persist_index(chunks, chunks_path, index_path, self.bm25, sources)
+        except OSError:
+            log.warning("Could not write search index to %s", index_path, exc_info=True)
+
+    def replace_source(self, source_file: str, content_hash: str, chunks: list[dict]) -> None:
+        """
+        Swap in a new version of one file without rebuilding the index.
+
+        The file's previous chunks are tombstoned and the new ones appended;
+        compact() later drops the tombstones and restores exact statistics.
+        """
+        with self._write_lock:
+            current = self._snapshot
+            sources = dict(current.sources)
+            sources[source_file] = content_hash
+            if current.bm25 is None:
+                combined = list(current.chunks) + chunks
+                bm25, _ = build_index(combined)
+                self._publish(IndexSnapshot.build(combined, bm25, sources))
+                return
+
+            deleted = current.bm25.deleted
+            stale = [
+                i for i, c in enumerate(current.chunks)
+                if c["source_file"] == source_file and i not in deleted
+            ]
+            # The published index is shared with in-flight queries, so
+            # update a copy; add_documents replaces arrays rather than
+            # writing into them, which keeps the copy shallow.
+            bm25 = copy.copy(current.bm25)
+            bm25.add_documents([tokenize_chunk(c) for c in chunks])
+            bm25.delete_documents(stale)
+            stats, topics = replace_file_stats(
+                current.stats, current.topics, source_file,
+                [current.chunks[i] for i in stale], chunks,
+            )
+            self._publish(IndexSnapshot.build(
+                list(current.chunks) + chunks, bm25, sources, stats, topics,
+                segments=current.segments + 1,
+            ))
+
+    def compact(self, build=build_index) -> tuple[list[dict], BM25Index | None, dict[str, str]] | None:
+        """
+        Rebuild the index from live chunks, dropping tombstoned ones.
+
+        The rebuild runs outside the write lock, via `build` (build_index or
+        a wrapper that runs it elsewhere); if another update lands in the
+        meantime the result is discarded and None returned. Otherwise
+        returns the (chunks, bm25, sources) now being served.
+        """
+        base = self._snapshot
+        deleted = base.bm25.deleted if base.bm25 else set()
+        live = [c for i, c in enumerate(base.chunks) if i not in deleted]
+
+        bm25, _ = build(live)
+
+        with self._write_lock:
+            if self._snapshot is not base:
+                return None
+            # Same live chunks, so stats and topics carry over unchanged
+            self._publish(IndexSnapshot.build(
+                live, bm25, base.sources, dict(base.stats), list(base.topics),
+            ))
+        log.info("Index compacted: %d live chunks (%d tombstones dropped)", len(live), len(deleted))
+        return live, bm25, dict(base.sources)
+
+    def _publish(self, snapshot: IndexSnapshot) -> None:
+        """Make `snapshot` the one new queries use. Caller holds the write lock."""
+        self._snapshot = snapshot
 
     def search(self, query: str, top_k: int = 5) -> list[dict]:
         """Search materials. Returns top_k chunks with relevance scores."""
-        if not self.bm25 or not self.chunks:
-            return []
+        results, _ = self.search_with_stats(query, top_k)
+        return results
+
+    def search_with_stats(self, query: str, top_k: int = 5) -> tuple[list[dict], int]:
+        """Search materials. Returns (results, number of documents scored)."""
+        # One read of the snapshot: the whole query runs against it even if
+        # a newer one is published meanwhile.
+        snapshot = self._snapshot
+        if not snapshot.bm25 or not snapshot.chunks:
+            return [], 0
 
         tokenized_query = tokenize(query)
         if not tokenized_query:
-            return []
-
-        scores = self.bm25.get_scores(tokenized_query)
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
+            return [], 0
 
+        hits, docs_scored = snapshot.bm25.top_k(tokenized_query, top_k)
         results = []
-        for idx, score in ranked:
-            if score > 0:
-                chunk = self.chunks[idx].copy()
-                chunk["relevance_score"] = round(float(score), 3)
-                url = self.source_links.get(chunk.get("source_file", ""))
-                if url:
-                    chunk["source_url"] = url
-                results.append(chunk)
+        for idx, score in hits:
+            chunk = snapshot.chunks[idx].copy()
+            chunk["relevance_score"] = round(float(score), 3)
+            url = self.source_links.get(chunk.get("source_file", ""))
+            if url:
+                chunk["source_url"] = url
+            results.append(chunk)
 
-        return results
+        return results, docs_scored
 
     def search_formatted(self, query: str, top_k: int = 5) -> str:
         """Search and return formatted context string for the LLM."""
-        results = self.search(query, top_k)
+        return self.format_results(self.search(query, top_k))
 
+    @staticmethod
+    def format_results(results: list[dict]) -> str:
+        """Format search results as a context string for the LLM."""
         if not results:
             return "No relevant materials found for this question."
 
@@ -95,22 +232,10 @@ class StudySearch:
 
     def get_all_topics(self) -> list[str]:
         """Get all unique section titles."""
-        topics = set()
-        for chunk in self.chunks:
-            topics.add(f"{chunk['source_file']} → {chunk['section_title']}")
-        return sorted(topics)
+        return list(self._snapshot.topics)
 
     def get_stats(self) -> dict:
         """Get statistics about loaded materials."""
-        if not self.chunks:
-            return {"total_chunks": 0, "total_files": 0, "files": [], "total_words": 0}
-
-        files = set(c["source_file"] for c in self.chunks)
-        total_words = sum(c.get("word_count", 0) for c in self.chunks)
-
-        return {
-            "total_chunks": len(self.chunks),
-            "total_files": len(files),
-            "files": sorted(files),
-            "total_words": total_words,
-        }
+        stats = dict(self._snapshot.stats)
+        stats["files"] = list(stats["files"])
+        return stats
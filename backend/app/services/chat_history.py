@@ -0,0 +1,162 @@
+"""
+Write-behind chat history — messages are saved after the response, in
+batches, rather than in a transaction (and fsync) of their own on the
+response path.
+
+record_turn queues a question and its answer. A background task writes
+queued rows in one multi-row transaction every CHAT_HISTORY_FLUSH_MS, or
+as soon as CHAT_HISTORY_BATCH_ROWS are waiting. Once CHAT_HISTORY_MAX_PENDING
+rows are unwritten (the disk is not keeping up), record_turn waits for a
+flush to make room rather than letting the queue grow without bound — but
+at most CHAT_HISTORY_WAIT_MS, and not at all while writes are failing: then
+the turn is dropped (logged and counted as chat_history.dropped) so a
+database outage never holds up responses. A failed write is put back and
+retried on the next flush, and stop_history_writer writes whatever is left
+on shutdown.
+
+Without a running writer (tests, scripts) rows are written straight away.
+"""
+
+import asyncio
+import logging
+import time
+
+from app.core.executors import run_db, submit_db
+from app.core.telemetry import count
+from app.settings import (
+    CHAT_HISTORY_BATCH_ROWS, CHAT_HISTORY_FLUSH_MS, CHAT_HISTORY_MAX_PENDING, CHAT_HISTORY_WAIT_MS,
+)
+from app.storage.chat_repo import ChatRow, save_chat_messages
+
+log = logging.getLogger(__name__)
+
+_pending: list[ChatRow] = []
+_task: asyncio.Task | None = None
+_wake: asyncio.Event | None = None
+_space: asyncio.Event | None = None  # set (and replaced) after every write attempt
+_write_failed = False  # the last write attempt failed
+_stopping = False
+
+
+def start_history_writer() -> None:
+    """Start the flush loop on the running event loop."""
+    global _task, _wake, _space, _write_failed, _stopping
+    _wake = asyncio.Event()
+    _space = asyncio.Event()
+    _write_failed = False
+    _stopping = False
+    _task = asyncio.create_task(_run(), name="chat-history-writer")
+
+
+async def stop_history_writer() -> None:
+    """Flush everything queued and stop; called on application shutdown."""
+    global _task, _stopping
+    task, _task = _task, None  # turns arriving from now on are written straight away
+    if task is None:
+        return
+    _stopping = True
+    _wake.set()
+    await task
+
+
+async def record_turn(student_id: str, student_name: str, message: str, answer: str, intent: str) -> None:
+    """Queue a question and its answer (if any) for chat history."""
+    rows = _turn_rows(student_id, student_name, message, answer, intent)
+    if _task is None:
+        await run_db(save_chat_messages, rows)
+        return
+    if len(_pending) >= CHAT_HISTORY_MAX_PENDING and not await _wait_for_room():
+        log.warning("Chat history queue full and not draining; dropping a turn for %s", student_id)
+        count("chat_history.dropped", len(rows))
+        return
+    _queue(rows)
+
+
+def record_turn_nowait(student_id: str, student_name: str, message: str, answer: str, intent: str) -> None:
+    """
+    Queue a turn without waiting, for callers that cannot await (a stream
+    being torn down). Skips backpressure, so it may briefly overfill.
+    """
+    rows = _turn_rows(student_id, student_name, message, answer, intent)
+    if _task is None:
+        submit_db(save_chat_messages, rows)
+        return
+    _queue(rows)
+
+
+def stats() -> dict:
+    """Rows waiting to be written, with the configured limits."""
+    return {
+        "pending": len(_pending),
+        "batch_rows": CHAT_HISTORY_BATCH_ROWS,
+        "max_pending": CHAT_HISTORY_MAX_PENDING,
+    }
+
+
+def _turn_rows(student_id: str, student_name: str, message: str, answer: str, intent: str) -> list[ChatRow]:
+    # Stamped now, not when the batch is written
+    now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    rows = [(student_id, student_name, "user", message, intent, now)]
+    if answer:
+        rows.append((student_id, student_name, "assistant", answer, intent, now))
+    return rows
+
+
+async def _wait_for_room() -> bool:
+    """Wait for a flush to make room; False if writes fail or CHAT_HISTORY_WAIT_MS passes first."""
+    count("chat_history.backpressure")
+    _wake.set()
+    try:
+        async with asyncio.timeout(CHAT_HISTORY_WAIT_MS / 1000):
+            while len(_pending) >= CHAT_HISTORY_MAX_PENDING:
+                if _write_failed:
+                    return False
+                await _space.wait()
+    except TimeoutError:
+        return False
+    return True
+
+
+def _queue(rows: list[ChatRow]) -> None:
+    _pending.extend(rows)
+    if len(_pending) >= CHAT_HISTORY_BATCH_ROWS:
+        _wake.set()
+
+
+async def _run() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wake.wait(), CHAT_HISTORY_FLUSH_MS / 1000)
+        except TimeoutError:
+            pass
+        _wake.clear()
+        await _flush()
+        if _stopping:
+            return
+
+
+async def _flush() -> None:
+    global _write_failed
+    while _pending:
+        batch = _pending[:CHAT_HISTORY_BATCH_ROWS]
+        del _pending[:len(batch)]
+        try:
+            await run_db(save_chat_messages, batch)
+        except Exception:
+            # Retried on the next tick; callers waiting for room give up
+            log.exception("Chat history write failed; %d rows will be retried", len(batch))
+            count("chat_history.write_failed")
+            _pending[:0] = batch
+            _write_failed = True
+            _wake_waiters()
+            return
+        _write_failed = False
+        _wake_waiters()
+        count("chat_history.flushes")
+        count("chat_history.rows", len(batch))
+
+
+def _wake_waiters() -> None:
+    global _space
+    _space.set()
+    _space = asyncio.Event()
@@ -3,17 +3,26 @@ Chat service — the full agent pipeline:
 classify → search → prompt → LLM → postprocess
 """
 
+import asyncio
+from contextlib import aclosing
+
 from app.agent.classifier import classify_intent
 from app.agent.prompt_builder import build_prompt, build_messages
 from app.agent.post_processor import format_response
 from app.agent.policies import sanitize_user_message, sanitize_search_context
+from app.core.errors import LLMError, QuotaExceededError
+from app.core.executors import run_db, run_search
 from app.core.rate_limit import check_rate_limit
+from app.core.telemetry import count
 from app.retrieval.search import StudySearch
 from app.llm.gemini_client import chat as gemini_chat, chat_stream as gemini_chat_stream
-from app.storage.chat_repo import save_chat_message
+from app.services import chat_history, response_cache
 from app.storage.progress_repo import get_weak_areas
 from app.domain import intents
 
+# Longest study-material excerpt quoted in a degraded reply
+_EXCERPT_CHARS = 400
+
 
 async def handle_chat(
     message: str,
@@ -26,6 +35,9 @@ async def handle_chat(
     Run the full chat pipeline and return the response dict.
 
     Returns dict with: response, intent, sources_used, topics_referenced, quiz_data
+
+    If Gemini fails, the response is a degraded reply quoting the matching
+    study material; only QuotaExceededError (429) is raised.
     """
     # 0. Sanitize user input & check rate limit
     message = sanitize_user_message(message)
@@ -38,34 +50,48 @@ async def handle_chat(
     if intent == intents.TOPICS:
         return _handle_topics(search_engine)
 
-    # 3. Search for relevant material
-    search_context = sanitize_search_context(search_engine.search_formatted(message, top_k=5))
-    search_results = search_engine.search(message, top_k=5)
+    # 3. Search for relevant material (once, off the event loop)
+    index_version = search_engine.version
+    search_results = await run_search(search_engine.search, message, 5)
+    search_context = sanitize_search_context(StudySearch.format_results(search_results))
     topics_found = list(set(r["section_title"] for r in search_results))
     source_details = _extract_source_details(search_results)
 
-    # 4. Build prompt
-    weak_areas = get_weak_areas(student_id)
-    system_prompt = build_prompt(
-        intent=intent,
-        search_context=search_context,
-        student_name=student_name,
-        weak_areas=weak_areas,
-    )
-    messages = build_messages(
-        user_message=message,
-        conversation_history=conversation_history,
-    )
-
-    # 5. Call Gemini
-    response_text = await gemini_chat(messages=messages, system_prompt=system_prompt)
+    # 4. Serve a repeated question from the response cache
+    weak_areas = await run_db(get_weak_areas, student_id)
+    key = None
+    response_text = None
+    if response_cache.cacheable(intent, conversation_history):
+        key = response_cache.cache_key(message, intent, search_results, student_name, weak_areas)
+        response_text = await response_cache.get_response(key, index_version)
+
+    if response_text is None:
+        # 5. Build prompt and call Gemini
+        system_prompt = build_prompt(
+            intent=intent,
+            search_context=search_context,
+            student_name=student_name,
+            weak_areas=weak_areas,
+        )
+        messages = build_messages(
+            user_message=message,
+            conversation_history=conversation_history,
+        )
+        try:
+            response_text = await gemini_chat(messages=messages, system_prompt=system_prompt)
+        except QuotaExceededError:
+            raise
+        except LLMError as e:
+            response_text = _degraded_response(e, search_results)
+        else:
+            if key is not None:
+                await response_cache.store_response(key, index_version, response_text)
 
     # 6. Post-process
     processed = format_response(response_text, intent)
 
     # 7. Save to chat history
-    save_chat_message(student_id, student_name, "user", message, intent)
-    save_chat_message(student_id, student_name, "assistant", processed["text"], intent)
+    await chat_history.record_turn(student_id, student_name, message, processed["text"], intent)
 
     return {
         "response": processed["text"],
@@ -78,16 +104,17 @@ async def handle_chat(
 
 
 import json
-from typing import Generator
+from typing import AsyncGenerator, Awaitable, Callable
 
 
-def handle_chat_stream(
+async def handle_chat_stream(
     message: str,
     student_id: str,
     student_name: str,
     conversation_history: list[dict],
     search_engine: StudySearch,
-) -> Generator[str, None, None]:
+    is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+) -> AsyncGenerator[str, None]:
     """
     Streaming chat pipeline. Yields SSE-formatted events.
 
@@ -95,6 +122,16 @@ def handle_chat_stream(
       data: {"type":"meta","intent":"...","sources_used":N,"topics_referenced":[...]}
       data: {"type":"token","text":"..."}
       data: {"type":"done","quiz_data":...}
+
+    If the client goes away — `is_disconnected()` turns true between chunks,
+    or the server cancels or closes this generator — the Gemini stream is
+    closed at once, the partial answer is saved to chat history, and the
+    cancellation is counted as chat_stream.cancelled.
+
+    Errors raised before the first event (rate limits, QuotaExceededError)
+    come out of the first `anext`, so the route can answer them as HTTP
+    errors. Other Gemini failures are answered with a degraded reply, or
+    end a partial answer with a notice; neither is cached.
     """
     # 0. Sanitize & rate limit
     message = sanitize_user_message(message)
@@ -112,39 +149,135 @@ def handle_chat_stream(
         return
 
     # 3. Search
-    search_context = sanitize_search_context(search_engine.search_formatted(message, top_k=5))
-    search_results = search_engine.search(message, top_k=5)
+    index_version = search_engine.version
+    search_results = await run_search(search_engine.search, message, 5)
+    search_context = sanitize_search_context(StudySearch.format_results(search_results))
     topics_found = list(set(r["section_title"] for r in search_results))
     source_details = _extract_source_details(search_results)
 
-    # 4. Build prompt
-    weak_areas = get_weak_areas(student_id)
-    system_prompt = build_prompt(
-        intent=intent, search_context=search_context,
-        student_name=student_name, weak_areas=weak_areas,
-    )
-    messages = build_messages(user_message=message, conversation_history=conversation_history)
+    # 4. A cached answer is replayed as tokens just like a live one
+    weak_areas = await run_db(get_weak_areas, student_id)
+    key = None
+    cached = None
+    if response_cache.cacheable(intent, conversation_history):
+        key = response_cache.cache_key(message, intent, search_results, student_name, weak_areas)
+        cached = await response_cache.get_response(key, index_version)
+
+    if cached is not None:
+        source = _replay(cached)
+    else:
+        # 5. Build prompt
+        system_prompt = build_prompt(
+            intent=intent,
+            search_context=search_context,
+            student_name=student_name,
+            weak_areas=weak_areas,
+        )
+        messages = build_messages(user_message=message, conversation_history=conversation_history)
+        source = gemini_chat_stream(messages=messages, system_prompt=system_prompt)
+
+    if is_disconnected is not None and await is_disconnected():
+        count("chat_stream.cancelled")
+        await source.aclose()
+        return
+
+    # Wait for the first chunk before sending anything: a request the quota
+    # scheduler refuses then fails as a plain 429 instead of a broken stream,
+    # and one Gemini cannot answer gets a degraded reply instead
+    failed = False
+    try:
+        first = await anext(source, None)
+    except LLMError as e:
+        await source.aclose()
+        if isinstance(e, QuotaExceededError):
+            raise
+        failed = True
+        source = _replay(_degraded_response(e, search_results))
+        first = await anext(source, None)
+    except BaseException:
+        await source.aclose()
+        raise
+    source = resume_stream(first, source)
 
     # Send metadata first
     yield f"data: {json.dumps({'type': 'meta', 'intent': intent, 'sources_used': len(search_results), 'topics_referenced': topics_found, 'source_details': source_details})}\n\n"
 
-    # 5. Stream from Gemini
+    # 6. Stream the answer
     full_text = ""
-    for chunk in gemini_chat_stream(messages=messages, system_prompt=system_prompt):
-        full_text += chunk
-        yield f"data: {json.dumps({'type': 'token', 'text': chunk})}\n\n"
+    cancelled = False
+    try:
+        async with aclosing(source) as stream:
+            async for chunk in stream:
+                if is_disconnected is not None and await is_disconnected():
+                    cancelled = True
+                    break
+                full_text += chunk
+                yield f"data: {json.dumps({'type': 'token', 'text': chunk})}\n\n"
+    except LLMError as e:
+        # Gemini failed partway: keep the partial answer and say it was cut off
+        failed = True
+        count("chat.degraded")
+        notice = f"\n\n_{e.message}_"
+        full_text += notice
+        yield f"data: {json.dumps({'type': 'token', 'text': notice})}\n\n"
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    finally:
+        if cancelled:
+            # Keep what the student already saw; nobody waits on this request
+            # any more, so the write is not awaited
+            count("chat_stream.cancelled")
+            chat_history.record_turn_nowait(student_id, student_name, message, full_text, intent)
+    if cancelled:
+        return
+    if key is not None and cached is None and not failed:
+        await response_cache.store_response(key, index_version, full_text)
 
-    # 6. Post-process for quiz data
+    # 7. Post-process for quiz data
     processed = format_response(full_text, intent)
 
-    # 7. Save to chat history
-    save_chat_message(student_id, student_name, "user", message, intent)
-    save_chat_message(student_id, student_name, "assistant", processed["text"], intent)
+    # 8. Save to chat history
+    await chat_history.record_turn(student_id, student_name, message, processed["text"], intent)
+    count("chat_stream.completed")
 
-    # 8. Send completion with quiz data
+    # 9. Send completion with quiz data
     yield f"data: {json.dumps({'type': 'done', 'quiz_data': processed.get('quiz_data')})}\n\n"
 
 
+def _degraded_response(error: LLMError, search_results: list[dict], excerpts: int = 3) -> str:
+    """Reply used when Gemini fails: the error, then the best-matching study material as-is."""
+    count("chat.degraded")
+    parts = [error.message]
+    if search_results:
+        parts.append("While the tutor is unavailable, here is what your study materials say:")
+        for r in search_results[:excerpts]:
+            content = r["content"]
+            if len(content) > _EXCERPT_CHARS:
+                content = content[:_EXCERPT_CHARS].rsplit(" ", 1)[0] + "…"
+            parts.append(f"**{r['section_title']}** ({r['source_file']})\n{content}")
+    return "\n\n".join(parts)
+
+
+async def _replay(text: str) -> AsyncGenerator[str, None]:
+    """Yield a cached answer in stream-sized pieces."""
+    for piece in response_cache.replay_chunks(text):
+        yield piece
+        await asyncio.sleep(0)
+
+
+async def resume_stream(first: str | None, rest: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """
+    Yield an already-read first item (None: nothing was read), then the rest
+    of the stream; closing this closes `rest`.
+    """
+    async with aclosing(rest):
+        if first is not None:
+            yield first
+        async for chunk in rest:
+            yield chunk
+
+
 def _extract_source_details(search_results: list[dict]) -> list[dict]:
     """Extract unique source details from search results for the frontend."""
     seen: set[str] = set()
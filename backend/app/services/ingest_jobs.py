@@ -0,0 +1,143 @@
+"""
+Ingestion jobs — uploads are queued here and extracted by a background
+worker pool, so the request returns as soon as the files are on disk.
+
+Jobs live in memory (like rate-limit state); the most recent
+INGEST_JOB_HISTORY are kept for status polling.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from app.settings import INGEST_JOB_HISTORY, INGEST_WORKERS
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_executor: ThreadPoolExecutor | None = None
+
+
+@dataclass
+class FileProgress:
+    filename: str
+    status: str = QUEUED
+    pages_done: int = 0
+    pages_total: int = 0
+    chunks: int = 0
+    error: str | None = None
+
+
+@dataclass
+class IngestJob:
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    files: list[FileProgress] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    total_chunks: int = 0
+    stats: dict | None = None
+    error: str | None = None
+    # Bumped on every change so pollers can tell when to send an update
+    version: int = 0
+    _done: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update(self, **changes) -> None:
+        with _lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version += 1
+
+    def update_file(self, index: int, **changes) -> None:
+        with _lock:
+            progress = self.files[index]
+            for name, value in changes.items():
+                setattr(progress, name, value)
+            self.version += 1
+
+    def to_dict(self) -> dict:
+        with _lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "files": [asdict(f) for f in self.files],
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "total_chunks": self.total_chunks,
+                "stats": self.stats,
+                "error": self.error,
+                "version": self.version,
+            }
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the job finishes. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+
+class FileReporter:
+    """Routes extraction progress for one file of a job (see processor.progress)."""
+
+    def __init__(self, job: IngestJob, index: int) -> None:
+        self.job = job
+        self.index = index
+        self.errors: list[str] = []
+
+    def on_pages(self, done: int, total: int) -> None:
+        self.job.update_file(self.index, pages_done=done, pages_total=total)
+
+    def on_error(self, message: str) -> None:
+        self.errors.append(message)
+        self.job.update_file(self.index, error=message)
+
+
+def create_job(files: list[FileProgress]) -> IngestJob:
+    """Register a new job, evicting the oldest finished ones past the history limit."""
+    job = IngestJob(files=files)
+    with _lock:
+        _jobs[job.id] = job
+        excess = len(_jobs) - INGEST_JOB_HISTORY
+        for job_id in [j.id for j in _jobs.values() if j.finished][:max(0, excess)]:
+            del _jobs[job_id]
+    return job
+
+
+def get_job(job_id: str) -> IngestJob | None:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def submit_job(job: IngestJob, work: Callable[[IngestJob], None]) -> None:
+    """Run work(job) on the ingestion pool; it should finish via job.update()."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+        executor = _executor
+    executor.submit(_run, job, work)
+
+
+def _run(job: IngestJob, work: Callable[[IngestJob], None]) -> None:
+    job.update(status=RUNNING)
+    try:
+        work(job)
+        job.update(status=DONE, finished_at=time.time())
+    except Exception as e:
+        log.exception("Ingestion job %s failed", job.id)
+        job.update(status=FAILED, error=str(e), finished_at=time.time())
+    finally:
+        job._done.set()
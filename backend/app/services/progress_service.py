@@ -1,8 +1,15 @@
 """Progress service — fetch student analytics."""
 
+from app.core.executors import run_db
 from app.storage.progress_repo import get_progress as _get_progress
+from app.storage.schedule_repo import get_study_plan as _get_study_plan
 
 
-def get_student_progress(student_id: str) -> dict:
+async def get_student_progress(student_id: str) -> dict:
     """Get full progress data for a student."""
-    return _get_progress(student_id)
+    return await run_db(_get_progress, student_id)
+
+
+async def get_study_plan(student_id: str) -> dict:
+    """Get the spaced repetition plan for a student."""
+    return await run_db(_get_study_plan, student_id)
@@ -0,0 +1,126 @@
+"""
+Quiz bank pre-generation — a background task keeps questions ready so
+/api/quiz/generate can answer from the bank instead of waiting on Gemini.
+
+Each pass covers topics due for review, then the indexed topics students
+asked for quizzes on since the last pass (request_refill). A topic gets a
+batch of QUIZ_BANK_TARGET questions from one Gemini call when a student it
+was due for or requested by has fewer than that many unseen; topics nobody
+is studying are never generated for. A pass spends at most
+QUIZ_PREGEN_MAX_CALLS calls. Passes run every QUIZ_PREGEN_INTERVAL_SECONDS,
+and QUIZ_REFILL_DEBOUNCE_SECONDS after a request, so a burst of quizzes
+costs one pass. Calls run at background quota priority, so they wait behind
+students' chats and never spend the daily reserve kept for them.
+"""
+
+import asyncio
+import logging
+
+from app.core.errors import LLMError
+from app.core.executors import run_db
+from app.llm import quota
+from app.llm.gemini_client import is_configured
+from app.services.quiz_service import generate_questions
+from app.settings import (
+    QUIZ_BANK_TARGET, QUIZ_PREGEN_INTERVAL_SECONDS, QUIZ_PREGEN_MAX_CALLS, QUIZ_REFILL_DEBOUNCE_SECONDS,
+)
+from app.storage.quiz_bank_repo import add_questions, unseen_count
+from app.storage.schedule_repo import get_due_reviews
+
+log = logging.getLogger(__name__)
+
+_task: asyncio.Task | None = None
+_wake: asyncio.Event | None = None
+# topic → students who drew questions on it since the last pass
+_requested: dict[str, set[str]] = {}
+
+
+def start_pregeneration(search_engine) -> None:
+    """Start the fill loop on the running event loop; a no-op when disabled."""
+    global _task, _wake
+    if QUIZ_PREGEN_INTERVAL_SECONDS <= 0 or not is_configured():
+        log.info("Quiz bank pre-generation disabled")
+        return
+    _wake = asyncio.Event()
+    _task = asyncio.create_task(_run(search_engine), name="quiz-pregeneration")
+
+
+async def stop_pregeneration() -> None:
+    """Cancel the fill loop; called on application shutdown."""
+    global _task, _wake
+    task, _task, _wake = _task, None, None
+    _requested.clear()
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def request_refill(student_id: str, topic: str) -> None:
+    """Ask for the student's questions on topic to be topped up in a pass soon."""
+    if _wake is not None:
+        _requested.setdefault(topic, set()).add(student_id)
+        _wake.set()
+
+
+async def fill_bank(
+    search_engine,
+    max_calls: int = QUIZ_PREGEN_MAX_CALLS,
+    requested: dict[str, set[str]] | None = None,
+) -> int:
+    """
+    Run one pre-generation pass over due topics and `requested` ones (by
+    default, those passed to request_refill since the last pass). Returns
+    the number of Gemini calls made.
+    """
+    global _requested
+    if requested is None:
+        requested, _requested = _requested, {}
+    indexed = set(search_engine.get_all_topics())
+    candidates = list(await run_db(get_due_reviews))
+    candidates += [
+        (student_id, topic)
+        for topic, students in requested.items() if topic in indexed
+        for student_id in students
+    ]
+    wanted: list[str] = []  # in priority order
+    for student_id, topic in candidates:
+        if topic not in wanted and await run_db(unseen_count, student_id, topic) < QUIZ_BANK_TARGET:
+            wanted.append(topic)
+
+    calls = 0
+    for topic in wanted:
+        if calls >= max_calls:
+            break
+        calls += 1
+        try:
+            # A whole batch per call, queued behind students' chats for the
+            # shared quota
+            questions, chunk_ids = await generate_questions(topic, search_engine, QUIZ_BANK_TARGET, quota.BACKGROUND)
+        except LLMError as e:
+            # Quota or key problems will not clear up within this pass
+            log.warning("Quiz pre-generation stopped: %s", e)
+            break
+        await run_db(add_questions, topic, questions, chunk_ids)
+    if calls:
+        log.info("Quiz bank: %d generation calls, %d topics wanted", calls, len(wanted))
+    return calls
+
+
+async def _run(search_engine) -> None:
+    while True:
+        try:
+            await fill_bank(search_engine)
+        except Exception:
+            log.exception("Quiz pre-generation pass failed")
+        try:
+            await asyncio.wait_for(_wake.wait(), QUIZ_PREGEN_INTERVAL_SECONDS)
+        except TimeoutError:
+            pass
+        else:
+            # Requests arriving meanwhile are served by the same pass
+            await asyncio.sleep(QUIZ_REFILL_DEBOUNCE_SECONDS)
+        _wake.clear()
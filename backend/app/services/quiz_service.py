@@ -3,22 +3,29 @@
 import json
 import logging
 
-from app.storage.progress_repo import save_quiz_result
-from app.storage.schedule_repo import update_schedule
+from app.core.errors import LLMError, QuotaExceededError
+from app.core.executors import run_db, run_search
+from app.core import telemetry
+from app.llm import quota
+from app.storage.progress_repo import record_answers
+from app.storage.quiz_bank_repo import add_questions, take_unseen_questions
 
 log = logging.getLogger(__name__)
 
-QUIZ_GENERATION_PROMPT = """Generate exactly ONE multiple-choice quiz question about the topic: {topic}
+QUIZ_GENERATION_PROMPT = """Generate exactly {count} different multiple-choice quiz questions about the topic: {topic}
 
-Use ONLY the study materials below to create the question. Make it competition-level difficulty appropriate for Science Olympiad.
+Use ONLY the study materials below to create the questions. Make them competition-level difficulty appropriate for Science Olympiad. Each question should test a different fact or idea.
 
 {context}
 
-Respond in EXACTLY this JSON format (no markdown, no extra text):
-{{"question": "Your question here?", "options": ["option A text", "option B text", "option C text", "option D text"], "correct_letter": "A", "explanation": "Brief explanation of the correct answer."}}"""
+Respond with EXACTLY a JSON array of {count} objects in this format (no markdown, no extra text):
+[{{"question": "Your question here?", "options": ["option A text", "option B text", "option C text", "option D text"], "correct_letter": "A", "explanation": "Brief explanation of the correct answer."}}]"""
 
+# Most questions asked for in one Gemini call
+MAX_QUIZ_BATCH = 10
 
-def submit_answer(
+
+async def submit_answer(
     student_id: str,
     student_name: str,
     topic: str,
@@ -27,67 +34,181 @@ def submit_answer(
     correct_answer: str,
 ) -> dict:
     """Grade a quiz answer and persist the result."""
-    is_correct = student_answer.strip().lower() == correct_answer.strip().lower()
-
-    save_quiz_result(
-        student_id=student_id,
-        student_name=student_name,
-        topic=topic,
-        question=question,
-        student_answer=student_answer,
-        correct_answer=correct_answer,
-        is_correct=is_correct,
-    )
-
-    # Update spaced repetition schedule
-    update_schedule(student_id, student_name, topic, is_correct)
-
-    return {"is_correct": is_correct, "correct_answer": correct_answer}
-
-
-async def generate_quiz(topic: str, search_engine) -> dict:
-    """Generate a quiz question for the given topic using Gemini."""
+    answer = {
+        "topic": topic,
+        "question": question,
+        "student_answer": student_answer,
+        "correct_answer": correct_answer,
+    }
+    [result] = await submit_answers(student_id, student_name, [answer])
+    return result
+
+
+async def submit_answers(student_id: str, student_name: str, answers: list[dict]) -> list[dict]:
+    """
+    Grade answers (dicts with topic, question, student_answer and
+    correct_answer) and persist them in order, with their progress and
+    review schedule updates, in one transaction.
+    """
+    graded = [
+        (
+            a["topic"],
+            a["question"],
+            a["student_answer"],
+            a["correct_answer"],
+            a["student_answer"].strip().lower() == a["correct_answer"].strip().lower(),
+        )
+        for a in answers
+    ]
+    await run_db(record_answers, student_id, student_name, graded)
+    return [{"is_correct": is_correct, "correct_answer": correct} for _, _, _, correct, is_correct in graded]
+
+
+QUIZ_SYSTEM_PROMPT = (
+    "You are a quiz question generator for Science Olympiad competition prep. "
+    "Always respond with valid JSON only, no markdown formatting."
+)
+
+_LETTERS = ("A", "B", "C", "D")
+
+
+async def generate_quiz(topic: str, search_engine, student_id: str = "default") -> dict:
+    """Return one quiz question for the given topic (see generate_quizzes)."""
+    questions = await generate_quizzes(topic, search_engine, student_id)
+    if not questions:
+        return {
+            "question": "Sorry, I couldn't generate a quiz question. Try again.",
+            "options": [],
+            "correct_letter": "",
+            "explanation": "",
+            "topic": topic,
+        }
+    return questions[0]
+
+
+async def generate_quizzes(topic: str, search_engine, student_id: str = "default", count: int = 1) -> list[dict]:
+    """
+    Return up to `count` quiz questions for the given topic.
+
+    Unseen questions from the quiz bank are served instantly; any shortfall
+    is generated live with one Gemini call, stored in the bank and served
+    from there, marked seen for the student. May return fewer than `count` questions (or none)
+    if generation fails; raises QuotaExceededError when the quota leaves
+    nothing to serve.
+    """
+    from app.services import quiz_bank
+
+    count = max(1, min(count, MAX_QUIZ_BATCH))
+    questions = await run_db(take_unseen_questions, student_id, topic, count)
+    telemetry.count("quiz_bank.hit" if len(questions) == count else "quiz_bank.miss")
+    if len(questions) < count:
+        try:
+            generated, chunk_ids = await generate_questions(topic, search_engine, count - len(questions))
+        except QuotaExceededError:
+            if not questions:
+                raise  # nothing to serve: the student gets a 429 to retry
+            generated = []
+        except LLMError as e:
+            log.warning("Quiz generation failed: %s", e)
+            generated = []
+        if generated:
+            await run_db(add_questions, topic, generated, chunk_ids)
+            # Identical concurrent calls share one Gemini reply (and only the
+            # first stores it), so each caller takes its own unseen questions
+            # from the bank, marked seen for this student
+            questions += await run_db(take_unseen_questions, student_id, topic, count - len(questions))
+
+    quiz_bank.request_refill(student_id, topic)
+    return questions[:count]
+
+
+async def generate_questions(
+    topic: str,
+    search_engine,
+    count: int = 1,
+    priority: int = quota.INTERACTIVE,
+) -> tuple[list[dict], list[str]]:
+    """
+    Generate up to `count` questions for a topic with one Gemini call, at
+    the given quota priority.
+
+    Each question in the reply is validated on its own, so one malformed
+    entry (or a reply cut off mid-array) does not discard the rest. Returns
+    (valid questions, ids of the chunks they were written from). Raises
+    LLMError when Gemini itself failed (quota, key, timeout).
+    """
     from app.llm.gemini_client import chat as gemini_chat
 
+    count = max(1, min(count, MAX_QUIZ_BATCH))
+
     # Search for relevant context
-    context = search_engine.search_formatted(topic, top_k=5)
+    results = await run_search(search_engine.search, topic, 5)
+    context = search_engine.format_results(results)
 
-    prompt = QUIZ_GENERATION_PROMPT.format(topic=topic, context=context)
+    prompt = QUIZ_GENERATION_PROMPT.format(topic=topic, context=context, count=count)
     messages = [{"role": "user", "content": prompt}]
 
-    system_prompt = (
-        "You are a quiz question generator for Science Olympiad competition prep. "
-        "Always respond with valid JSON only, no markdown formatting."
-    )
-
+    telemetry.count("quiz.llm_calls")
     response_text = await gemini_chat(
         messages=messages,
-        system_prompt=system_prompt,
+        system_prompt=QUIZ_SYSTEM_PROMPT,
+        max_tokens=max(2048, 400 * count),
         temperature=0.8,
+        priority=priority,
     )
 
-    # Parse the JSON response
-    try:
-        # Strip markdown code fences if present
-        cleaned = response_text.strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else cleaned[3:]
-            cleaned = cleaned.rsplit("```", 1)[0]
-        data = json.loads(cleaned.strip())
-
-        return {
-            "question": data["question"],
-            "options": data["options"][:4],
-            "correct_letter": data.get("correct_letter", "A"),
-            "explanation": data.get("explanation", ""),
-            "topic": topic,
-        }
-    except (json.JSONDecodeError, KeyError) as e:
-        log.warning("Failed to parse quiz JSON: %s", e)
-        return {
-            "question": "Sorry, I couldn't generate a quiz question. Try again.",
-            "options": [],
-            "correct_letter": "",
-            "explanation": "",
-            "topic": topic,
-        }
+    questions = []
+    seen = set()
+    items = _json_objects(response_text)
+    for item in items:
+        question = _validate_question(item)
+        if question is not None and question["question"] not in seen:
+            seen.add(question["question"])
+            questions.append(question)
+    if len(questions) < len(items) or not items:
+        log.warning("Quiz reply: %d of %d questions usable", len(questions), len(items))
+    questions = questions[:count]
+    telemetry.count("quiz.questions_generated", len(questions))
+    return questions, [r.get("id") for r in results]
+
+
+def _json_objects(text: str) -> list:
+    """
+    Every complete top-level JSON object in text, in order.
+
+    Tolerates markdown fences, a wrapping array, and a reply truncated
+    partway through its last object.
+    """
+    decoder = json.JSONDecoder()
+    objects = []
+    pos = text.find("{")
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        objects.append(obj)
+        pos = text.find("{", end)
+    return objects
+
+
+def _validate_question(data) -> dict | None:
+    """Normalized question dict, or None if data is not a usable question."""
+    if not isinstance(data, dict):
+        return None
+    question = data.get("question")
+    options = data.get("options")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) < 4 or not all(isinstance(o, str) for o in options[:4]):
+        return None
+    letter = str(data.get("correct_letter", "A")).strip().upper()[:1]
+    if letter not in _LETTERS:
+        return None
+    explanation = data.get("explanation", "")
+    return {
+        "question": question.strip(),
+        "options": options[:4],
+        "correct_letter": letter,
+        "explanation": explanation if isinstance(explanation, str) else "",
+    }
@@ -0,0 +1,85 @@
+"""
+Response cache — repeated questions are answered from SQLite instead of
+spending a Gemini call against the daily quota.
+
+An entry is keyed on the normalized message, the intent, the ids of the
+retrieved chunks, the prompt version and the student details the prompt
+includes (name and weak areas), and is only served while the indexed
+content it was made from is unchanged. Only first-turn, non-quiz messages
+are cached: follow-ups depend on the conversation, and quiz questions
+should vary. Answers stay personalized, so they are shared only between
+requests whose prompts name the same student and weak areas.
+"""
+
+import hashlib
+import json
+import re
+
+from app.agent.prompt_builder import PROMPT_VERSION
+from app.core.executors import run_db
+from app.core.telemetry import count
+from app.domain import intents
+from app.settings import LLM_CACHE_MAX_MB, LLM_CACHE_TTL_SECONDS
+from app.storage.llm_cache_repo import cached_response_stats, get_cached_response, save_cached_response
+
+# Cache hits are replayed over SSE in pieces about this long
+_REPLAY_CHARS = 80
+
+
+def cacheable(intent: str, conversation_history: list[dict]) -> bool:
+    """Whether a request's answer may be cached and served from the cache."""
+    return LLM_CACHE_TTL_SECONDS > 0 and intent != intents.QUIZ and not conversation_history
+
+
+def normalize_message(message: str) -> str:
+    """Case- and whitespace-insensitive form of a question; trailing punctuation dropped."""
+    return " ".join(message.lower().split()).rstrip("?!. ")
+
+
+def cache_key(
+    message: str,
+    intent: str,
+    search_results: list[dict],
+    student_name: str = "default",
+    weak_areas: list[str] | None = None,
+) -> str:
+    """Key for a request: every input of its prompt, with the message normalized."""
+    parts = [
+        PROMPT_VERSION, intent, normalize_message(message), [r.get("id") for r in search_results],
+        student_name, weak_areas or [],
+    ]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+async def get_response(key: str, index_version: int) -> str | None:
+    """Cached answer for key under the current index snapshot, counting hits and misses."""
+    text = await run_db(get_cached_response, key, index_version, LLM_CACHE_TTL_SECONDS)
+    count("llm_cache.hit" if text is not None else "llm_cache.miss")
+    return text
+
+
+async def store_response(key: str, index_version: int, text: str) -> None:
+    """Cache a model answer."""
+    if not text:
+        return
+    await run_db(save_cached_response, key, index_version, text, LLM_CACHE_MAX_MB * 1024 * 1024, LLM_CACHE_TTL_SECONDS)
+    count("llm_cache.store")
+
+
+def replay_chunks(text: str) -> list[str]:
+    """Split a cached answer into stream-sized pieces, breaking after whitespace."""
+    pieces = []
+    current = ""
+    for word in re.findall(r"\S+\s*|\s+", text):
+        current += word
+        if len(current) >= _REPLAY_CHARS:
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+async def stats() -> dict:
+    """Entries and bytes in the cache, with the configured limits."""
+    return {**await run_db(cached_response_stats), "max_bytes": LLM_CACHE_MAX_MB * 1024 * 1024, "ttl_seconds": LLM_CACHE_TTL_SECONDS}
@@ -1,9 +1,10 @@
 """Search service — thin wrapper around StudySearch."""
 
+from app.core.executors import run_search
 from app.retrieval.search import StudySearch
 
 
-def search_materials(query: str, top_k: int, search_engine: StudySearch) -> dict:
-    """Search materials and return results."""
-    results = search_engine.search(query, top_k)
-    return {"query": query, "results": results}
+async def search_materials(query: str, top_k: int, search_engine: StudySearch) -> dict:
+    """Search materials (on the search pool) and return results."""
+    results, docs_scored = await run_search(search_engine.search_with_stats, query, top_k)
+    return {"query": query, "results": results, "docs_scored": docs_scored}
@@ -1,14 +1,90 @@
-"""Upload service — save files, process, update index."""
+"""Upload service — save files, queue ingestion, update index."""
 
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
 import os
+import shutil
+import tempfile
+import threading
+from collections.abc import AsyncIterator
 from dataclasses import asdict
 from pathlib import Path
 
 from app.core.security import is_allowed_file
 from app.core.errors import AppError
-from app.retrieval.processor import process_file, save_chunks
+from app.core.executors import run_cpu_sync
+from app.retrieval.index.compaction import schedule_compaction
+from app.retrieval.processor import process_file
 from app.retrieval.search import StudySearch
-from app.settings import UPLOAD_DIR, CHUNKS_PATH, MAX_UPLOAD_SIZE_MB
+from app.services.ingest_jobs import (
+    DONE,
+    FAILED,
+    FileProgress,
+    FileReporter,
+    IngestJob,
+    create_job,
+    get_job,
+    submit_job,
+)
+from app.settings import MAX_UPLOAD_SIZE_MB, STAGING_DIR, UPLOAD_DIR
+
+log = logging.getLogger(__name__)
+
+# Uploads are copied to disk in blocks of this size, never held whole in memory
+_UPLOAD_BLOCK_SIZE = 1024 * 1024
+# How often an SSE job stream checks for progress
+_EVENT_POLL_SECONDS = 0.5
+
+# Uploads are numbered as they arrive; a job publishes a file only if no
+# later upload of the same name has been published (or found unchanged)
+_upload_seq = itertools.count()
+_published: dict[str, int] = {}
+_publish_lock = threading.Lock()
+
+
+async def _stream_to_temp(file, name: str, max_bytes: int) -> tuple[str, str] | None:
+    """
+    Copy an upload into its own directory in STAGING_DIR, hashing as it goes.
+
+    Returns (staged_path, sha256), or None (staging removed) as soon as the
+    upload exceeds max_bytes. The staged file keeps its real name, so it can
+    be extracted where it is, and is on the same filesystem as UPLOAD_DIR
+    so the final move is an atomic rename.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    stage = tempfile.mkdtemp(dir=STAGING_DIR, prefix="upload-")
+    tmp_path = os.path.join(stage, name)
+    try:
+        with open(tmp_path, "wb") as out:
+            while block := await file.read(_UPLOAD_BLOCK_SIZE):
+                size += len(block)
+                if size > max_bytes:
+                    break
+                digest.update(block)
+                out.write(block)
+    except BaseException:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+    if size > max_bytes:
+        shutil.rmtree(stage, ignore_errors=True)
+        return None
+    return tmp_path, digest.hexdigest()
+
+
+def clear_staging() -> None:
+    """Remove uploads left staged by a crash or kill; called on startup."""
+    stale = list(Path(STAGING_DIR).glob("upload-*"))
+    # Older versions staged inside UPLOAD_DIR
+    stale += Path(UPLOAD_DIR).glob(".upload-*")
+    for stage in stale:
+        shutil.rmtree(stage, ignore_errors=True)
+    if stale:
+        log.info("Removed %d stale staged uploads", len(stale))
 
 
 async def handle_upload(
@@ -16,61 +92,142 @@ async def handle_upload(
     search_engine: StudySearch,
 ) -> dict:
     """
-    Save uploaded files, process them, and rebuild the search index.
+    Save uploaded files and queue them for ingestion.
+
+    Files are validated and staged (in STAGING_DIR) here; extraction and the
+    index update run as a background job. Only files whose bytes differ
+    from the indexed version are extracted, each from its own staged copy,
+    which replaces the file in UPLOAD_DIR only once extraction succeeds.
+    Their chunks replace the old ones in the live index as each file
+    finishes, and a background pass persists the result (see
+    index.compaction). When the same name is uploaded again before an
+    earlier job gets to it, the newer upload wins.
 
     Args:
         files: List of UploadFile objects from FastAPI
         search_engine: The global search engine instance
 
     Returns:
-        dict with files_processed, total_chunks, stats
+        The new job as a dict (see IngestJob.to_dict); poll get_upload_job
+        or stream upload_job_events for progress.
     """
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    results = []
+    progress: list[FileProgress] = []
+    queued: list[tuple[int, str, str, str, int]] = []  # (index, name, staged path, hash, sequence)
 
     for file in files:
         if not is_allowed_file(file.filename):
-            results.append({"filename": file.filename, "status": "unsupported", "chunks": 0})
+            progress.append(FileProgress(file.filename, status="unsupported"))
             continue
 
         # Sanitize filename to prevent path traversal attacks
         safe_name = Path(file.filename).name
         if not safe_name:
-            results.append({"filename": file.filename, "status": "invalid_filename", "chunks": 0})
+            progress.append(FileProgress(file.filename, status="invalid_filename"))
             continue
-        save_path = os.path.join(UPLOAD_DIR, safe_name)
-        content = await file.read()
 
+        # Reject on the declared size when the client sent one, and on the
+        # bytes actually received otherwise.
         max_bytes = MAX_UPLOAD_SIZE_MB * 1024 * 1024
-        if len(content) > max_bytes:
-            results.append({"filename": file.filename, "status": f"too_large (>{MAX_UPLOAD_SIZE_MB}MB)", "chunks": 0})
+        streamed = None
+        if file.size is None or file.size <= max_bytes:
+            streamed = await _stream_to_temp(file, safe_name, max_bytes)
+        if streamed is None:
+            progress.append(FileProgress(file.filename, status=f"too_large (>{MAX_UPLOAD_SIZE_MB}MB)"))
             continue
 
-        with open(save_path, "wb") as f:
-            f.write(content)
-
-        chunks = process_file(save_path)
-        results.append({
-            "filename": file.filename,
-            "status": "success" if chunks else "no_content",
-            "chunks": len(chunks),
-        })
-
-    # Rebuild full index from all uploaded files
-    all_chunks = []
-    for fname in os.listdir(str(UPLOAD_DIR)):
-        fpath = os.path.join(str(UPLOAD_DIR), fname)
-        if os.path.isfile(fpath):
-            all_chunks.extend(process_file(fpath))
-
-    if all_chunks:
-        chunk_dicts = [asdict(c) for c in all_chunks]
-        os.makedirs(os.path.dirname(str(CHUNKS_PATH)), exist_ok=True)
-        save_chunks(all_chunks, str(CHUNKS_PATH))
-        search_engine.load_chunks_from_list(chunk_dicts)
-
-    return {
-        "files_processed": results,
-        "total_chunks": len(all_chunks),
-        "stats": search_engine.get_stats(),
-    }
+        staged_path, content_hash = streamed
+        queued.append((len(progress), safe_name, staged_path, content_hash, next(_upload_seq)))
+        progress.append(FileProgress(file.filename))
+
+    job = create_job(progress)
+    submit_job(job, lambda j: _ingest(j, queued, search_engine))
+    return job.to_dict()
+
+
+def get_upload_job(job_id: str) -> dict:
+    """Current state of an ingestion job."""
+    job = get_job(job_id)
+    if job is None:
+        raise AppError(f"Upload job not found: {job_id}", status_code=404)
+    return job.to_dict()
+
+
+async def upload_job_events(job_id: str) -> AsyncIterator[str]:
+    """SSE stream of job snapshots: a 'progress' event per change, then 'done'."""
+    job = get_job(job_id)
+    if job is None:
+        raise AppError(f"Upload job not found: {job_id}", status_code=404)
+
+    last_version = -1
+    while True:
+        snapshot = job.to_dict()
+        if snapshot["status"] in (DONE, FAILED):
+            yield f"data: {json.dumps({'type': 'done', 'job': snapshot})}\n\n"
+            return
+        if snapshot["version"] != last_version:
+            last_version = snapshot["version"]
+            yield f"data: {json.dumps({'type': 'progress', 'job': snapshot})}\n\n"
+        await asyncio.sleep(_EVENT_POLL_SECONDS)
+
+
+def _ingest(job: IngestJob, queued: list[tuple[int, str, str, str, int]], search_engine: StudySearch) -> None:
+    """Background half of an upload: extract changed files and update the index."""
+    changed = False
+    try:
+        for index, safe_name, staged_path, content_hash, seq in queued:
+            try:
+                changed |= _ingest_file(job, index, safe_name, staged_path, content_hash, seq, search_engine)
+            except Exception as e:
+                # e.g. the extraction worker was killed; the other files go on
+                log.exception("Ingesting %s failed", safe_name)
+                job.update_file(index, status="error", error=str(e) or type(e).__name__)
+            finally:
+                shutil.rmtree(os.path.dirname(staged_path), ignore_errors=True)
+    finally:
+        for _, _, staged_path, _, _ in queued:
+            shutil.rmtree(os.path.dirname(staged_path), ignore_errors=True)
+
+    if changed:
+        schedule_compaction(search_engine)
+
+    stats = search_engine.get_stats()
+    job.update(total_chunks=stats["total_chunks"], stats=stats)
+
+
+def _ingest_file(
+    job: IngestJob,
+    index: int,
+    safe_name: str,
+    staged_path: str,
+    content_hash: str,
+    seq: int,
+    search_engine: StudySearch,
+) -> bool:
+    """Extract and publish one staged file; returns whether the index changed."""
+    with _publish_lock:
+        if _published.get(safe_name, -1) > seq:
+            job.update_file(index, status="superseded")
+            return False
+        if search_engine.sources.get(safe_name) == content_hash:
+            _published[safe_name] = seq
+            job.update_file(index, status="unchanged")
+            return False
+
+    job.update_file(index, status="processing")
+    reporter = FileReporter(job, index)
+    chunks = run_cpu_sync(process_file, staged_path, content_hash=content_hash, reporter=reporter)
+    if reporter.errors:
+        # Keep whatever version of the file is already indexed
+        job.update_file(index, status="error")
+        return False
+
+    with _publish_lock:
+        if _published.get(safe_name, -1) > seq:
+            job.update_file(index, status="superseded")
+            return False
+        os.replace(staged_path, os.path.join(UPLOAD_DIR, safe_name))
+        search_engine.replace_source(safe_name, content_hash, [asdict(c) for c in chunks])
+        _published[safe_name] = seq
+    job.update_file(index, status="success" if chunks else "no_content", chunks=len(chunks))
+    return True
@@ -14,15 +14,45 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
+# Uploads being validated and extracted; beside UPLOAD_DIR (same filesystem,
+# so publishing is a rename) but outside it, so reindexing never sees them
+STAGING_DIR = DATA_DIR / "staging"
 IMAGES_DIR = DATA_DIR / "images"
 INDEX_DIR = DATA_DIR / "index"
 CHUNKS_PATH = INDEX_DIR / "chunks.json"
+SEARCH_INDEX_PATH = INDEX_DIR / "search.idx"
 SOURCE_LINKS_PATH = INDEX_DIR / "source_links.json"
 DB_PATH = DATA_DIR / "app.db"
+# Idle SQLite connections kept open for reuse
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+EXTRACT_CACHE_DIR = DATA_DIR / "cache" / "extract"
 
 # Gemini
 GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Whole-call limit for a chat; for streams, the longest wait for the next chunk
+GEMINI_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+# Local test servers stand in for Gemini through this (empty = Google's API)
+GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "")
+# Transient failures (timeouts, 429, 5xx) are retried with jittered
+# exponential backoff; a duplicate "hedge" call is sent when a chat call is
+# still unanswered after GEMINI_HEDGE_AFTER_SECONDS (0 = never)
+GEMINI_RETRY_ATTEMPTS: int = int(os.getenv("GEMINI_RETRY_ATTEMPTS", "3"))
+GEMINI_RETRY_BASE_SECONDS: float = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "0.5"))
+GEMINI_RETRY_MAX_SECONDS: float = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "8"))
+GEMINI_HEDGE_AFTER_SECONDS: float = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS", "0"))
+# After this many transient failures in a row calls fail fast for
+# GEMINI_BREAKER_RESET_SECONDS, then one is let through to probe
+GEMINI_BREAKER_FAILURES: int = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_RESET_SECONDS: float = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+# Project-wide request budgets shared by all Gemini calls (0 = no limit),
+# saved across restarts; daily requests background work must leave for chat
+GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", "10"))
+GEMINI_RPD: int = int(os.getenv("GEMINI_RPD", "1000"))
+GEMINI_BACKGROUND_RESERVE: int = int(os.getenv("GEMINI_BACKGROUND_RESERVE", "200"))
+# Longest a call may queue for quota before it is refused with 429
+GEMINI_QUEUE_SECONDS: float = float(os.getenv("GEMINI_QUEUE_SECONDS", "10"))
+GEMINI_BACKGROUND_QUEUE_SECONDS: float = float(os.getenv("GEMINI_BACKGROUND_QUEUE_SECONDS", "120"))
 
 # App
 _CORS_ENV = os.getenv("CORS_ORIGINS", "").strip()
@@ -49,5 +79,41 @@ DISABLE_UPLOADS: bool = os.getenv("DISABLE_UPLOADS", _disable_default).lower() =
 
 # Limits
 MAX_UPLOAD_SIZE_MB: int = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
+# Per-file limits for parallel extraction workers (process_directory jobs > 1)
+EXTRACT_TIMEOUT_SECONDS: int = int(os.getenv("EXTRACT_TIMEOUT_SECONDS", "600"))
+EXTRACT_MEMORY_LIMIT_MB: int = int(os.getenv("EXTRACT_MEMORY_LIMIT_MB", "4096"))
+# PDFs with at least this many pages are extracted in parallel page ranges
+PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PAGE_WORKERS: int = int(os.getenv("PDF_PAGE_WORKERS", "0"))  # 0 = one per CPU
+# Executor pools: threads for searches and SQLite calls, processes for
+# extraction and index builds (CPU_WORKERS=0 runs that work inline)
+SEARCH_THREADS: int = int(os.getenv("SEARCH_THREADS", "4"))
+DB_THREADS: int = int(os.getenv("DB_THREADS", "4"))
+CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Background upload ingestion: concurrent jobs, and finished jobs kept for status
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_JOB_HISTORY: int = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+# Uploads update the live index in place; it is rebuilt without tombstoned
+# chunks once this share of chunks is dead or this many updates piled up
+INDEX_COMPACT_TOMBSTONE_RATIO: float = float(os.getenv("INDEX_COMPACT_TOMBSTONE_RATIO", "0.25"))
+INDEX_COMPACT_MAX_SEGMENTS: int = int(os.getenv("INDEX_COMPACT_MAX_SEGMENTS", "20"))
+# Gemini response cache (SQLite); TTL 0 disables it
+LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MB: int = int(os.getenv("LLM_CACHE_MAX_MB", "50"))
+# Quiz bank pre-generation: unseen questions kept ready per student and
+# topic, seconds between passes (0 disables), Gemini calls allowed per pass,
+# and seconds a pass waits after a quiz request so a burst shares it
+QUIZ_BANK_TARGET: int = int(os.getenv("QUIZ_BANK_TARGET", "5"))
+QUIZ_PREGEN_INTERVAL_SECONDS: int = int(os.getenv("QUIZ_PREGEN_INTERVAL_SECONDS", "3600"))
+QUIZ_PREGEN_MAX_CALLS: int = int(os.getenv("QUIZ_PREGEN_MAX_CALLS", "5"))
+QUIZ_REFILL_DEBOUNCE_SECONDS: float = float(os.getenv("QUIZ_REFILL_DEBOUNCE_SECONDS", "30"))
+# Chat history is written behind the response in batches: flushed every
+# CHAT_HISTORY_FLUSH_MS or once CHAT_HISTORY_BATCH_ROWS are waiting; saving
+# waits up to CHAT_HISTORY_WAIT_MS for room once CHAT_HISTORY_MAX_PENDING
+# rows are unwritten, then drops the turn
+CHAT_HISTORY_FLUSH_MS: int = int(os.getenv("CHAT_HISTORY_FLUSH_MS", "200"))
+CHAT_HISTORY_BATCH_ROWS: int = int(os.getenv("CHAT_HISTORY_BATCH_ROWS", "200"))
+CHAT_HISTORY_MAX_PENDING: int = int(os.getenv("CHAT_HISTORY_MAX_PENDING", "5000"))
+CHAT_HISTORY_WAIT_MS: int = int(os.getenv("CHAT_HISTORY_WAIT_MS", "2000"))
 MAX_CONVERSATION_HISTORY: int = 10
 SEARCH_TOP_K: int = 5
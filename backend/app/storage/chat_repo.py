@@ -2,6 +2,10 @@
 
 from app.storage.db import get_db
 
+# (student_id, student_name, role, content, intent, timestamp) — timestamp
+# as SQLite's CURRENT_TIMESTAMP writes it, UTC "YYYY-MM-DD HH:MM:SS"
+ChatRow = tuple[str, str, str, str, str, str]
+
 
 def save_chat_message(student_id: str, student_name: str, role: str, content: str, intent: str = "") -> None:
     """Save a chat message to history."""
@@ -10,3 +14,13 @@ def save_chat_message(student_id: str, student_name: str, role: str, content: st
             "INSERT INTO chat_history (student_id, student_name, role, content, intent) VALUES (?, ?, ?, ?, ?)",
             (student_id, student_name, role, content, intent),
         )
+
+
+def save_chat_messages(rows: list[ChatRow]) -> None:
+    """Save many chat messages in one transaction, in order."""
+    with get_db() as conn:
+        conn.executemany(
+            """INSERT INTO chat_history (student_id, student_name, role, content, intent, timestamp)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
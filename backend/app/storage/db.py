@@ -1,26 +1,122 @@
-"""SQLite connection management."""
+"""
+SQLite connection management.
+
+Connections are pooled: each is opened once, tuned with the PRAGMAs below
+and reused, so a repository call costs a queue get/put instead of a
+connect, a schema load and a close. Reuse also keeps each connection's
+prepared-statement cache warm, so the same SQL text is compiled once per
+connection rather than once per call. WAL journaling lets readers run
+while a write is in progress, and synchronous=NORMAL syncs at checkpoints
+rather than on every commit (safe against application crashes; a power
+loss may drop the last few commits).
+"""
 
 import logging
 import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 
-from app.settings import DB_PATH
+from app.settings import DB_PATH, DB_POOL_SIZE
 
 log = logging.getLogger(__name__)
 
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",  # 16 MB per connection
+    "PRAGMA temp_store=MEMORY",
+)
+_STATEMENT_CACHE = 256
+
+
+class _Pool:
+    """Idle connections to one database file; at most `size` are kept."""
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=max(1, size))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def put(self, conn: sqlite3.Connection) -> None:
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()  # a burst opened extra connections; keep only `size`
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self) -> sqlite3.Connection:
+        # Pooled connections move between threads, one user at a time
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=_STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+
+_pool: _Pool | None = None
+_pool_lock = threading.Lock()
+
+
+def _current_pool() -> _Pool:
+    global _pool
+    path = str(DB_PATH)
+    pool = _pool
+    if pool is None or pool.path != path:
+        with _pool_lock:
+            if _pool is None or _pool.path != path:
+                # DB_PATH changed (tests point it at a temp file): start over
+                if _pool is not None:
+                    _pool.close()
+                _pool = _Pool(path, DB_POOL_SIZE)
+            pool = _pool
+    return pool
+
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
+    """
+    Context manager for database connections.
+
+    Yields a pooled connection; commits on success and rolls back on error
+    before handing it back to the pool.
+    """
+    pool = _current_pool()
+    conn = pool.get()
     try:
         yield conn
         conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
     finally:
-        conn.close()
+        if conn.in_transaction:  # a failed commit
+            conn.rollback()
+        pool.put(conn)
+
+
+def close_db() -> None:
+    """Close pooled connections; called on application shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
 
 
 def init_db() -> None:
@@ -61,6 +157,52 @@ def init_db() -> None:
                 last_reviewed TEXT,
                 UNIQUE(student_id, topic)
             );
+
+            CREATE TABLE IF NOT EXISTS quiz_bank (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                correct_letter TEXT NOT NULL,
+                explanation TEXT,
+                chunk_ids TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(topic, question)
+            );
+
+            CREATE TABLE IF NOT EXISTS quiz_bank_seen (
+                student_id TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                seen_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (student_id, question_id)
+            );
+
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                index_version INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS llm_quota (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # Per-topic quiz totals, kept up to date by save_quiz_result
+        created = not _table_exists(conn, "topic_stats")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS topic_stats (
+                student_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                last_seen DATETIME,
+                PRIMARY KEY (student_id, topic)
+            )
         """)
         # Ensure columns exist before creating indexes (handles old DBs)
         _ensure_column(conn, "quiz_results", "student_id", "TEXT DEFAULT 'default'")
@@ -76,10 +218,35 @@ def init_db() -> None:
                 ON study_schedule(student_id);
             CREATE UNIQUE INDEX IF NOT EXISTS idx_schedule_student_topic
                 ON study_schedule(student_id, topic);
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used
+                ON llm_cache(last_used);
+            CREATE INDEX IF NOT EXISTS idx_quiz_student_time
+                ON quiz_results(student_id, timestamp);
         """)
+        if created:
+            # Databases from before topic_stats: fill it from the answers so far
+            backfill_topic_stats(conn)
     log.info("Database initialized: %s", DB_PATH)
 
 
+def backfill_topic_stats(conn: sqlite3.Connection) -> None:
+    """Recompute topic_stats from every row in quiz_results."""
+    conn.execute("DELETE FROM topic_stats")
+    conn.execute("""
+        INSERT INTO topic_stats (student_id, topic, total, correct, last_seen)
+        SELECT COALESCE(student_id, 'default'), COALESCE(topic, ''), COUNT(*),
+               SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), MAX(timestamp)
+        FROM quiz_results
+        GROUP BY 1, 2
+    """)
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
 def _ensure_column(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> None:
     """Add a column if it doesn't exist (safe for initial deployment)."""
     cols = [row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
@@ -0,0 +1,67 @@
+"""CRUD for cached LLM responses."""
+
+import time
+
+from app.storage.db import get_db
+
+
+def get_cached_response(key: str, index_version: int, ttl_seconds: float) -> str | None:
+    """
+    Cached response for key, or None.
+
+    Entries written against another index version or older than ttl_seconds
+    are misses. A hit refreshes the entry's last-used time for LRU eviction.
+    """
+    now = time.time()
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ? AND index_version = ? AND created_at >= ?",
+            (key, index_version, now - ttl_seconds),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row["response"]
+
+
+def save_cached_response(key: str, index_version: int, response: str, max_bytes: int, ttl_seconds: float) -> None:
+    """
+    Store a response, then drop expired entries and evict least recently
+    used ones until the cache fits in max_bytes.
+    """
+    now = time.time()
+    size = len(response.encode("utf-8"))
+    with get_db() as conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO llm_cache
+               (key, index_version, response, size_bytes, created_at, last_used)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (key, index_version, response, size, now, now),
+        )
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) AS total FROM llm_cache").fetchone()["total"]
+        if total <= max_bytes:
+            return
+        excess = total - max_bytes
+        evict = []
+        for row in conn.execute("SELECT key, size_bytes FROM llm_cache ORDER BY last_used"):
+            if excess <= 0:
+                break
+            evict.append((row["key"],))
+            excess -= row["size_bytes"]
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", evict)
+
+
+def clear_cached_responses() -> int:
+    """Delete every cached response. Returns how many were removed."""
+    with get_db() as conn:
+        return conn.execute("DELETE FROM llm_cache").rowcount
+
+
+def cached_response_stats() -> dict:
+    """Entry count and total size of the cache."""
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes FROM llm_cache"
+        ).fetchone()
+    return {"entries": row["entries"], "size_bytes": row["size_bytes"]}
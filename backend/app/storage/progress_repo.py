@@ -1,6 +1,13 @@
 """CRUD for quiz results and progress tracking."""
 
-from app.storage.db import get_db
+from app.storage.db import backfill_topic_stats, get_db
+from app.storage.schedule_repo import apply_reviews
+
+# (topic, question, student_answer, correct_answer, is_correct)
+QuizAnswer = tuple[str, str, str, str, bool]
+
+# Topics answered below this accuracy (percent) are weak areas
+WEAK_ACCURACY = 70
 
 
 def save_quiz_result(
@@ -12,40 +19,32 @@ def save_quiz_result(
     correct_answer: str,
     is_correct: bool,
 ) -> None:
-    """Record a quiz answer."""
+    """Record a quiz answer and add it to the student's topic totals."""
     with get_db() as conn:
-        conn.execute(
-            """INSERT INTO quiz_results
-               (student_id, student_name, topic, question, student_answer, correct_answer, is_correct)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (student_id, student_name, topic, question, student_answer, correct_answer, is_correct),
-        )
+        _insert_answers(conn, student_id, student_name, [(topic, question, student_answer, correct_answer, is_correct)])
 
 
-def get_progress(student_id: str = "default") -> dict:
-    """Get study progress and weak areas for a student."""
+def record_answers(student_id: str, student_name: str, answers: list[QuizAnswer]) -> None:
+    """
+    Record graded answers, in order, with their topic totals and review
+    schedule updates — one connection, one transaction.
+    """
     with get_db() as conn:
-        overall = conn.execute(
-            """SELECT COUNT(*) as total,
-                      SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) as correct
-               FROM quiz_results WHERE student_id = ?""",
-            (student_id,),
-        ).fetchone()
+        _insert_answers(conn, student_id, student_name, answers)
+        apply_reviews(conn, student_id, student_name, [(a[0], a[4]) for a in answers])
 
-        total = overall["total"] or 0
-        correct = overall["correct"] or 0
 
-        by_topic = conn.execute(
-            """SELECT topic,
-                      COUNT(*) as total,
-                      SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) as correct
-               FROM quiz_results
-               WHERE student_id = ?
-               GROUP BY topic
-               ORDER BY (CAST(SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS FLOAT) / COUNT(*))""",
-            (student_id,),
-        ).fetchall()
+def rebuild_topic_stats() -> int:
+    """Recompute topic_stats from quiz_results; returns the number of (student, topic) rows."""
+    with get_db() as conn:
+        backfill_topic_stats(conn)
+        return conn.execute("SELECT COUNT(*) FROM topic_stats").fetchone()[0]
+
 
+def get_progress(student_id: str = "default") -> dict:
+    """Get study progress and weak areas for a student."""
+    with get_db() as conn:
+        by_topic = _topic_rows(conn, student_id)
         recent = conn.execute(
             """SELECT topic, question, is_correct, timestamp
                FROM quiz_results
@@ -54,33 +53,73 @@ def get_progress(student_id: str = "default") -> dict:
             (student_id,),
         ).fetchall()
 
-        topics = []
-        weak_areas = []
-        for row in by_topic:
-            accuracy = round(row["correct"] / row["total"] * 100, 1) if row["total"] > 0 else 0
-            topics.append({
-                "topic": row["topic"],
-                "total": row["total"],
-                "correct": row["correct"],
-                "accuracy": accuracy,
-            })
-            if accuracy < 70:
-                weak_areas.append(row["topic"])
-
-        return {
-            "student_id": student_id,
-            "overall": {
-                "total_questions": total,
-                "correct": correct,
-                "accuracy": round(correct / total * 100, 1) if total > 0 else 0,
-            },
-            "by_topic": topics,
-            "weak_areas": weak_areas,
-            "recent_activity": [dict(row) for row in recent],
-        }
+    total = sum(row["total"] for row in by_topic)
+    correct = sum(row["correct"] for row in by_topic)
+    topics = []
+    weak_areas = []
+    for row in by_topic:
+        accuracy = _accuracy(row["correct"], row["total"])
+        topics.append({
+            "topic": row["topic"],
+            "total": row["total"],
+            "correct": row["correct"],
+            "accuracy": accuracy,
+        })
+        if accuracy < WEAK_ACCURACY:
+            weak_areas.append(row["topic"])
+
+    return {
+        "student_id": student_id,
+        "overall": {
+            "total_questions": total,
+            "correct": correct,
+            "accuracy": _accuracy(correct, total),
+        },
+        "by_topic": topics,
+        "weak_areas": weak_areas,
+        "recent_activity": [dict(row) for row in recent],
+    }
 
 
 def get_weak_areas(student_id: str = "default") -> list[str]:
     """Get list of weak topic areas (< 70% accuracy)."""
-    progress = get_progress(student_id)
-    return progress["weak_areas"]
+    with get_db() as conn:
+        by_topic = _topic_rows(conn, student_id)
+    return [row["topic"] for row in by_topic if _accuracy(row["correct"], row["total"]) < WEAK_ACCURACY]
+
+
+def _insert_answers(conn, student_id: str, student_name: str, answers: list[QuizAnswer]) -> None:
+    conn.executemany(
+        """INSERT INTO quiz_results
+           (student_id, student_name, topic, question, student_answer, correct_answer, is_correct)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(student_id, student_name, *answer) for answer in answers],
+    )
+    totals: dict[str, list[int]] = {}
+    for topic, _, _, _, is_correct in answers:
+        counts = totals.setdefault(topic, [0, 0])
+        counts[0] += 1
+        counts[1] += 1 if is_correct else 0
+    conn.executemany(
+        """INSERT INTO topic_stats (student_id, topic, total, correct, last_seen)
+           VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(student_id, topic)
+           DO UPDATE SET total = total + excluded.total, correct = correct + excluded.correct,
+                         last_seen = excluded.last_seen""",
+        [(student_id, topic, total, correct) for topic, (total, correct) in totals.items()],
+    )
+
+
+def _topic_rows(conn, student_id: str) -> list:
+    # One row per topic the student has answered, weakest first
+    return conn.execute(
+        """SELECT topic, total, correct
+           FROM topic_stats
+           WHERE student_id = ? AND total > 0
+           ORDER BY CAST(correct AS FLOAT) / total""",
+        (student_id,),
+    ).fetchall()
+
+
+def _accuracy(correct: int, total: int) -> float:
+    return round(correct / total * 100, 1) if total > 0 else 0
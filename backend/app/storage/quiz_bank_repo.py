@@ -0,0 +1,74 @@
+"""CRUD for the pre-generated quiz question bank."""
+
+import json
+
+from app.storage.db import get_db
+
+
+def add_questions(topic: str, questions: list[dict], chunk_ids: list[str]) -> list[int]:
+    """
+    Store validated questions for a topic; duplicates of a stored question
+    are skipped. Returns the ids of the rows added.
+    """
+    added = []
+    with get_db() as conn:
+        for q in questions:
+            cur = conn.execute(
+                """INSERT OR IGNORE INTO quiz_bank
+                   (topic, question, options, correct_letter, explanation, chunk_ids)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (topic, q["question"], json.dumps(q["options"]), q["correct_letter"],
+                 q.get("explanation", ""), json.dumps(chunk_ids)),
+            )
+            if cur.rowcount:
+                added.append(cur.lastrowid)
+    return added
+
+
+def take_unseen_questions(student_id: str, topic: str, limit: int = 1) -> list[dict]:
+    """Up to `limit` of the oldest questions on topic the student has not been served, marked as seen."""
+    with get_db() as conn:
+        # Take the write lock before reading, so concurrent takes for one
+        # student cannot both pick the same questions
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            """SELECT id, topic, question, options, correct_letter, explanation
+               FROM quiz_bank
+               WHERE topic = ? AND id NOT IN
+                   (SELECT question_id FROM quiz_bank_seen WHERE student_id = ?)
+               ORDER BY id LIMIT ?""",
+            (topic, student_id, limit),
+        ).fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO quiz_bank_seen (student_id, question_id) VALUES (?, ?)",
+            [(student_id, row["id"]) for row in rows],
+        )
+    return [
+        {
+            "question": row["question"],
+            "options": json.loads(row["options"]),
+            "correct_letter": row["correct_letter"],
+            "explanation": row["explanation"] or "",
+            "topic": row["topic"],
+        }
+        for row in rows
+    ]
+
+
+def unseen_count(student_id: str, topic: str) -> int:
+    """Questions on topic still unseen by the student."""
+    with get_db() as conn:
+        row = conn.execute(
+            """SELECT COUNT(*) AS n FROM quiz_bank
+               WHERE topic = ? AND id NOT IN
+                   (SELECT question_id FROM quiz_bank_seen WHERE student_id = ?)""",
+            (topic, student_id),
+        ).fetchone()
+    return row["n"]
+
+
+def question_counts() -> dict[str, int]:
+    """Stored questions per topic."""
+    with get_db() as conn:
+        rows = conn.execute("SELECT topic, COUNT(*) AS n FROM quiz_bank GROUP BY topic").fetchall()
+    return {r["topic"]: r["n"] for r in rows}
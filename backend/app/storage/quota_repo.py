@@ -0,0 +1,28 @@
+"""Persisted levels of the Gemini quota buckets."""
+
+from app.storage.db import get_db
+
+
+def load_quota_buckets() -> dict[str, tuple[float, float]]:
+    """Saved {bucket name: (tokens, updated_at)}."""
+    with get_db() as conn:
+        rows = conn.execute("SELECT name, tokens, updated_at FROM llm_quota").fetchall()
+    return {r["name"]: (r["tokens"], r["updated_at"]) for r in rows}
+
+
+def save_quota_bucket(name: str, tokens: float, updated_at: float) -> None:
+    """
+    Save one bucket's level as of updated_at (unix seconds).
+
+    Saves run on a thread pool and may land out of order; one older than
+    the stored level is ignored. At the same instant the lower level is
+    the later one, since only grants take tokens.
+    """
+    with get_db() as conn:
+        conn.execute(
+            """INSERT INTO llm_quota (name, tokens, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+               WHERE excluded.updated_at > llm_quota.updated_at
+                  OR (excluded.updated_at = llm_quota.updated_at AND excluded.tokens < llm_quota.tokens)""",
+            (name, tokens, updated_at),
+        )
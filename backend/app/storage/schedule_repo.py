@@ -1,61 +1,75 @@
 """Spaced repetition schedule storage using SM-2 algorithm."""
 
+import sqlite3
 from datetime import date, timedelta
 
 from app.storage.db import get_db
 
 
 def update_schedule(student_id: str, student_name: str, topic: str, is_correct: bool) -> None:
+    """Update the review schedule for a topic after a quiz answer."""
+    with get_db() as conn:
+        apply_reviews(conn, student_id, student_name, [(topic, is_correct)])
+
+
+def apply_reviews(
+    conn: sqlite3.Connection, student_id: str, student_name: str, reviews: list[tuple[str, bool]],
+) -> None:
+    """
+    Apply (topic, is_correct) answers, in order, to a student's schedule on
+    an open connection — one read for every topic involved, one upsert each.
+    """
+    topics = list(dict.fromkeys(topic for topic, _ in reviews))
+    placeholders = ", ".join("?" * len(topics))
+    rows = conn.execute(
+        f"""SELECT topic, ease_factor, interval_days, repetitions FROM study_schedule
+            WHERE student_id = ? AND topic IN ({placeholders})""",
+        (student_id, *topics),
+    ).fetchall()
+    state = {r["topic"]: (r["ease_factor"], r["interval_days"], r["repetitions"]) for r in rows}
+    for topic, is_correct in reviews:
+        state[topic] = sm2_step(*state.get(topic, (2.5, 1, 0)), is_correct)
+
+    today = date.today()
+    params = []
+    for topic in topics:
+        ease, interval, reps = state[topic]
+        next_review = (today + timedelta(days=interval)).isoformat()
+        params.append((student_id, student_name, topic, ease, interval, reps, next_review, today.isoformat()))
+    conn.executemany(
+        """INSERT INTO study_schedule
+           (student_id, student_name, topic, ease_factor, interval_days, repetitions, next_review, last_reviewed)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(student_id, topic)
+           DO UPDATE SET ease_factor = excluded.ease_factor, interval_days = excluded.interval_days,
+                         repetitions = excluded.repetitions, next_review = excluded.next_review,
+                         last_reviewed = excluded.last_reviewed""",
+        params,
+    )
+
+
+def sm2_step(ease: float, interval: int, reps: int, is_correct: bool) -> tuple[float, int, int]:
     """
-    Update the review schedule for a topic after a quiz answer.
+    One review under a simplified SM-2 algorithm; returns the new
+    (ease_factor, interval_days, repetitions).
 
-    Uses a simplified SM-2 algorithm:
     - Correct answers increase the interval and ease factor
     - Incorrect answers reset the interval to 1 day
     """
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT ease_factor, interval_days, repetitions FROM study_schedule "
-            "WHERE student_id = ? AND topic = ?",
-            (student_id, topic),
-        ).fetchone()
-
-        today = date.today().isoformat()
-
-        if row is None:
-            ease = 2.5
+    if is_correct:
+        reps += 1
+        if reps == 1:
             interval = 1
-            reps = 0
+        elif reps == 2:
+            interval = 3
         else:
-            ease = row["ease_factor"]
-            interval = row["interval_days"]
-            reps = row["repetitions"]
-
-        if is_correct:
-            reps += 1
-            if reps == 1:
-                interval = 1
-            elif reps == 2:
-                interval = 3
-            else:
-                interval = round(interval * ease)
-            ease = max(1.3, ease + 0.1 - (5 - 4) * (0.08 + (5 - 4) * 0.02))
-        else:
-            reps = 0
-            interval = 1
-            ease = max(1.3, ease - 0.2)
-
-        next_review = (date.today() + timedelta(days=interval)).isoformat()
-
-        conn.execute(
-            """INSERT INTO study_schedule
-               (student_id, student_name, topic, ease_factor, interval_days, repetitions, next_review, last_reviewed)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-               ON CONFLICT(student_id, topic)
-               DO UPDATE SET ease_factor=?, interval_days=?, repetitions=?, next_review=?, last_reviewed=?""",
-            (student_id, student_name, topic, ease, interval, reps, next_review, today,
-             ease, interval, reps, next_review, today),
-        )
+            interval = round(interval * ease)
+        ease = max(1.3, ease + 0.1 - (5 - 4) * (0.08 + (5 - 4) * 0.02))
+    else:
+        reps = 0
+        interval = 1
+        ease = max(1.3, ease - 0.2)
+    return ease, interval, reps
 
 
 def get_study_plan(student_id: str) -> dict:
@@ -118,3 +132,15 @@ def get_study_plan(student_id: str) -> dict:
         "mastered_count": mastered["count"] if mastered else 0,
         "study_days_30d": streak["days"] if streak else 0,
     }
+
+
+def get_due_reviews() -> list[tuple[str, str]]:
+    """(student_id, topic) for every review due today or earlier, soonest first."""
+    today = date.today().isoformat()
+    with get_db() as conn:
+        rows = conn.execute(
+            """SELECT student_id, topic FROM study_schedule
+               WHERE next_review <= ? ORDER BY next_review ASC""",
+            (today,),
+        ).fetchall()
+    return [(r["student_id"], r["topic"]) for r in rows]
@@ -0,0 +1,106 @@
+"""
+Benchmark: per-call cost of repository calls, connect-per-call vs pooled get_db.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_db [--calls 2000] [--rows 5000]
+
+Times what one chat turn does to SQLite — a save_chat_message insert and a
+get_progress read (three queries) — against a temporary database. The
+"connect per call" column replays the old get_db (makedirs, connect,
+commit, close, default rollback journal); "pooled" uses the current one.
+"batched" is the per-message cost of the same inserts written the way the
+chat history writer does, CHAT_HISTORY_BATCH_ROWS to a transaction.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.storage import chat_repo, db, progress_repo
+from app.settings import CHAT_HISTORY_BATCH_ROWS
+from app.storage.chat_repo import save_chat_message, save_chat_messages
+from app.storage.progress_repo import get_progress, save_quiz_result
+
+
+@contextmanager
+def connect_per_call():
+    os.makedirs(os.path.dirname(db.DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def batched_us(calls: int) -> float:
+    rows = [("bench", "Bench", "user", f"message {i}", "explain", "2024-01-01 00:00:00") for i in range(calls)]
+    start = time.perf_counter()
+    for i in range(0, calls, CHAT_HISTORY_BATCH_ROWS):
+        save_chat_messages(rows[i:i + CHAT_HISTORY_BATCH_ROWS])
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(get_db, path: Path, rows: int, calls: int) -> dict[str, float]:
+    db.DB_PATH = path
+    db.init_db()
+    for i in range(rows):
+        save_quiz_result(f"student{i % 50}", "S", f"topic {i % 20}", f"q{i}", "A", "B", i % 3 == 0)
+    db.close_db()
+    if get_db is connect_per_call:
+        # WAL is a property of the file; the old layer ran in rollback-journal mode
+        conn = sqlite3.connect(str(path))
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+    # Repositories look get_db up in their own module
+    chat_repo.get_db = progress_repo.get_db = get_db
+    try:
+        return {
+            "insert": per_call_us(lambda i: save_chat_message("bench", "Bench", "user", f"message {i}", "explain"), calls),
+            "progress": per_call_us(lambda i: get_progress(f"student{i % 50}"), calls),
+            "batched": batched_us(calls),
+        }
+    finally:
+        chat_repo.get_db = progress_repo.get_db = db.get_db
+        db.close_db()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=5000, help="quiz results seeded before timing")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, get_db in [("connect per call", connect_per_call), ("pooled", db.get_db)]:
+            results[label] = run(get_db, Path(tmp) / f"{label}.db", args.rows, args.calls)
+
+    print(f"{args.calls} calls each, {args.rows} quiz results")
+    print(f"  {'':<18} {'insert':>12} {'get_progress':>14} {'batched':>12}")
+    for label, timings in results.items():
+        print(
+            f"  {label:<18} {timings['insert']:>9.1f} µs {timings['progress']:>11.1f} µs"
+            f" {timings['batched']:>9.1f} µs"
+        )
+    old, new = results["connect per call"], results["pooled"]
+    print(f"  speedup            {old['insert'] / new['insert']:>10.1f}x {old['progress'] / new['progress']:>12.1f}x")
+    print(f"  pooled insert vs batched: {new['insert'] / new['batched']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
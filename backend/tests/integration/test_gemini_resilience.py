@@ -0,0 +1,141 @@
+"""Integration tests for Gemini retries and degraded replies, against a local fake Gemini server."""
+
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("SCIOLY_TEST_MODE", "1")
+
+from app.main import app
+from app.core.auth import require_auth
+from app.core.errors import CircuitOpenError, LLMAuthError, LLMUnavailableError
+from app.llm import gemini_client, quota
+from app.llm.resilience import CircuitBreaker, RetryPolicy
+from app.storage.db import init_db
+
+MESSAGES = [{"role": "user", "content": "What is the cochlea?"}]
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+class FakeGemini(ThreadingHTTPServer):
+    """
+    Serves the generateContent and streamGenerateContent endpoints. Each
+    request takes the next scripted status (200 once the script runs out).
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.script: list[int] = []
+        self.parts = ["The cochlea ", "is in the inner ear."]
+        self.requests: list[str] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeGemini
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(self.path)
+        status = self.server.script.pop(0) if self.server.script else 200
+        if status != 200:
+            body = json.dumps({"error": {"code": status, "message": "scripted failure", "status": "UNAVAILABLE"}})
+            self._send(status, "application/json", body.encode())
+        elif ":streamGenerateContent" in self.path:
+            events = b"".join(b"data: " + json.dumps(_candidate(p)).encode() + b"\r\n\r\n" for p in self.server.parts)
+            self._send(200, "text/event-stream", events)
+        else:
+            self._send(200, "application/json", json.dumps(_candidate("".join(self.server.parts))).encode())
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def fake_gemini(monkeypatch):
+    server = FakeGemini()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(gemini_client, "_client", None)
+    monkeypatch.setattr(gemini_client, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client, "GEMINI_BASE_URL", server.url)
+    monkeypatch.setattr(gemini_client, "_retry", RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.05))
+    monkeypatch.setattr(gemini_client, "_breaker", CircuitBreaker(failures=5, reset_seconds=30))
+    monkeypatch.setattr(quota, "scheduler", quota.QuotaScheduler(per_minute=0, per_day=0))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+def test_server_errors_are_retried(fake_gemini):
+    fake_gemini.script = [503, 500]
+    assert asyncio.run(gemini_client.chat(MESSAGES, "system")) == "The cochlea is in the inner ear."
+    assert len(fake_gemini.requests) == 3
+
+
+def test_stream_is_retried_before_first_chunk(fake_gemini):
+    fake_gemini.script = [503]
+    chunks = asyncio.run(_collect(gemini_client.chat_stream(MESSAGES, "system")))
+    assert chunks == ["The cochlea ", "is in the inner ear."]
+    assert len(fake_gemini.requests) == 2
+
+
+def test_auth_errors_are_not_retried(fake_gemini):
+    fake_gemini.script = [401]
+    with pytest.raises(LLMAuthError):
+        asyncio.run(gemini_client.chat(MESSAGES, "system"))
+    assert len(fake_gemini.requests) == 1
+
+
+def test_outage_opens_the_circuit(fake_gemini):
+    fake_gemini.script = [503] * 6
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(gemini_client.chat(MESSAGES, "system"))
+    sent = len(fake_gemini.requests)
+    assert sent == 5  # the fifth failure in a row opened the circuit
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(gemini_client.chat(MESSAGES, "system"))
+    assert len(fake_gemini.requests) == sent
+
+
+def test_chat_endpoint_degrades_when_gemini_is_down(fake_gemini, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    monkeypatch.setattr("app.services.quiz_bank.QUIZ_PREGEN_INTERVAL_SECONDS", 0)
+    init_db()
+    fake_gemini.script = [503] * 3
+
+    app.dependency_overrides[require_auth] = lambda: {"email": "alice@example.com"}
+    try:
+        with TestClient(app) as client:
+            response = client.post("/api/chat", json={"message": "Why is the sky blue?", "student_name": "Alice"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["response"].startswith("Gemini is unavailable")
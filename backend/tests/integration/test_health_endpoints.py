@@ -0,0 +1,39 @@
+"""Integration tests for the health endpoints."""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("SCIOLY_TEST_MODE", "1")
+
+from app.main import app
+from app.core.auth import require_auth
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def test_health_is_public_and_minimal(client):
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    body = response.json()
+    assert {"status", "materials_loaded", "index_version"} <= body.keys()
+    assert not {"executors", "metrics", "llm_cache", "llm_quota", "llm_circuit", "chat_history"} & body.keys()
+
+
+def test_health_details_require_auth(client, monkeypatch):
+    monkeypatch.setattr("app.core.auth.GOOGLE_CLIENT_ID", "test-client")
+    assert client.get("/api/health/details").status_code == 401
+
+    app.dependency_overrides[require_auth] = lambda: {"email": "alice@example.com"}
+    response = client.get("/api/health/details")
+    assert response.status_code == 200
+    assert {"executors", "metrics", "llm_cache", "llm_quota", "llm_circuit", "chat_history"} <= response.json().keys()
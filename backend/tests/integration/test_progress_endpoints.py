@@ -56,3 +56,26 @@ def test_progress_and_study_plan_are_keyed_by_email(client):
     progress_b = client.get("/api/progress")
     assert progress_b.status_code == 200
     assert progress_b.json()["overall"]["total_questions"] == 0
+
+
+def test_submit_batch_records_every_answer(client):
+    answers = [
+        {"question": f"Q{i}", "student_answer": "A", "correct_answer": "A" if i % 2 else "B", "topic": "Math"}
+        for i in range(100)
+    ]
+    submit = client.post("/api/quiz/submit-batch", json={"answers": answers, "student_name": "Alice"})
+    assert submit.status_code == 200
+    body = submit.json()
+    assert body["correct"] == 50
+    assert [r["is_correct"] for r in body["results"][:2]] == [False, True]
+
+    progress = client.get("/api/progress").json()
+    assert progress["overall"]["total_questions"] == 100
+    assert progress["by_topic"] == [{"topic": "Math", "total": 100, "correct": 50, "accuracy": 50.0}]
+    assert [t["topic"] for t in client.get("/api/study-plan").json()["upcoming"]] == ["Math"]
+
+
+def test_submit_batch_rejects_empty_and_oversized(client):
+    answer = {"question": "Q", "student_answer": "A", "correct_answer": "A", "topic": "Math"}
+    assert client.post("/api/quiz/submit-batch", json={"answers": []}).status_code == 422
+    assert client.post("/api/quiz/submit-batch", json={"answers": [answer] * 501}).status_code == 422
@@ -0,0 +1,77 @@
+"""Integration tests for queued uploads and job status endpoints."""
+
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("SCIOLY_TEST_MODE", "1")
+
+from app.main import app
+from app.core.auth import require_auth
+from app.domain.documents import Chunk
+from app.retrieval.search import StudySearch
+from app.services import upload_service
+from app.storage.db import init_db
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    init_db()
+    monkeypatch.setattr("app.api.routes.upload.DISABLE_UPLOADS", False)
+    monkeypatch.setattr("app.api.routes.upload.search_engine", StudySearch())
+    monkeypatch.setattr(upload_service, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(upload_service, "STAGING_DIR", tmp_path / "staging")
+    monkeypatch.setattr(upload_service, "schedule_compaction", lambda engine: None)
+    # the stubbed process_file below can't be pickled for the CPU pool
+    monkeypatch.setattr("app.core.executors.CPU_WORKERS", 0)
+    monkeypatch.setattr(
+        upload_service,
+        "process_file",
+        lambda path, content_hash=None: [
+            Chunk(source_file=os.path.basename(path), source_type="txt", section_title="All", content="the heart pumps blood")
+        ],
+    )
+
+    app.dependency_overrides[require_auth] = lambda: {"email": "alice@example.com"}
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def test_upload_returns_job_and_status_reports_completion(client):
+    response = client.post(
+        "/api/upload",
+        files=[("files", ("heart.txt", b"the heart pumps blood", "text/plain")),
+               ("files", ("virus.exe", b"MZ", "application/octet-stream"))],
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert [f["filename"] for f in job["files"]] == ["heart.txt", "virus.exe"]
+    assert job["files"][1]["status"] == "unsupported"
+
+    deadline = time.monotonic() + 10
+    while job["status"] not in ("done", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/upload/jobs/{job['job_id']}").json()
+
+    assert job["status"] == "done"
+    assert job["files"][0]["status"] == "success"
+    assert job["files"][0]["chunks"] == 1
+    assert job["total_chunks"] == 1
+
+
+def test_job_events_stream_until_done(client):
+    job = client.post("/api/upload", files=[("files", ("heart.txt", b"beat", "text/plain"))]).json()
+    with client.stream("GET", f"/api/upload/jobs/{job['job_id']}/events") as stream:
+        events = [line for line in stream.iter_lines() if line.startswith("data: ")]
+    assert '"type": "done"' in events[-1]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/upload/jobs/nope").status_code == 404
+    assert client.get("/api/upload/jobs/nope/events").status_code == 404
@@ -0,0 +1,136 @@
+"""Tests for the postings-list BM25 index."""
+
+import random
+
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.retrieval.index.bm25 import build_index, query_index
+from app.retrieval.index.postings import BM25Index
+from tests.unit.test_search import SAMPLE_CHUNKS
+
+_VOCAB = [
+    "cochlea", "retina", "rods", "cones", "femur", "mitochondria", "atp",
+    "photosynthesis", "glucose", "neuron", "axon", "synapse", "optics",
+    "lens", "the", "of", "and", "cell", "light", "sound",
+]
+
+
+def _random_corpus(seed: int, size: int) -> list[list[str]]:
+    rng = random.Random(seed)
+    return [
+        [rng.choice(_VOCAB) for _ in range(rng.randint(0, 40))]
+        for _ in range(size)
+    ]
+
+
+def _reference_ranking(corpus: list[list[str]], query: list[str], k: int) -> list[tuple[int, float]]:
+    scores = BM25Okapi(corpus).get_scores(query)
+    ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:k]
+    return [(idx, float(score)) for idx, score in ranked if score > 0]
+
+
+class TestBM25Index:
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_rank_bm25(self, seed: int) -> None:
+        corpus = _random_corpus(seed, 200)
+        index = BM25Index(corpus)
+        rng = random.Random(seed + 100)
+        for _ in range(20):
+            query = [rng.choice(_VOCAB + ["unknown"]) for _ in range(rng.randint(1, 6))]
+            k = rng.choice([1, 3, 5, 20])
+            hits, _ = index.top_k(query, k)
+            assert hits == _reference_ranking(corpus, query, k)
+
+    def test_only_touches_matching_documents(self) -> None:
+        corpus = [["cochlea", "ear"], ["femur", "bone"], ["retina", "eye"]]
+        scores = BM25Index(corpus).get_scores(["cochlea"])
+        assert list(scores) == [0]
+
+    def test_repeated_query_terms_count_twice(self) -> None:
+        corpus = _random_corpus(1, 50)
+        index = BM25Index(corpus)
+        once = index.get_scores(["retina"])
+        twice = index.get_scores(["retina", "retina"])
+        for doc_id, score in once.items():
+            assert twice[doc_id] == pytest.approx(2 * score)
+
+    def test_ties_keep_corpus_order(self) -> None:
+        corpus = [["lens"], ["optics"], ["lens"], ["cell"], ["lens"], ["axon"], ["atp"]]
+        hits, _ = BM25Index(corpus).top_k(["lens"], 2)
+        assert [doc_id for doc_id, _ in hits] == [0, 2]
+
+    def test_unknown_terms(self) -> None:
+        index = BM25Index([["cochlea"], ["femur"]])
+        assert index.top_k(["wormhole"], 5) == ([], 0)
+
+
+class TestTopKPruning:
+    def test_long_query_skips_most_matching_documents(self) -> None:
+        rng = random.Random(7)
+        filler = ["the", "of", "and", "in", "between", "difference", "explain"]
+        corpus = [[rng.choice(filler) for _ in range(30)] for _ in range(2000)]
+        for doc_id in (10, 500, 1500):
+            corpus[doc_id] += ["rods", "cones", "retina"]
+        index = BM25Index(corpus)
+
+        query = ["explain", "the", "difference", "between", "rods", "and", "cones", "in", "the", "retina"]
+        hits, docs_scored = index.top_k(query, 3)
+
+        assert sorted(doc_id for doc_id, _ in hits) == [10, 500, 1500]
+        assert len(index.get_scores(query)) == 2000
+        assert docs_scored < 100
+
+    def test_docs_scored_counts_exact_evaluations(self) -> None:
+        index = BM25Index([["cochlea"], ["femur"], ["cochlea", "ear"]])
+        hits, docs_scored = index.top_k(["cochlea"], 5)
+        assert len(hits) == 2
+        assert docs_scored == 2
+
+
+class TestQueryIndex:
+    def test_query_index_returns_chunks(self) -> None:
+        bm25, corpus = build_index(SAMPLE_CHUNKS)
+        assert len(corpus) == len(SAMPLE_CHUNKS)
+        results = query_index(bm25, SAMPLE_CHUNKS, "cochlea inner ear")
+        assert results[0]["section_title"] == "Inner Ear"
+        assert results[0]["relevance_score"] > 0
+
+    def test_query_index_empty(self) -> None:
+        bm25, _ = build_index([])
+        assert bm25 is None
+        assert query_index(bm25, [], "cochlea") == []
+
+
+class TestLiveUpdates:
+    @pytest.mark.parametrize("seed", range(5))
+    def test_add_documents_matches_fresh_build(self, seed: int) -> None:
+        corpus = _random_corpus(seed, 150)
+        extra = _random_corpus(seed + 50, 40) + [["brand-new", "retina"]]
+        index = BM25Index(corpus)
+        added = index.add_documents(extra)
+        fresh = BM25Index(corpus + extra)
+
+        assert list(added) == list(range(150, 191))
+        rng = random.Random(seed)
+        for _ in range(20):
+            query = [rng.choice(_VOCAB + ["brand-new"]) for _ in range(rng.randint(1, 6))]
+            assert index.top_k(query, 5) == fresh.top_k(query, 5)
+
+    def test_deleted_documents_are_skipped(self) -> None:
+        corpus = [["cochlea", "ear"], ["cochlea"], ["femur"], ["retina"], ["axon"], ["lens"]]
+        index = BM25Index(corpus)
+        index.delete_documents([0])
+
+        hits, _ = index.top_k(["cochlea"], 5)
+        assert [doc_id for doc_id, _ in hits] == [1]
+        assert 0 not in index.get_scores(["cochlea", "ear"])
+        assert index.live_count == 5
+
+    def test_pruning_bounds_stay_valid_after_growth(self) -> None:
+        short = [["lens"] + ["cell"] * 2 for _ in range(50)]
+        long_docs = [["lens", "lens"] + ["axon"] * 60 for _ in range(50)]
+        index = BM25Index(short)
+        index.add_documents(long_docs)
+        fresh = BM25Index(short + long_docs)
+        assert index.top_k(["lens", "cell"], 3) == fresh.top_k(["lens", "cell"], 3)
@@ -0,0 +1,152 @@
+"""Tests for the write-behind chat history writer."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.telemetry import get_metrics
+from app.services import chat_history
+from app.storage.db import get_db, init_db
+
+
+class FakeStore:
+    """Stands in for save_chat_messages, recording each batch."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.batches: list[list[tuple]] = []
+        self.failures = failures
+
+    def __call__(self, rows) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk I/O error")
+        self.batches.append(list(rows))
+
+    @property
+    def contents(self) -> list[str]:
+        return [row[3] for batch in self.batches for row in batch]
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> FakeStore:
+    fake = FakeStore()
+    monkeypatch.setattr(chat_history, "save_chat_messages", fake)
+    monkeypatch.setattr(chat_history, "CHAT_HISTORY_FLUSH_MS", 10)
+    monkeypatch.setattr(chat_history, "CHAT_HISTORY_BATCH_ROWS", 4)
+    monkeypatch.setattr(chat_history, "CHAT_HISTORY_MAX_PENDING", 6)
+    monkeypatch.setattr(chat_history, "_pending", [])
+    return fake
+
+
+def _dropped() -> int:
+    return get_metrics()["counters"].get("chat_history.dropped", 0)
+
+
+def _turn(n: int) -> tuple:
+    return ("s1", "Sam", f"question {n}", f"answer {n}", "explain")
+
+
+class TestChatHistoryWriter:
+    def test_turns_are_written_in_batches(self, store) -> None:
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            for n in range(4):
+                await chat_history.record_turn(*_turn(n))
+            await asyncio.sleep(0.05)
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert store.contents[:2] == ["question 0", "answer 0"]
+        assert len(store.contents) == 8
+        assert all(len(batch) <= 4 for batch in store.batches)
+
+    def test_stop_flushes_what_is_left(self, store, monkeypatch) -> None:
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_FLUSH_MS", 60_000)
+
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            await chat_history.record_turn(*_turn(1))
+            assert store.batches == []
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert store.contents == ["question 1", "answer 1"]
+        assert chat_history.stats()["pending"] == 0
+
+    def test_full_buffer_makes_callers_wait(self, store, monkeypatch) -> None:
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_FLUSH_MS", 60_000)
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_BATCH_ROWS", 100)
+
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            for n in range(3):
+                await chat_history.record_turn(*_turn(n))
+            # 6 rows pending: the next turn waits, and prompts a flush
+            await asyncio.wait_for(chat_history.record_turn(*_turn(3)), 1)
+            assert len(store.batches) == 1 and len(store.contents) == 6
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert len(store.contents) == 8
+
+    def test_failed_write_is_retried(self, store) -> None:
+        store.failures = 1
+
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            await chat_history.record_turn(*_turn(1))
+            await asyncio.sleep(0.05)
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert store.contents == ["question 1", "answer 1"]
+
+    def test_full_buffer_drops_turns_while_writes_fail(self, store, monkeypatch) -> None:
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_FLUSH_MS", 60_000)
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_BATCH_ROWS", 100)
+        store.failures = 100
+        dropped = _dropped()
+
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            for n in range(3):
+                await chat_history.record_turn(*_turn(n))
+            # The flush this prompts fails: the turn is dropped, not left waiting
+            await asyncio.wait_for(chat_history.record_turn(*_turn(3)), 1)
+            assert chat_history.stats()["pending"] == 6
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert _dropped() == dropped + 2
+        assert store.batches == []
+
+    def test_wait_for_room_is_bounded(self, store, monkeypatch) -> None:
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_FLUSH_MS", 60_000)
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_BATCH_ROWS", 100)
+        monkeypatch.setattr(chat_history, "CHAT_HISTORY_WAIT_MS", 50)
+        monkeypatch.setattr(chat_history, "save_chat_messages", lambda rows: time.sleep(0.5))
+        dropped = _dropped()
+
+        async def scenario() -> None:
+            chat_history.start_history_writer()
+            for n in range(3):
+                await chat_history.record_turn(*_turn(n))
+            started = time.monotonic()
+            await chat_history.record_turn(*_turn(3))
+            assert time.monotonic() - started < 0.4
+            await chat_history.stop_history_writer()
+
+        asyncio.run(scenario())
+        assert _dropped() == dropped + 2
+
+    def test_without_writer_turns_are_saved_at_once(self, tmp_path, monkeypatch) -> None:
+        db_path = str(tmp_path / "test.db")
+        monkeypatch.setattr("app.settings.DB_PATH", db_path)
+        monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+        init_db()
+
+        asyncio.run(chat_history.record_turn(*_turn(1)))
+        with get_db() as conn:
+            rows = conn.execute("SELECT role, content FROM chat_history ORDER BY id").fetchall()
+        assert [tuple(r) for r in rows] == [("user", "question 1"), ("assistant", "answer 1")]
@@ -0,0 +1,268 @@
+"""Tests for the streaming chat pipeline and client-disconnect cancellation."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core.errors import LLMTimeoutError, LLMUnavailableError, QuotaExceededError
+from app.core.executors import executor_stats
+from app.core.telemetry import get_metrics
+from app.retrieval.search import StudySearch
+from app.services import chat_history, chat_service
+from app.storage.db import init_db
+
+CHUNKS = [
+    {
+        "id": "001",
+        "source_file": "anatomy.docx",
+        "source_type": "docx",
+        "section_title": "Inner Ear",
+        "content": "The cochlea is a spiral-shaped cavity in the inner ear.",
+        "page_or_slide": None,
+        "word_count": 10,
+    },
+]
+
+
+class FakeGemini:
+    """Stands in for gemini_client.chat_stream; records whether it was closed."""
+
+    def __init__(self, parts: list[str], error: Exception | None = None) -> None:
+        self.parts = parts
+        self.error = error
+        self.sent = 0
+        self.closed = False
+        self.system_prompt = None
+
+    async def __call__(self, messages, system_prompt):
+        self.system_prompt = system_prompt
+        try:
+            for part in self.parts:
+                await asyncio.sleep(0)
+                self.sent += 1
+                yield part
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def stream_env(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    init_db()
+    saved: list[tuple[str, str]] = []
+    monkeypatch.setattr(chat_service, "check_rate_limit", lambda student_id: None)
+    monkeypatch.setattr(chat_service, "get_weak_areas", lambda student_id: [])
+    monkeypatch.setattr(
+        chat_history, "save_chat_messages",
+        lambda rows: saved.extend((role, content) for _, _, role, content, _, _ in rows),
+    )
+
+    def install(parts: list[str], error: Exception | None = None) -> FakeGemini:
+        fake = FakeGemini(parts, error)
+        monkeypatch.setattr(chat_service, "gemini_chat_stream", fake)
+        return fake
+
+    engine = StudySearch()
+    engine.load_chunks_from_list(CHUNKS)
+    return install, engine, saved
+
+
+def _stream(engine: StudySearch, is_disconnected=None, message: str = "Explain the cochlea"):
+    return chat_service.handle_chat_stream(
+        message=message,
+        student_id="s1",
+        student_name="Sam",
+        conversation_history=[],
+        search_engine=engine,
+        is_disconnected=is_disconnected,
+    )
+
+
+def _wait_for_db() -> None:
+    """Let fire-and-forget history writes (cancelled streams) finish."""
+    deadline = time.monotonic() + 2
+    while executor_stats()["db"]["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _counter(name: str) -> int:
+    return get_metrics()["counters"].get(name, 0)
+
+
+def _cancelled() -> int:
+    return _counter("chat_stream.cancelled")
+
+
+async def _events(stream) -> list[dict]:
+    return [json.loads(e[len("data: "):]) async for e in stream]
+
+
+class TestChatStream:
+    def test_complete_stream_saves_full_answer(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        install(["The cochlea ", "converts sound."])
+
+        events = asyncio.run(_events(_stream(engine)))
+        assert [e["type"] for e in events] == ["meta", "token", "token", "done"]
+        assert saved == [("user", "Explain the cochlea"), ("assistant", "The cochlea converts sound.")]
+
+    def test_disconnect_stops_upstream_and_keeps_partial(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        fake = install(["one ", "two ", "three ", "four "])
+        checks = 0
+
+        async def is_disconnected() -> bool:
+            nonlocal checks
+            checks += 1
+            return checks > 3  # one pre-stream check, then two tokens get through
+
+        async def collect() -> list[str]:
+            return [e async for e in _stream(engine, is_disconnected)]
+
+        before = _cancelled()
+        events = asyncio.run(collect())
+        _wait_for_db()
+
+        assert sum('"token"' in e for e in events) == 2
+        assert not any('"done"' in e for e in events)
+        assert fake.closed and fake.sent == 3
+        assert saved == [("user", "Explain the cochlea"), ("assistant", "one two ")]
+        assert _cancelled() == before + 1
+
+    def test_closed_generator_keeps_partial(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        fake = install(["one ", "two ", "three "])
+
+        async def read_then_close() -> None:
+            stream = _stream(engine)
+            await anext(stream)  # meta
+            await anext(stream)  # first token
+            await stream.aclose()  # what the server does when the client goes away
+
+        before = _cancelled()
+        asyncio.run(read_then_close())
+        _wait_for_db()
+
+        assert fake.closed
+        assert saved == [("user", "Explain the cochlea"), ("assistant", "one ")]
+        assert _cancelled() == before + 1
+
+    def test_disconnect_before_llm_call_skips_it(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        fake = install(["unused"])
+
+        async def gone() -> bool:
+            return True
+
+        async def collect() -> list[str]:
+            return [e async for e in _stream(engine, gone)]
+
+        assert asyncio.run(collect()) == []
+        assert fake.sent == 0
+        assert saved == []
+
+    def test_quota_refusal_raised_before_first_event(self, stream_env, monkeypatch) -> None:
+        _, engine, saved = stream_env
+
+        async def refused(messages, system_prompt):
+            raise QuotaExceededError(30)
+            yield  # pragma: no cover
+
+        monkeypatch.setattr(chat_service, "gemini_chat_stream", refused)
+        with pytest.raises(QuotaExceededError):
+            asyncio.run(anext(_stream(engine)))
+        assert saved == []
+
+
+class TestDegradedStream:
+    def test_failure_before_first_chunk_quotes_materials(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        install([], error=LLMUnavailableError("503 UNAVAILABLE"))
+        other = [dict(CHUNKS[0], id=f"00{i}", section_title=f"Other {i}", content="Mitochondria make ATP.") for i in (2, 3)]
+        engine.load_chunks_from_list(CHUNKS + other)  # a corpus where the cochlea chunk scores
+
+        events = asyncio.run(_events(_stream(engine)))
+        assert [e["type"] for e in events][0] == "meta" and events[-1]["type"] == "done"
+        text = "".join(e["text"] for e in events if e["type"] == "token")
+        assert text.startswith("Gemini is unavailable")
+        assert "The cochlea is a spiral-shaped cavity" in text
+        assert saved[-1][0] == "assistant"
+
+    def test_failure_mid_stream_keeps_partial_answer(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        install(["The cochlea "], error=LLMTimeoutError())
+
+        events = asyncio.run(_events(_stream(engine)))
+        tokens = [e["text"] for e in events if e["type"] == "token"]
+        assert tokens[0] == "The cochlea " and "too long" in tokens[1]
+        assert events[-1]["type"] == "done"
+
+
+class TestCachedStream:
+    def test_repeat_question_is_replayed_from_cache(self, stream_env) -> None:
+        install, engine, saved = stream_env
+        answer = "The cochlea is a fluid-filled spiral. " * 6
+        first = install([answer[:50], answer[50:]])
+        live = asyncio.run(_events(_stream(engine)))
+
+        second = install(["should not be called"])
+        hits = _counter("llm_cache.hit")
+        replayed = asyncio.run(_events(_stream(engine, message="  explain the COCHLEA? ")))
+
+        assert first.sent == 2 and second.sent == 0
+        assert _counter("llm_cache.hit") == hits + 1
+        assert [e["type"] for e in replayed][0] == "meta" and replayed[-1]["type"] == "done"
+        assert len([e for e in replayed if e["type"] == "token"]) > 1
+        text = lambda events: "".join(e["text"] for e in events if e["type"] == "token")
+        assert text(replayed) == text(live) == answer
+        assert saved[-1] == ("assistant", answer.strip())
+
+    def test_only_new_content_invalidates(self, stream_env) -> None:
+        install, engine, _ = stream_env
+        install(["first answer"])
+        asyncio.run(_events(_stream(engine)))
+
+        engine.load_chunks_from_list(CHUNKS)  # same content, as after a restart
+        fake = install(["second answer"])
+        asyncio.run(_events(_stream(engine)))
+        assert fake.sent == 0
+
+        engine.load_chunks_from_list([dict(CHUNKS[0], content=CHUNKS[0]["content"] + " It holds fluid.")])
+        asyncio.run(_events(_stream(engine)))
+        assert fake.sent == 1
+
+    def test_cached_answers_stay_personalized(self, stream_env, monkeypatch) -> None:
+        install, engine, _ = stream_env
+        monkeypatch.setattr(chat_service, "get_weak_areas", lambda student_id: ["Optics"])
+        fake = install(["answer for Sam"])
+        asyncio.run(_events(_stream(engine)))
+        assert "Sam" in fake.system_prompt and "Optics" in fake.system_prompt
+
+        # A student whose prompt would differ does not get Sam's answer
+        monkeypatch.setattr(chat_service, "get_weak_areas", lambda student_id: [])
+        fake = install(["answer without weak areas"])
+        asyncio.run(_events(_stream(engine)))
+        assert fake.sent == 1
+
+    def test_follow_ups_and_failures_are_not_cached(self, stream_env) -> None:
+        install, engine, _ = stream_env
+        install(["partial "], error=LLMUnavailableError("503"))
+        asyncio.run(_events(_stream(engine)))
+
+        fake = install(["real answer"])
+        asyncio.run(_events(_stream(engine)))
+        assert fake.sent == 1
+
+        follow_up = chat_service.handle_chat_stream(
+            message="Explain the cochlea", student_id="s1", student_name="Sam",
+            conversation_history=[{"role": "user", "content": "hi"}], search_engine=engine,
+        )
+        fake = install(["contextual answer"])
+        asyncio.run(_events(follow_up))
+        assert fake.sent == 1
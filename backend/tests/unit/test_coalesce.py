@@ -0,0 +1,148 @@
+"""Tests for single-flight coalescing of identical LLM calls."""
+
+import asyncio
+
+from app.core import telemetry
+from app.llm.coalesce import SingleFlight, fingerprint
+
+
+class Upstream:
+    """Counts calls and hands out chunks one at a time, as released by the test."""
+
+    def __init__(self, parts: list[str]) -> None:
+        self.parts = parts
+        self.calls = 0
+        self.closed = False
+        self.release = asyncio.Event()
+
+    async def answer(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return "".join(self.parts)
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            for part in self.parts:
+                await self.release.wait()
+                self.release.clear()
+                yield part
+        finally:
+            self.closed = True
+
+
+def _counter(name: str) -> int:
+    return telemetry.get_metrics()["counters"].get(name, 0)
+
+
+class TestFingerprint:
+    def test_differs_by_any_part(self) -> None:
+        assert fingerprint("chat", "m", [{"a": 1}]) == fingerprint("chat", "m", [{"a": 1}])
+        assert fingerprint("chat", "m", [{"a": 1}]) != fingerprint("chat", "m", [{"a": 2}])
+        assert fingerprint("chat", "m") != fingerprint("stream", "m")
+
+
+class TestCall:
+    def test_identical_calls_share_one_upstream(self) -> None:
+        async def scenario() -> list[str]:
+            flights = SingleFlight()
+            upstream = Upstream(["The cochlea"])
+            coalesced = _counter("llm.coalesced")
+            tasks = [asyncio.create_task(flights.call("k", upstream.answer)) for _ in range(5)]
+            await asyncio.sleep(0)
+            upstream.release.set()
+            results = await asyncio.gather(*tasks)
+            assert upstream.calls == 1
+            assert _counter("llm.coalesced") - coalesced == 4
+            assert flights.in_flight() == 0
+            return results
+
+        assert asyncio.run(scenario()) == ["The cochlea"] * 5
+
+    def test_different_keys_are_not_coalesced(self) -> None:
+        async def scenario() -> int:
+            flights = SingleFlight()
+            upstream = Upstream(["x"])
+            upstream.release.set()
+            await asyncio.gather(flights.call("a", upstream.answer), flights.call("b", upstream.answer))
+            return upstream.calls
+
+        assert asyncio.run(scenario()) == 2
+
+    def test_one_caller_cancelling_leaves_the_others(self) -> None:
+        async def scenario() -> str:
+            flights = SingleFlight()
+            upstream = Upstream(["kept"])
+            first = asyncio.create_task(flights.call("k", upstream.answer))
+            second = asyncio.create_task(flights.call("k", upstream.answer))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+            upstream.release.set()
+            return await second
+
+        assert asyncio.run(scenario()) == "kept"
+
+
+class TestStream:
+    def test_fan_out_with_replay_for_late_joiner(self) -> None:
+        async def scenario() -> tuple[list[str], list[str], int]:
+            flights = SingleFlight()
+            upstream = Upstream(["a", "b", "c"])
+            first_chunks: list[str] = []
+            first = flights.stream("k", upstream.stream)
+
+            upstream.release.set()
+            first_chunks.append(await anext(first))  # "a" is out before the second client joins
+            late = asyncio.create_task(_collect(flights.stream("k", upstream.stream)))
+            await asyncio.sleep(0)
+            for _ in range(2):
+                upstream.release.set()
+                first_chunks.append(await anext(first))
+            first_chunks += [chunk async for chunk in first]
+            return first_chunks, await late, upstream.calls
+
+        first, late, calls = asyncio.run(scenario())
+        assert first == late == ["a", "b", "c"]
+        assert calls == 1
+
+    def test_upstream_cancelled_when_every_client_leaves(self) -> None:
+        async def scenario() -> Upstream:
+            flights = SingleFlight()
+            upstream = Upstream(["a", "b", "c"])
+            one = flights.stream("k", upstream.stream)
+            two = flights.stream("k", upstream.stream)
+            upstream.release.set()
+            await anext(one)
+            await anext(two)
+            await one.aclose()
+            assert not upstream.closed  # the other client is still reading
+            await two.aclose()
+            await asyncio.sleep(0.01)
+            assert flights.in_flight() == 0
+            return upstream
+
+        assert asyncio.run(scenario()).closed
+
+    def test_upstream_error_reaches_every_client(self) -> None:
+        async def failing():
+            yield "partial"
+            raise RuntimeError("boom")
+
+        async def scenario() -> list:
+            flights = SingleFlight()
+
+            async def consume() -> str:
+                try:
+                    await _collect(flights.stream("k", failing))
+                except RuntimeError as e:
+                    return str(e)
+                return "no error"
+
+            return await asyncio.gather(consume(), consume())
+
+        assert asyncio.run(scenario()) == ["boom", "boom"]
+
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
@@ -0,0 +1,55 @@
+"""Tests for the pooled SQLite connection layer."""
+
+import pytest
+
+from app.storage import db
+from app.storage.db import get_db, init_db
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch: pytest.MonkeyPatch) -> str:
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", path)
+    init_db()
+    return path
+
+
+class TestPool:
+    def test_connections_are_reused_and_tuned(self, db_path) -> None:
+        with get_db() as conn:
+            first = conn
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        with get_db() as conn:
+            assert conn is first
+
+    def test_nested_use_gets_a_second_connection(self, db_path) -> None:
+        with get_db() as outer, get_db() as inner:
+            assert outer is not inner
+
+    def test_error_rolls_back_before_reuse(self, db_path) -> None:
+        with pytest.raises(RuntimeError):
+            with get_db() as conn:
+                conn.execute("INSERT INTO chat_history (role, content) VALUES ('user', 'lost')")
+                raise RuntimeError("boom")
+        with get_db() as conn:
+            assert not conn.in_transaction
+            assert conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0] == 0
+
+    def test_new_db_path_gets_a_new_pool(self, db_path, tmp_path, monkeypatch) -> None:
+        with get_db() as conn:
+            conn.execute("INSERT INTO chat_history (role, content) VALUES ('user', 'hi')")
+        other = str(tmp_path / "other.db")
+        monkeypatch.setattr("app.storage.db.DB_PATH", other)
+        init_db()
+        with get_db() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0] == 0
+
+    def test_pool_keeps_at_most_size_idle(self, db_path, monkeypatch) -> None:
+        db.close_db()
+        monkeypatch.setattr(db, "DB_POOL_SIZE", 2)
+        with get_db(), get_db(), get_db():
+            pass
+        assert db._current_pool().idle.qsize() == 2
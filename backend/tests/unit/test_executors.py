@@ -0,0 +1,156 @@
+"""Tests for the search thread pool and CPU process pool."""
+
+import asyncio
+import os
+import threading
+import time
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core import executors
+from app.retrieval.processor.progress import report_error, report_pages
+
+
+def extract_pages(pages: int) -> str:
+    for page in range(1, pages + 1):
+        report_pages(page, pages)
+    return f"{pages} pages"
+
+
+def extract_broken() -> list:
+    report_error("corrupt xref table")
+    return []
+
+
+def explode() -> None:
+    raise ValueError("boom")
+
+
+def crash() -> None:
+    os._exit(1)  # as if the worker were OOM-killed
+
+
+def worker_flag() -> bool:
+    return executors.in_cpu_worker()
+
+
+class Reporter:
+    def __init__(self) -> None:
+        self.pages: list[tuple[int, int]] = []
+        self.errors: list[str] = []
+        self.finished = threading.Event()
+
+    def on_pages(self, done: int, total: int) -> None:
+        self.pages.append((done, total))
+        if done == total:
+            self.finished.set()
+
+    def on_error(self, message: str) -> None:
+        self.errors.append(message)
+
+
+@pytest.fixture(scope="module")
+def cpu_pool():
+    """One real process pool for the module; spawning is slow."""
+    mp = pytest.MonkeyPatch()
+    mp.setattr(executors, "CPU_WORKERS", 2)
+    yield
+    executors.shutdown_executors()
+    mp.undo()
+
+
+class TestCpuPool:
+    def test_runs_in_worker_process(self, cpu_pool) -> None:
+        assert executors.run_cpu_sync(worker_flag) is True
+        assert executors.in_cpu_worker() is False
+
+    def test_progress_is_forwarded(self, cpu_pool) -> None:
+        reporter = Reporter()
+        assert executors.run_cpu_sync(extract_pages, 3, reporter=reporter) == "3 pages"
+        # Page updates stream over a queue and may trail the result slightly
+        assert reporter.finished.wait(5)
+        assert reporter.pages == [(1, 3), (2, 3), (3, 3)]
+
+    def test_errors_arrive_with_result(self, cpu_pool) -> None:
+        reporter = Reporter()
+        assert executors.run_cpu_sync(extract_broken, reporter=reporter) == []
+        assert reporter.errors == ["corrupt xref table"]
+
+    def test_exceptions_propagate_and_count(self, cpu_pool) -> None:
+        failed = executors.executor_stats()["cpu"]["failed"]
+        with pytest.raises(ValueError, match="boom"):
+            executors.run_cpu_sync(explode)
+        stats = executors.executor_stats()["cpu"]
+        assert stats["failed"] == failed + 1
+        assert stats["in_flight"] == 0 and stats["workers"] == 2
+
+    def test_async_wrapper(self, cpu_pool) -> None:
+        assert asyncio.run(executors.run_cpu(extract_pages, 2)) == "2 pages"
+
+    def test_broken_pool_is_replaced_without_leaking_its_forwarder(self, cpu_pool) -> None:
+        def forwarders() -> int:
+            return sum(t.name == "cpu-progress" and t.is_alive() for t in threading.enumerate())
+
+        executors.run_cpu_sync(worker_flag)
+        with pytest.raises(BrokenProcessPool):
+            executors.run_cpu_sync(crash)
+        deadline = time.monotonic() + 5
+        while forwarders() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert forwarders() == 0
+
+        reporter = Reporter()
+        assert executors.run_cpu_sync(extract_pages, 2, reporter=reporter) == "2 pages"
+        assert reporter.finished.wait(5)
+        assert forwarders() == 1
+
+
+class TestInlineAndSearch:
+    def test_zero_workers_runs_inline_with_reporter(self, monkeypatch) -> None:
+        monkeypatch.setattr(executors, "CPU_WORKERS", 0)
+        reporter = Reporter()
+        assert executors.run_cpu_sync(lambda: extract_pages(2), reporter=reporter) == "2 pages"
+        assert reporter.pages == [(1, 2), (2, 2)]
+
+    def test_search_pool_counts_queue_depth(self, monkeypatch) -> None:
+        monkeypatch.setattr(executors, "SEARCH_THREADS", 1)
+        monkeypatch.setattr(executors, "_search_pool", None)
+        release = threading.Event()
+        futures = [executors.submit_search(release.wait, 5) for _ in range(3)]
+
+        stats = executors.executor_stats()["search"]
+        assert stats["in_flight"] == 3 and stats["queue_depth"] == 2
+
+        release.set()
+        assert all(f.result(5) for f in futures)
+        assert executors.executor_stats()["search"]["in_flight"] == 0
+        executors._search_pool.shutdown()
+        monkeypatch.setattr(executors, "_search_pool", None)
+
+    def test_run_search_awaits_result(self) -> None:
+        assert asyncio.run(executors.run_search(sum, [1, 2, 3])) == 6
+
+
+class TestDbPool:
+    def test_slow_storage_call_does_not_block_the_loop(self) -> None:
+        async def scenario() -> tuple[str, int]:
+            ticks = 0
+
+            async def ticker() -> None:
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            # Stands in for a write waiting on an fsync or the SQLite lock
+            result = await executors.run_db(lambda: time.sleep(0.2) or "written")
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(scenario())
+        assert result == "written"
+        assert ticks >= 10
+        assert executors.executor_stats()["db"]["workers"] == executors.DB_THREADS
@@ -0,0 +1,157 @@
+"""Tests for PDF extraction, including page-parallel extraction."""
+
+import pytest
+
+from app.retrieval.processor import extract_pdf as pdf_module
+from app.retrieval.processor.extract_pdf import _may_have_tables, _page_ranges, extract_pdf
+
+
+def make_pdf(
+    path,
+    pages: list[list[str]],
+    tables: dict[int, list[list[str]]] | None = None,
+    drawings: dict[int, list[str]] | None = None,
+) -> None:
+    """
+    Write a minimal PDF: one Helvetica text line per string, plus optional
+    ruled tables and raw drawing operators keyed by 1-based page number.
+    """
+    tables = tables or {}
+    drawings = drawings or {}
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    page_ids = []
+    for page_num, lines in enumerate(pages, 1):
+        ops = ["BT /F1 10 Tf 12 TL 50 750 Td"]
+        ops += [f"({escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        ops += drawings.get(page_num, [])
+        rows = tables.get(page_num, [])
+        if rows:
+            cols = len(rows[0])
+            top, height, width = 300, 20, 120
+            for r in range(len(rows) + 1):
+                y = top - r * height
+                ops.append(f"50 {y} m {50 + cols * width} {y} l S")
+            for c in range(cols + 1):
+                x = 50 + c * width
+                ops.append(f"{x} {top} m {x} {top - len(rows) * height} l S")
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    ops.append(f"BT /F1 9 Tf {55 + c * width} {top - (r + 1) * height + 6} Td ({escape(cell)}) Tj ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content)
+        ))
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    path.write_bytes(bytes(out))
+
+
+def page_lines(page_num: int) -> list[str]:
+    return [f"Page {page_num} covers topic {page_num} in detail, line {i} of the notes." for i in range(12)]
+
+
+@pytest.fixture
+def images_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_module, "IMAGES_DIR", tmp_path / "images")
+
+
+class TestExtractPdf:
+    def test_text_and_tables(self, tmp_path, images_dir) -> None:
+        path = tmp_path / "rules.pdf"
+        make_pdf(path, [page_lines(1), page_lines(2)], tables={2: [["Event", "Points"], ["Anatomy", "50"]]})
+        chunks = extract_pdf(str(path))
+
+        assert [c.page_or_slide for c in chunks] == [1, 2, 2]
+        assert "topic 1" in chunks[0].content
+        assert chunks[2].section_title == "Page 2 — Table 1"
+        assert chunks[2].content == "Event | Points\nAnatomy | 50"
+
+    def test_table_precheck_flags_only_ruled_pages(self, tmp_path) -> None:
+        import pypdfium2 as pdfium
+
+        path = tmp_path / "mixed.pdf"
+        make_pdf(path, [page_lines(1), page_lines(2)], tables={2: [["x", "y"], ["1", "2"]]})
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            assert [_may_have_tables(pdf[i]) for i in range(2)] == [False, True]
+        finally:
+            pdf.close()
+
+    def test_table_precheck_ignores_boxes_and_lone_rules(self, tmp_path) -> None:
+        import pypdfium2 as pdfium
+
+        path = tmp_path / "boxes.pdf"
+        boxes = ["40 400 300 200 re S", "360 500 200 120 re S", "380 520 160 80 re f"]
+        underlines = ["50 700 m 300 700 l S", "50 680 m 300 680 l S", "320 650 m 320 600 l S"]
+        make_pdf(path, [page_lines(1), page_lines(2)], drawings={1: boxes, 2: underlines})
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            assert [_may_have_tables(pdf[i]) for i in range(2)] == [False, False]
+        finally:
+            pdf.close()
+
+    def test_text_only_pdf_skips_pdfplumber(self, tmp_path, images_dir, monkeypatch) -> None:
+        import pdfplumber
+
+        def fail(*args, **kwargs):
+            raise AssertionError("pdfplumber opened for a page without tables")
+
+        monkeypatch.setattr(pdfplumber, "open", fail)
+        path = tmp_path / "notes.pdf"
+        make_pdf(path, [page_lines(n) for n in range(1, 4)])
+        chunks = extract_pdf(str(path))
+
+        assert [c.page_or_slide for c in chunks] == [1, 2, 3]
+        assert chunks[1].content.splitlines()[0] == page_lines(2)[0]
+
+    def test_page_ranges_cover_every_page_once(self) -> None:
+        for pages, workers in [(1, 4), (40, 4), (301, 8), (1000, 2)]:
+            ranges = _page_ranges(pages, workers)
+            covered = [p for first, last in ranges for p in range(first, last + 1)]
+            assert covered == list(range(1, pages + 1))
+
+    def test_parallel_matches_sequential(self, tmp_path, images_dir, monkeypatch) -> None:
+        path = tmp_path / "manual.pdf"
+        make_pdf(path, [page_lines(n) for n in range(1, 41)], tables={7: [["a", "b"], ["c", "d"]]})
+
+        sequential = extract_pdf(str(path))
+        monkeypatch.setattr(pdf_module, "PDF_PARALLEL_MIN_PAGES", 10)
+        monkeypatch.setattr(pdf_module, "PDF_PAGE_WORKERS", 3)
+        parallel = extract_pdf(str(path))
+
+        assert parallel == sequential
+        assert [c.page_or_slide for c in parallel] == sorted(c.page_or_slide for c in parallel)
+
+    def test_failed_range_fails_the_file(self, tmp_path, images_dir, monkeypatch) -> None:
+        path = tmp_path / "manual.pdf"
+        make_pdf(path, [page_lines(n) for n in range(1, 21)])
+        monkeypatch.setattr(pdf_module, "PDF_PARALLEL_MIN_PAGES", 10)
+        monkeypatch.setattr(pdf_module, "PDF_PAGE_WORKERS", 2)
+        monkeypatch.setattr(pdf_module, "run_isolated", lambda *a, **kw: [[], pdf_module.WorkerFailed("boom")])
+
+        with pytest.raises(RuntimeError, match="pages 9-16: boom"):
+            extract_pdf(str(path))
@@ -0,0 +1,122 @@
+"""Tests for the content-hash extraction cache."""
+
+import hashlib
+
+import pytest
+
+from app.retrieval.processor import chunking
+from app.retrieval.processor.cache import ExtractionCache
+from app.retrieval.processor.chunking import directory_sources, process_directory, process_file
+
+TEXT = " ".join(f"photosynthesis converts light energy word{i}" for i in range(20))
+
+
+@pytest.fixture
+def cache(tmp_path) -> ExtractionCache:
+    (tmp_path / "images").mkdir()
+    return ExtractionCache(tmp_path / "cache", tmp_path / "images")
+
+
+@pytest.fixture
+def counting_extractor(monkeypatch) -> list[str]:
+    """Wrap the .txt extractor and record each file it actually extracts."""
+    calls: list[str] = []
+    original = chunking.EXTRACTORS[".txt"]
+
+    def extractor(filepath: str):
+        calls.append(filepath)
+        return original(filepath)
+
+    monkeypatch.setitem(chunking.EXTRACTORS, ".txt", extractor)
+    return calls
+
+
+class TestExtractionCache:
+    def test_second_run_is_served_from_cache(self, tmp_path, cache, counting_extractor) -> None:
+        path = tmp_path / "notes.txt"
+        path.write_text(TEXT)
+
+        first = process_file(str(path), cache)
+        second = process_file(str(path), cache)
+
+        assert len(counting_extractor) == 1
+        assert first and second == first
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+        assert stats["entries"] == 1 and stats["size_bytes"] > 0
+
+    def test_changed_content_misses(self, tmp_path, cache, counting_extractor) -> None:
+        path = tmp_path / "notes.txt"
+        path.write_text(TEXT)
+        process_file(str(path), cache)
+        path.write_text(TEXT + " chlorophyll")
+        chunks = process_file(str(path), cache)
+
+        assert len(counting_extractor) == 2
+        assert "chlorophyll" in chunks[-1].content
+
+    def test_same_bytes_under_another_name_misses(self, tmp_path, cache, counting_extractor) -> None:
+        (tmp_path / "a.txt").write_text(TEXT)
+        (tmp_path / "b.txt").write_text(TEXT)
+        process_file(str(tmp_path / "a.txt"), cache)
+        chunks = process_file(str(tmp_path / "b.txt"), cache)
+
+        assert len(counting_extractor) == 2
+        assert chunks[0].source_file == "b.txt"
+
+    def test_extractor_version_bump_invalidates(self, tmp_path, cache, counting_extractor, monkeypatch) -> None:
+        path = tmp_path / "notes.txt"
+        path.write_text(TEXT)
+        process_file(str(path), cache)
+        monkeypatch.setattr("app.retrieval.processor.cache.EXTRACTOR_VERSION", 999)
+        process_file(str(path), cache)
+
+        assert len(counting_extractor) == 2
+
+    def test_missing_image_forces_re_extraction(self, tmp_path, cache) -> None:
+        path = tmp_path / "slides.txt"
+        path.write_text("Diagram ![cell](/api/images/slides_p1_cell%20wall.png)")
+        image = tmp_path / "images" / "slides_p1_cell wall.png"
+        image.write_bytes(b"png")
+
+        key = cache.key_for(str(path))
+        chunks = process_file(str(path), cache)
+        assert cache.get(key) == (chunks, ["slides_p1_cell wall.png"])
+
+        image.unlink()
+        assert cache.get(key) is None
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path, cache) -> None:
+        path = tmp_path / "notes.txt"
+        path.write_text(TEXT)
+        key = cache.key_for(str(path))
+        process_file(str(path), cache)
+        cache._path(key).write_text("{not json")
+
+        assert cache.get(key) is None
+        assert process_file(str(path), cache)
+
+    def test_clear(self, tmp_path, cache, counting_extractor) -> None:
+        for name in ("a.txt", "b.txt"):
+            (tmp_path / name).write_text(TEXT)
+        process_directory(str(tmp_path), cache)
+
+        assert cache.clear() == 2
+        assert cache.stats()["entries"] == 0
+        process_directory(str(tmp_path), cache)
+        assert len(counting_extractor) == 4
+
+    def test_no_cache_always_extracts(self, tmp_path, counting_extractor) -> None:
+        path = tmp_path / "notes.txt"
+        path.write_text(TEXT)
+        process_file(str(path), None)
+        process_file(str(path), None)
+
+        assert len(counting_extractor) == 2
+
+    def test_directory_sources_hash_supported_files(self, tmp_path) -> None:
+        (tmp_path / "a.txt").write_text(TEXT)
+        (tmp_path / "skip.exe").write_bytes(b"MZ")
+
+        sources = directory_sources(str(tmp_path))
+        assert sources == {"a.txt": hashlib.sha256(TEXT.encode()).hexdigest()}
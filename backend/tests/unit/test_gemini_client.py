@@ -0,0 +1,163 @@
+"""Tests for the async Gemini client, against a fake SDK client."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.errors import LLMRateLimitedError, LLMTimeoutError
+from app.llm import gemini_client, quota
+from app.llm.resilience import CircuitBreaker, RetryPolicy
+
+MESSAGES = [{"role": "user", "content": "What is the cochlea?"}]
+
+
+class FakeStream:
+    def __init__(self, parts: list[str], delay: float) -> None:
+        self.parts = list(parts)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.parts:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(text=self.parts.pop(0))
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class FakeModels:
+    def __init__(self, delay: float = 0.0, parts: list[str] | None = None, error: Exception | None = None) -> None:
+        self.delay = delay
+        self.parts = parts or ["The cochlea ", "is in the inner ear."]
+        self.error = error
+        self.streams: list[FakeStream] = []
+
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text="".join(self.parts))
+
+    async def generate_content_stream(self, model, contents, config):
+        if self.error:
+            raise self.error
+        stream = FakeStream(self.parts, self.delay)
+        self.streams.append(stream)
+        return stream
+
+
+@pytest.fixture
+def fake_models(monkeypatch: pytest.MonkeyPatch):
+    def install(**kwargs) -> FakeModels:
+        models = FakeModels(**kwargs)
+        client = SimpleNamespace(aio=SimpleNamespace(models=models))
+        monkeypatch.setattr(gemini_client, "_get_client", lambda: client)
+        # No quota limits here; the scheduler has its own tests
+        monkeypatch.setattr(quota, "scheduler", quota.QuotaScheduler(per_minute=0, per_day=0))
+        monkeypatch.setattr(gemini_client, "_retry", RetryPolicy(attempts=1))
+        monkeypatch.setattr(gemini_client, "_breaker", CircuitBreaker())
+        return models
+
+    return install
+
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+class TestChat:
+    def test_returns_text(self, fake_models) -> None:
+        fake_models()
+        text = asyncio.run(gemini_client.chat(MESSAGES, "system"))
+        assert text == "The cochlea is in the inner ear."
+
+    def test_concurrent_calls_share_the_event_loop(self, fake_models) -> None:
+        fake_models(delay=0.2)
+
+        async def many() -> list[str]:
+            # Distinct prompts, so the calls are not coalesced into one
+            return await asyncio.gather(
+                *(gemini_client.chat([{"role": "user", "content": f"Question {i}"}], "system") for i in range(100))
+            )
+
+        start = time.monotonic()
+        results = asyncio.run(many())
+        assert len(results) == 100
+        # Sequential calls would take 20s
+        assert time.monotonic() - start < 2
+
+    def test_identical_concurrent_calls_are_coalesced(self, fake_models) -> None:
+        models = fake_models(delay=0.05)
+        calls = 0
+        original = models.generate_content
+
+        async def counting(**kwargs):
+            nonlocal calls
+            calls += 1
+            return await original(**kwargs)
+
+        models.generate_content = counting
+
+        async def same() -> list[str]:
+            return await asyncio.gather(*(gemini_client.chat(MESSAGES, "system") for _ in range(3)))
+
+        assert asyncio.run(same()) == ["The cochlea is in the inner ear."] * 3
+        assert calls == 1
+
+    def test_timeout(self, fake_models) -> None:
+        fake_models(delay=1.0)
+        with pytest.raises(LLMTimeoutError):
+            asyncio.run(gemini_client.chat(MESSAGES, "system", timeout=0.05))
+
+    def test_quota_error_is_structured(self, fake_models) -> None:
+        fake_models(error=RuntimeError("429 RESOURCE_EXHAUSTED"))
+        with pytest.raises(LLMRateLimitedError) as exc:
+            asyncio.run(gemini_client.chat(MESSAGES, "system"))
+        assert "daily API limit" in exc.value.message
+
+
+class TestChatStream:
+    def test_yields_chunks_in_order(self, fake_models) -> None:
+        models = fake_models()
+        chunks = asyncio.run(_collect(gemini_client.chat_stream(MESSAGES, "system")))
+        assert chunks == ["The cochlea ", "is in the inner ear."]
+        assert models.streams[0].closed
+
+    def test_identical_concurrent_streams_fan_out(self, fake_models) -> None:
+        models = fake_models(delay=0.01)
+
+        async def both() -> list[list[str]]:
+            return await asyncio.gather(*(_collect(gemini_client.chat_stream(MESSAGES, "system")) for _ in range(2)))
+
+        assert asyncio.run(both()) == [["The cochlea ", "is in the inner ear."]] * 2
+        assert len(models.streams) == 1
+
+    def test_timeout_applies_per_chunk(self, fake_models) -> None:
+        fake_models(delay=0.05, parts=["a", "b", "c", "d"])
+        # Whole stream takes ~0.2s, longer than the timeout, but each chunk is quick
+        chunks = asyncio.run(_collect(gemini_client.chat_stream(MESSAGES, "system", timeout=0.15)))
+        assert chunks == ["a", "b", "c", "d"]
+
+    def test_stalled_stream_times_out(self, fake_models) -> None:
+        fake_models(delay=1.0)
+        with pytest.raises(LLMTimeoutError):
+            asyncio.run(_collect(gemini_client.chat_stream(MESSAGES, "system", timeout=0.05)))
+
+    def test_early_exit_closes_stream(self, fake_models) -> None:
+        models = fake_models(parts=["a", "b", "c"])
+
+        async def first_only() -> str:
+            stream = gemini_client.chat_stream(MESSAGES, "system")
+            chunk = await anext(stream)
+            await stream.aclose()
+            return chunk
+
+        assert asyncio.run(first_only()) == "a"
+        assert models.streams[0].closed
@@ -0,0 +1,148 @@
+"""Tests for the persisted, memory-mapped search index."""
+
+import json
+
+import pytest
+
+from app.retrieval.index.bm25 import build_index
+from app.retrieval.index.store import file_checksum, open_index, persist_index, write_index
+from app.retrieval.search import StudySearch
+from tests.unit.test_search import SAMPLE_CHUNKS
+
+QUERIES = ["cochlea inner ear", "mitochondria ATP cell", "femur bone", "glucose oxygen", "wormhole"]
+
+
+@pytest.fixture
+def index_files(tmp_path, monkeypatch):
+    """Write chunks.json and point the manifest at a temp directory."""
+    monkeypatch.setattr("app.retrieval.index.manifest.MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    chunks_path = tmp_path / "chunks.json"
+    chunks_path.write_text(json.dumps(SAMPLE_CHUNKS, indent=2))
+    return str(chunks_path), str(tmp_path / "search.idx")
+
+
+class TestIndexStore:
+    def test_round_trip_matches_in_memory_search(self, index_files) -> None:
+        chunks_path, index_path = index_files
+        persist_index(SAMPLE_CHUNKS, chunks_path, index_path)
+        bm25, chunks, header = open_index(index_path, file_checksum(chunks_path))
+
+        memory_bm25, corpus = build_index(SAMPLE_CHUNKS)
+        assert list(chunks) == SAMPLE_CHUNKS
+        assert header["stats"]["total_chunks"] == len(SAMPLE_CHUNKS)
+        for query in QUERIES:
+            tokens = query.lower().split()
+            assert bm25.top_k(tokens, 5) == memory_bm25.top_k(tokens, 5)
+
+    def test_checksum_mismatch_is_rejected(self, index_files) -> None:
+        chunks_path, index_path = index_files
+        bm25, _ = build_index(SAMPLE_CHUNKS)
+        write_index(index_path, SAMPLE_CHUNKS, bm25, "not-the-checksum")
+        assert open_index(index_path, file_checksum(chunks_path)) is None
+
+    def test_unreadable_file_is_rejected(self, index_files) -> None:
+        _, index_path = index_files
+        with open(index_path, "wb") as f:
+            f.write(b"garbage")
+        assert open_index(index_path) is None
+
+    def test_missing_file(self, tmp_path) -> None:
+        assert open_index(str(tmp_path / "nope.idx")) is None
+
+
+class TestLoadIndex:
+    def test_maps_persisted_index(self, index_files) -> None:
+        chunks_path, index_path = index_files
+        persist_index(SAMPLE_CHUNKS, chunks_path, index_path)
+
+        engine = StudySearch()
+        engine.load_index(chunks_path, index_path)
+
+        assert len(engine.chunks) == len(SAMPLE_CHUNKS)
+        assert engine.search("cochlea")[0]["section_title"] == "Inner Ear"
+        assert engine.get_stats()["total_files"] == 2
+        assert len(engine.get_all_topics()) == 4
+
+    def test_rebuilds_and_rewrites_when_stale(self, index_files) -> None:
+        chunks_path, index_path = index_files
+        persist_index(SAMPLE_CHUNKS, chunks_path, index_path)
+        with open(chunks_path, "w") as f:
+            json.dump(SAMPLE_CHUNKS[:2], f)
+
+        engine = StudySearch()
+        engine.load_index(chunks_path, index_path)
+
+        assert len(engine.chunks) == 2
+        assert open_index(index_path, file_checksum(chunks_path)) is not None
+
+    def test_live_update_on_mapped_index(self, index_files) -> None:
+        chunks_path, index_path = index_files
+        persist_index(SAMPLE_CHUNKS, chunks_path, index_path, sources={"anatomy.docx": "h0"})
+
+        engine = StudySearch()
+        engine.load_index(chunks_path, index_path)
+        assert engine.sources == {"anatomy.docx": "h0"}
+
+        engine.replace_source("anatomy.docx", "h1", [dict(SAMPLE_CHUNKS[0], id="005", content="Rods and cones line the retina.")])
+        assert engine.search("retina")[0]["id"] == "005"
+        assert engine.search("femur") == []
+
+
+class TestCompaction:
+    def test_compact_and_persist_writes_live_index(self, index_files, monkeypatch) -> None:
+        from app.retrieval.index import compaction
+
+        chunks_path, index_path = index_files
+        monkeypatch.setattr(compaction, "CHUNKS_PATH", chunks_path)
+        monkeypatch.setattr(compaction, "SEARCH_INDEX_PATH", index_path)
+
+        engine = StudySearch()
+        engine.load_chunks_from_list(list(SAMPLE_CHUNKS))
+        engine.replace_source("biology.pdf", "h2", [])
+        assert compaction.compact_and_persist(engine)
+
+        reloaded = StudySearch()
+        reloaded.load_index(chunks_path, index_path)
+        assert len(reloaded.chunks) == 2
+        assert reloaded.sources == {"biology.pdf": "h2"}
+
+    def test_small_update_is_saved_without_rebuild(self, index_files, monkeypatch) -> None:
+        from app.retrieval.index import compaction
+
+        chunks_path, index_path = index_files
+        monkeypatch.setattr(compaction, "CHUNKS_PATH", chunks_path)
+        monkeypatch.setattr(compaction, "INDEX_COMPACT_TOMBSTONE_RATIO", 0.5)
+        persist_index(SAMPLE_CHUNKS, chunks_path, index_path, sources={"anatomy.docx": "h0"})
+        engine = StudySearch()
+        engine.load_index(chunks_path, index_path)
+
+        new = dict(SAMPLE_CHUNKS[0], id="005", content="Rods and cones line the retina.")
+        engine.replace_source("anatomy.docx", "h1", [new])
+        assert not compaction.needs_compaction(engine.snapshot)
+        compaction.persist_live(engine)
+
+        reloaded = StudySearch()
+        reloaded.load_index(chunks_path, index_path)
+        assert reloaded.sources == {"anatomy.docx": "h1"}
+        assert reloaded.search("retina")[0]["id"] == "005"
+        assert reloaded.search("cochlea") == []
+        # Same content after the restart, so response caches stay valid
+        assert reloaded.version == engine.version
+
+    def test_compaction_thresholds(self, monkeypatch) -> None:
+        from app.retrieval.index import compaction
+
+        monkeypatch.setattr(compaction, "INDEX_COMPACT_TOMBSTONE_RATIO", 0.3)
+        monkeypatch.setattr(compaction, "INDEX_COMPACT_MAX_SEGMENTS", 3)
+        engine = StudySearch()
+        engine.load_chunks_from_list(list(SAMPLE_CHUNKS))
+        assert not compaction.needs_compaction(engine.snapshot)
+
+        engine.replace_source("biology.pdf", "h1", [])  # half the chunks tombstoned
+        assert compaction.needs_compaction(engine.snapshot)
+
+        engine.load_chunks_from_list(list(SAMPLE_CHUNKS))
+        for n in range(3):
+            engine.replace_source(f"extra{n}.txt", "h", [dict(SAMPLE_CHUNKS[0], source_file=f"extra{n}.txt")])
+        assert engine.snapshot.segments == 3
+        assert compaction.needs_compaction(engine.snapshot)
@@ -0,0 +1,57 @@
+"""Tests for the SQLite LLM response cache."""
+
+import time
+
+import pytest
+
+from app.storage.db import init_db
+from app.storage.llm_cache_repo import (
+    cached_response_stats,
+    clear_cached_responses,
+    get_cached_response,
+    save_cached_response,
+)
+
+TTL = 3600
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    init_db()
+
+
+class TestLLMCacheRepo:
+    def test_round_trip(self) -> None:
+        save_cached_response("k", 1, "answer", max_bytes=1000, ttl_seconds=TTL)
+        assert get_cached_response("k", 1, TTL) == "answer"
+        assert get_cached_response("other", 1, TTL) is None
+
+    def test_other_index_version_misses(self) -> None:
+        save_cached_response("k", 1, "answer", max_bytes=1000, ttl_seconds=TTL)
+        assert get_cached_response("k", 2, TTL) is None
+
+    def test_expired_entries_miss(self, monkeypatch) -> None:
+        save_cached_response("k", 1, "answer", max_bytes=1000, ttl_seconds=TTL)
+        later = time.time() + TTL + 1
+        monkeypatch.setattr("app.storage.llm_cache_repo.time.time", lambda: later)
+        assert get_cached_response("k", 1, TTL) is None
+
+    def test_evicts_least_recently_used(self, monkeypatch) -> None:
+        clock = iter(range(1000, 2000))
+        monkeypatch.setattr("app.storage.llm_cache_repo.time.time", lambda: float(next(clock)))
+        save_cached_response("a", 1, "x" * 40, max_bytes=100, ttl_seconds=TTL)
+        save_cached_response("b", 1, "y" * 40, max_bytes=100, ttl_seconds=TTL)
+        assert get_cached_response("a", 1, TTL)  # a is now more recent than b
+        save_cached_response("c", 1, "z" * 40, max_bytes=100, ttl_seconds=TTL)
+
+        assert get_cached_response("b", 1, TTL) is None
+        assert get_cached_response("a", 1, TTL) and get_cached_response("c", 1, TTL)
+        assert cached_response_stats() == {"entries": 2, "size_bytes": 80}
+
+    def test_clear(self) -> None:
+        save_cached_response("k", 1, "answer", max_bytes=1000, ttl_seconds=TTL)
+        assert clear_cached_responses() == 1
+        assert cached_response_stats()["entries"] == 0
@@ -0,0 +1,91 @@
+"""Tests for isolated worker processes and parallel process_directory."""
+
+import os
+import time
+
+import pytest
+
+from app.retrieval.processor import chunking
+from app.retrieval.processor.chunking import process_directory
+from app.retrieval.processor.parallel import WorkerFailed, run_isolated
+
+TEXT = " ".join(f"the mitochondria produce energy for cells item{i}" for i in range(60))
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _fail(message: str) -> None:
+    raise ValueError(message)
+
+
+def _hang(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def _crash() -> None:
+    os._exit(3)
+
+
+def _allocate(mb: int) -> int:
+    return len(bytearray(mb * 1024 * 1024))
+
+
+class TestRunIsolated:
+    def test_results_in_task_order(self) -> None:
+        assert run_isolated(_square, [(i,) for i in range(6)], jobs=3, timeout=30) == [0, 1, 4, 9, 16, 25]
+
+    def test_exception_fails_only_that_task(self) -> None:
+        results = run_isolated(_fail, [("bad pdf",)], jobs=2, timeout=30)
+        assert isinstance(results[0], WorkerFailed)
+        assert "ValueError: bad pdf" in str(results[0])
+
+    def test_timeout_kills_hung_task(self) -> None:
+        start = time.monotonic()
+        results = run_isolated(_hang, [(60,), (0,)], jobs=2, timeout=0.5)
+        assert time.monotonic() - start < 10
+        assert isinstance(results[0], WorkerFailed) and "timed out" in str(results[0])
+        assert results[1] is None
+
+    def test_crashed_worker(self) -> None:
+        results = run_isolated(_crash, [()], jobs=1, timeout=30)
+        assert isinstance(results[0], WorkerFailed) and "code 3" in str(results[0])
+
+    @pytest.mark.skipif(os.name != "posix", reason="memory limits use RLIMIT_AS")
+    def test_memory_limit(self) -> None:
+        results = run_isolated(_allocate, [(2048,), (1,)], jobs=2, timeout=30, memory_limit_mb=1024)
+        assert isinstance(results[0], WorkerFailed) and "MemoryError" in str(results[0])
+        assert results[1] == 1024 * 1024
+
+
+class TestParallelProcessDirectory:
+    @pytest.fixture
+    def materials(self, tmp_path):
+        for name in ("b.txt", "a.md", "c/d.txt", "c/e.txt"):
+            path = tmp_path / name
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(f"{name} {TEXT} " * 3)
+        return tmp_path
+
+    def test_matches_sequential_output(self, materials) -> None:
+        sequential = process_directory(str(materials), None, jobs=1)
+        parallel = process_directory(str(materials), None, jobs=3)
+        assert parallel == sequential
+        assert [c.chunk_index for c in parallel] == [c.chunk_index for c in sequential]
+
+    def test_failing_file_is_isolated(self, materials) -> None:
+        (materials / "c" / "broken.pdf").write_bytes(b"%PDF-1.4 not really a pdf")
+
+        chunks = process_directory(str(materials), None, jobs=2)
+        assert {c.source_file for c in chunks} == {"a.md", "b.txt", "d.txt", "e.txt"}
+
+    def test_cache_is_filled_by_parent(self, materials, tmp_path_factory) -> None:
+        from app.retrieval.processor.cache import ExtractionCache
+
+        cache = ExtractionCache(tmp_path_factory.mktemp("cache"))
+        first = process_directory(str(materials), cache, jobs=2)
+        second = process_directory(str(materials), cache, jobs=2)
+        assert second == first
+        stats = cache.stats()
+        assert (stats["hits"], stats["stores"]) == (4, 4)
@@ -8,7 +8,10 @@ import pytest
 os.environ.setdefault("SCIOLY_TEST_MODE", "1")
 
 from app.storage.db import init_db
-from app.storage.progress_repo import save_quiz_result, get_progress, get_weak_areas
+from app.storage.progress_repo import (
+    save_quiz_result, get_progress, get_weak_areas, rebuild_topic_stats, record_answers,
+)
+from app.storage.schedule_repo import get_study_plan
 
 
 @pytest.fixture(autouse=True)
@@ -18,6 +21,7 @@ def fresh_db(tmp_path, monkeypatch):
     monkeypatch.setattr("app.settings.DB_PATH", db_path)
     monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
     monkeypatch.setattr("app.storage.progress_repo.get_db", lambda: _get_test_db(db_path))
+    monkeypatch.setattr("app.storage.schedule_repo.get_db", lambda: _get_test_db(db_path))
     init_db()
     yield
 
@@ -83,3 +87,70 @@ class TestProgressRepo:
         )
         weak = get_weak_areas("alice@example.com")
         assert "Chemistry" in weak
+
+
+class TestTopicStats:
+    def _answer(self, topic: str, is_correct: bool, student_id: str = "alice@example.com") -> None:
+        save_quiz_result(student_id, "Alice", topic, "Q", "A", "A" if is_correct else "B", is_correct)
+
+    def test_totals_follow_each_answer(self):
+        for is_correct in (True, True, False):
+            self._answer("Biology", is_correct)
+        self._answer("Chemistry", False)
+
+        progress = get_progress("alice@example.com")
+        assert progress["overall"] == {"total_questions": 4, "correct": 2, "accuracy": 50.0}
+        assert [(t["topic"], t["total"], t["correct"]) for t in progress["by_topic"]] == [
+            ("Chemistry", 1, 0),
+            ("Biology", 3, 2),
+        ]
+        assert get_weak_areas("alice@example.com") == ["Chemistry", "Biology"]
+        assert len(progress["recent_activity"]) == 4
+
+    def test_rebuild_matches_incremental_totals(self):
+        for topic, is_correct in [("Biology", True), ("Biology", False), ("Physics", True)]:
+            self._answer(topic, is_correct)
+        self._answer("Physics", False, student_id="bob@example.com")
+        before = get_progress("alice@example.com")["by_topic"]
+
+        assert rebuild_topic_stats() == 3
+        assert get_progress("alice@example.com")["by_topic"] == before
+
+    def test_init_db_backfills_existing_results(self, tmp_path):
+        db_path = str(tmp_path / "test.db")
+        with _get_test_db(db_path) as conn:
+            conn.execute("DROP TABLE topic_stats")
+            conn.execute(
+                "INSERT INTO quiz_results (student_id, topic, question, is_correct) VALUES (?, ?, ?, ?)",
+                ("alice@example.com", "Geology", "Q", True),
+            )
+
+        init_db()
+        assert get_progress("alice@example.com")["overall"]["total_questions"] == 1
+
+
+class TestRecordAnswers:
+    ANSWERS = [
+        ("Biology", "Q1", "A", "A", True),
+        ("Biology", "Q2", "B", "A", False),
+        ("Physics", "Q3", "C", "C", True),
+    ]
+
+    def test_results_totals_and_schedule_written_together(self):
+        record_answers("alice@example.com", "Alice", self.ANSWERS)
+
+        progress = get_progress("alice@example.com")
+        assert progress["overall"]["total_questions"] == 3
+        assert {t["topic"]: t["correct"] for t in progress["by_topic"]} == {"Biology": 1, "Physics": 1}
+        plan = get_study_plan("alice@example.com")
+        assert sorted(t["topic"] for t in plan["upcoming"]) == ["Biology", "Physics"]
+
+    def test_failure_leaves_nothing_behind(self, monkeypatch):
+        def fail(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr("app.storage.progress_repo.apply_reviews", fail)
+        with pytest.raises(sqlite3.OperationalError):
+            record_answers("alice@example.com", "Alice", self.ANSWERS)
+        assert get_progress("alice@example.com")["overall"]["total_questions"] == 0
+        assert get_progress("alice@example.com")["recent_activity"] == []
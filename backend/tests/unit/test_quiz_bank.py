@@ -0,0 +1,247 @@
+"""Tests for the quiz question bank and background pre-generation."""
+
+import asyncio
+import json
+import re
+from datetime import date
+
+import pytest
+
+from app.core.errors import LLMRateLimitedError
+from app.llm import gemini_client
+from app.retrieval.search import StudySearch
+from app.services import quiz_bank
+from app.services.quiz_service import generate_questions, generate_quiz, generate_quizzes
+from app.storage.db import get_db, init_db
+from app.storage.quiz_bank_repo import add_questions, question_counts, take_unseen_questions, unseen_count
+from app.storage.schedule_repo import update_schedule
+
+CHUNKS = [
+    {
+        "id": "001",
+        "source_file": "anatomy.docx",
+        "source_type": "docx",
+        "section_title": "Inner Ear",
+        "content": "The cochlea is a spiral-shaped cavity in the inner ear.",
+        "page_or_slide": None,
+        "word_count": 10,
+    },
+    {
+        "id": "002",
+        "source_file": "biology.pdf",
+        "source_type": "pdf",
+        "section_title": "Cell Biology",
+        "content": "Mitochondria generate ATP through cellular respiration.",
+        "page_or_slide": 1,
+        "word_count": 7,
+    },
+]
+EAR = "anatomy.docx → Inner Ear"
+_real_chat = gemini_client.chat
+CELL = "biology.pdf → Cell Biology"
+
+
+def _question(n: int) -> dict:
+    return {
+        "question": f"Question {n}?",
+        "options": ["a", "b", "c", "d"],
+        "correct_letter": "B",
+        "explanation": "Because.",
+    }
+
+
+class FakeChat:
+    """Stands in for gemini_client.chat, answering with as many numbered questions as asked for."""
+
+    def __init__(self, reply: str | None = None, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.generated = 0
+        self.reply = reply
+        self.error = error
+
+    async def __call__(self, messages, system_prompt, temperature=0.7, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        if self.reply is not None:
+            return self.reply
+        wanted = int(re.search(r"exactly (\d+)", messages[0]["content"]).group(1))
+        batch = [_question(self.generated + i + 1) for i in range(wanted)]
+        self.generated += wanted
+        return json.dumps(batch)
+
+
+@pytest.fixture
+def bank_env(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr("app.settings.DB_PATH", db_path)
+    monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+    init_db()
+    fake = FakeChat()
+    monkeypatch.setattr(gemini_client, "chat", fake)
+    engine = StudySearch()
+    engine.load_chunks_from_list(CHUNKS)
+    return fake, engine
+
+
+class TestQuizBankRepo:
+    def test_unseen_questions_are_per_student(self, bank_env) -> None:
+        add_questions(EAR, [_question(1), _question(2)], ["001"])
+
+        assert take_unseen_questions("alice", EAR)[0]["question"] == "Question 1?"
+        assert take_unseen_questions("alice", EAR)[0]["question"] == "Question 2?"
+        assert take_unseen_questions("alice", EAR) == []
+        assert [q["question"] for q in take_unseen_questions("bob", EAR, 5)] == ["Question 1?", "Question 2?"]
+        assert unseen_count("bob", EAR) == 0
+
+    def test_duplicates_are_skipped(self, bank_env) -> None:
+        assert len(add_questions(EAR, [_question(1)], ["001"])) == 1
+        assert add_questions(EAR, [_question(1)], ["001"]) == []
+        assert question_counts() == {EAR: 1}
+
+
+class TestGenerateQuiz:
+    def test_serves_banked_question_without_llm_call(self, bank_env) -> None:
+        fake, engine = bank_env
+        add_questions(EAR, [_question(7)], ["001"])
+
+        result = asyncio.run(generate_quiz(EAR, engine, student_id="alice"))
+        assert result["question"] == "Question 7?"
+        assert result["topic"] == EAR
+        assert fake.calls == 0
+
+    def test_empty_bank_falls_back_to_live_generation(self, bank_env) -> None:
+        fake, engine = bank_env
+
+        result = asyncio.run(generate_quiz(EAR, engine, student_id="alice"))
+        assert result["question"] == "Question 1?" and fake.calls == 1
+        # Stored for other students, already seen by this one
+        assert unseen_count("alice", EAR) == 0
+        assert unseen_count("bob", EAR) == 1
+
+    def test_unparseable_reply_is_not_stored(self, bank_env, monkeypatch) -> None:
+        _, engine = bank_env
+        monkeypatch.setattr(gemini_client, "chat", FakeChat(reply='{"question": "No options?"}'))
+
+        result = asyncio.run(generate_quiz(EAR, engine))
+        assert result["options"] == []
+        assert question_counts() == {}
+
+
+class TestPregeneration:
+    def test_tops_up_requested_topics_only(self, bank_env, monkeypatch) -> None:
+        fake, engine = bank_env
+        monkeypatch.setattr(quiz_bank, "QUIZ_BANK_TARGET", 1)
+
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={})) == 0
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"alice"}, "Not indexed": {"alice"}})) == 1
+        assert question_counts() == {EAR: 1}
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"alice"}})) == 0
+
+    def test_counts_questions_the_student_has_not_seen(self, bank_env, monkeypatch) -> None:
+        fake, engine = bank_env
+        monkeypatch.setattr(quiz_bank, "QUIZ_BANK_TARGET", 2)
+        add_questions(EAR, [_question(101), _question(102)], ["001"])
+        take_unseen_questions("alice", EAR, 2)
+
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"bob"}})) == 0
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"alice", "bob"}})) == 1
+        assert unseen_count("alice", EAR) == 2
+
+    def test_due_reviews_come_first(self, bank_env) -> None:
+        fake, engine = bank_env
+        update_schedule("alice", "alice", CELL, is_correct=False)
+        with get_db() as conn:  # make the review due today
+            conn.execute("UPDATE study_schedule SET next_review = ?", (date.today().isoformat(),))
+
+        assert asyncio.run(quiz_bank.fill_bank(engine, max_calls=1, requested={EAR: {"alice"}})) == 1
+        assert list(question_counts()) == [CELL]
+
+    def test_llm_failure_stops_the_pass(self, bank_env, monkeypatch) -> None:
+        _, engine = bank_env
+        fake = FakeChat(error=LLMRateLimitedError())
+        monkeypatch.setattr(gemini_client, "chat", fake)
+
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"alice"}, CELL: {"alice"}})) == 1
+        assert question_counts() == {}
+
+    def test_burst_of_requests_shares_one_pass(self, bank_env, monkeypatch) -> None:
+        fake, engine = bank_env
+        monkeypatch.setattr(quiz_bank, "is_configured", lambda: True)
+        monkeypatch.setattr(quiz_bank, "QUIZ_REFILL_DEBOUNCE_SECONDS", 0.05)
+
+        async def scenario() -> None:
+            quiz_bank.start_pregeneration(engine)
+            await asyncio.sleep(0.01)  # startup pass: nothing due or requested
+            for student in ("alice", "bob", "carol"):
+                quiz_bank.request_refill(student, EAR)
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.2)
+            await quiz_bank.stop_pregeneration()
+
+        asyncio.run(scenario())
+        assert fake.calls == 1
+        assert question_counts() == {EAR: quiz_bank.QUIZ_BANK_TARGET}
+
+
+class TestBatchGeneration:
+    def test_shortfall_generated_in_one_call(self, bank_env) -> None:
+        fake, engine = bank_env
+        add_questions(EAR, [_question(100)], ["001"])
+
+        questions = asyncio.run(generate_quizzes(EAR, engine, student_id="alice", count=4))
+        assert [q["question"] for q in questions] == ["Question 100?", "Question 1?", "Question 2?", "Question 3?"]
+        assert all(q["topic"] == EAR for q in questions)
+        assert fake.calls == 1
+        assert unseen_count("alice", EAR) == 0
+
+    def test_coalesced_callers_each_get_their_own_questions(self, bank_env, monkeypatch) -> None:
+        _, engine = bank_env
+        monkeypatch.setattr(gemini_client, "chat", _real_chat)
+        monkeypatch.setattr(gemini_client, "_get_client", lambda: None)
+        upstream = []
+
+        async def generate(client, model_name, messages, system_prompt, *args) -> str:
+            upstream.append(model_name)
+            await asyncio.sleep(0.05)
+            return json.dumps([_question(1), _question(2)])
+
+        monkeypatch.setattr(gemini_client, "_generate", generate)
+
+        async def scenario() -> list[list[dict]]:
+            return await asyncio.gather(
+                generate_quizzes(EAR, engine, student_id="alice", count=2),
+                generate_quizzes(EAR, engine, student_id="bob", count=2),
+                generate_quizzes(EAR, engine, student_id="bob", count=2),
+            )
+
+        alice, *bobs = asyncio.run(scenario())
+        assert len(upstream) == 1
+        assert [q["question"] for q in alice] == ["Question 1?", "Question 2?"]
+        # The same student is not served the same questions twice
+        assert sorted([q["question"] for q in b] for b in bobs) == [[], ["Question 1?", "Question 2?"]]
+        assert unseen_count("alice", EAR) == unseen_count("bob", EAR) == 0
+
+    def test_invalid_entries_dropped_individually(self, bank_env, monkeypatch) -> None:
+        _, engine = bank_env
+        reply = json.dumps([
+            _question(1),
+            {"question": "Only two options?", "options": ["a", "b"], "correct_letter": "A"},
+            _question(1),  # duplicate
+            dict(_question(2), correct_letter="E"),
+            _question(3),
+        ])
+        # Cut off partway through a last question, as when output runs out of tokens
+        reply = reply[:-1] + ', {"question": "Trunc'
+        monkeypatch.setattr(gemini_client, "chat", FakeChat(reply="```json\n" + reply))
+
+        questions, _ = asyncio.run(generate_questions(EAR, engine, count=5))
+        assert [q["question"] for q in questions] == ["Question 1?", "Question 3?"]
+
+    def test_pregeneration_asks_for_whole_batches(self, bank_env, monkeypatch) -> None:
+        fake, engine = bank_env
+        monkeypatch.setattr(quiz_bank, "QUIZ_BANK_TARGET", 5)
+
+        assert asyncio.run(quiz_bank.fill_bank(engine, requested={EAR: {"alice"}, CELL: {"alice"}})) == 2
+        assert question_counts() == {EAR: 5, CELL: 5}
+        assert fake.generated / fake.calls == 5
@@ -0,0 +1,137 @@
+"""Tests for the Gemini quota scheduler."""
+
+import asyncio
+
+import pytest
+
+from app.core.errors import QuotaExceededError
+from app.llm.quota import BACKGROUND, INTERACTIVE, QuotaScheduler
+from app.storage.db import init_db
+from app.storage.quota_repo import load_quota_buckets, save_quota_bucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _grant(scheduler: QuotaScheduler, n: int, priority: int = INTERACTIVE) -> None:
+    async def grant() -> None:
+        for _ in range(n):
+            await scheduler.acquire(priority, max_wait=0)
+
+    asyncio.run(grant())
+
+
+class TestAdmission:
+    def test_grants_within_budget_then_rejects(self) -> None:
+        clock = FakeClock()
+        scheduler = QuotaScheduler(per_minute=3, per_day=100, background_reserve=0, clock=clock)
+        _grant(scheduler, 3)
+
+        with pytest.raises(QuotaExceededError) as exc:
+            _grant(scheduler, 1)
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after == pytest.approx(20)  # one token every 20s
+        assert scheduler.stats()["buckets"]["minute"]["tokens"] == 0
+
+        clock.now += 20
+        _grant(scheduler, 1)
+
+    def test_daily_budget_is_shared_by_minutes(self) -> None:
+        clock = FakeClock()
+        scheduler = QuotaScheduler(per_minute=10, per_day=12, background_reserve=0, clock=clock)
+        _grant(scheduler, 10)
+        clock.now += 60
+        _grant(scheduler, 2)
+
+        with pytest.raises(QuotaExceededError) as exc:
+            _grant(scheduler, 1)
+        assert exc.value.retry_after > 3600
+
+    def test_background_leaves_the_daily_reserve(self) -> None:
+        clock = FakeClock()
+        scheduler = QuotaScheduler(per_minute=0, per_day=10, background_reserve=8, clock=clock)
+        _grant(scheduler, 2, BACKGROUND)
+
+        with pytest.raises(QuotaExceededError):
+            _grant(scheduler, 1, BACKGROUND)
+        _grant(scheduler, 8, INTERACTIVE)
+
+
+class TestQueue:
+    def test_waits_for_a_token_within_deadline(self) -> None:
+        scheduler = QuotaScheduler(per_minute=600, per_day=0)  # one token per 0.1s
+
+        async def burst() -> None:
+            await asyncio.gather(*(scheduler.acquire(INTERACTIVE, max_wait=5) for _ in range(602)))
+
+        asyncio.run(burst())
+        assert scheduler.stats()["waiting"] == 0
+
+    def test_interactive_is_served_before_queued_background(self) -> None:
+        scheduler = QuotaScheduler(per_minute=600, per_day=0)
+        order: list[str] = []
+
+        async def call(name: str, priority: int) -> None:
+            await scheduler.acquire(priority, max_wait=5)
+            order.append(name)
+
+        async def scenario() -> None:
+            for _ in range(600):
+                await scheduler.acquire(INTERACTIVE, max_wait=0)
+            background = asyncio.create_task(call("background", BACKGROUND))
+            await asyncio.sleep(0)  # queued first
+            await asyncio.gather(background, call("chat", INTERACTIVE))
+
+        asyncio.run(scenario())
+        assert order == ["chat", "background"]
+
+    def test_predicted_wait_counts_callers_ahead(self) -> None:
+        scheduler = QuotaScheduler(per_minute=60, per_day=0)  # one token per second
+
+        async def scenario() -> None:
+            for _ in range(60):
+                await scheduler.acquire(INTERACTIVE, max_wait=0)
+            queued = asyncio.create_task(scheduler.acquire(INTERACTIVE, max_wait=1.5))
+            await asyncio.sleep(0)
+            with pytest.raises(QuotaExceededError):
+                # Second in line: about 2s away, more than its deadline
+                await scheduler.acquire(INTERACTIVE, max_wait=1.5)
+            queued.cancel()
+
+        asyncio.run(scenario())
+
+
+class TestPersistence:
+    def test_levels_survive_a_restart(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+        db_path = str(tmp_path / "test.db")
+        monkeypatch.setattr("app.settings.DB_PATH", db_path)
+        monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+        init_db()
+        clock = FakeClock()
+
+        first = QuotaScheduler(per_minute=0, per_day=100, clock=clock)
+        first.attach_store(load_quota_buckets, save_quota_bucket)
+        _grant(first, 40)
+
+        restarted = QuotaScheduler(per_minute=0, per_day=100, clock=clock)
+        restarted.attach_store(load_quota_buckets, save_quota_bucket)
+        assert restarted.stats()["buckets"]["day"]["tokens"] == 60
+
+    def test_late_save_of_an_older_level_is_ignored(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+        db_path = str(tmp_path / "test.db")
+        monkeypatch.setattr("app.settings.DB_PATH", db_path)
+        monkeypatch.setattr("app.storage.db.DB_PATH", db_path)
+        init_db()
+
+        save_quota_bucket("day", 58.0, 1000.0)
+        save_quota_bucket("day", 59.0, 999.0)  # earlier grant, saved last
+        save_quota_bucket("day", 59.0, 1000.0)  # same instant, before the 58
+        assert load_quota_buckets() == {"day": (58.0, 1000.0)}
+
+        save_quota_bucket("day", 70.0, 1060.0)  # refilled since
+        assert load_quota_buckets() == {"day": (70.0, 1060.0)}
@@ -0,0 +1,116 @@
+"""Tests for LLM retries, hedging and the circuit breaker."""
+
+import asyncio
+
+import pytest
+
+from app.core.errors import CircuitOpenError, LLMAuthError, LLMUnavailableError
+from app.llm.resilience import CircuitBreaker, RetryPolicy, call_with_retry
+
+FAST = RetryPolicy(attempts=3, base_delay=0.001, max_delay=0.01, hedge_after=0)
+
+
+class Flaky:
+    """Attempt function that fails with the given errors, then answers."""
+
+    def __init__(self, errors: list[Exception], delays: list[float] | None = None) -> None:
+        self.errors = list(errors)
+        self.delays = list(delays or [])
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"answer {self.calls}"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRetry:
+    def test_transient_failures_are_retried(self) -> None:
+        attempt = Flaky([LLMUnavailableError("503"), LLMUnavailableError("503")])
+        assert asyncio.run(call_with_retry(attempt, CircuitBreaker(), FAST)) == "answer 3"
+
+    def test_gives_up_after_attempts(self) -> None:
+        attempt = Flaky([LLMUnavailableError("503")] * 5)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(call_with_retry(attempt, CircuitBreaker(), FAST))
+        assert attempt.calls == 3
+
+    def test_permanent_failures_are_not_retried(self) -> None:
+        attempt = Flaky([LLMAuthError()])
+        with pytest.raises(LLMAuthError):
+            asyncio.run(call_with_retry(attempt, CircuitBreaker(), FAST))
+        assert attempt.calls == 1
+
+    def test_backoff_is_jittered_and_capped(self) -> None:
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        delays = [policy.delay(n) for n in range(8) for _ in range(20)]
+        assert all(0 <= d <= 5 for d in delays)
+        assert len(set(delays)) > 1
+
+
+class TestHedging:
+    def test_slow_attempt_is_raced_by_a_hedge(self) -> None:
+        attempt = Flaky([], delays=[1.0, 0.0])
+        policy = RetryPolicy(attempts=1, hedge_after=0.05)
+
+        async def timed() -> tuple[str, float]:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            result = await call_with_retry(attempt, CircuitBreaker(), policy)
+            return result, loop.time() - start
+
+        result, elapsed = asyncio.run(timed())
+        assert result == "answer 2" and attempt.calls == 2
+        assert elapsed < 0.5
+
+    def test_fast_attempt_is_not_hedged(self) -> None:
+        attempt = Flaky([])
+        policy = RetryPolicy(attempts=1, hedge_after=0.5)
+        assert asyncio.run(call_with_retry(attempt, CircuitBreaker(), policy)) == "answer 1"
+        assert attempt.calls == 1
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures_and_fails_fast(self) -> None:
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=3, reset_seconds=30, clock=clock)
+        attempt = Flaky([LLMUnavailableError("500")] * 3)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(call_with_retry(attempt, breaker, FAST))
+        assert breaker.state == "open"
+
+        with pytest.raises(CircuitOpenError) as exc:
+            asyncio.run(call_with_retry(attempt, breaker, FAST))
+        assert attempt.calls == 3  # upstream not called while open
+        assert exc.value.retry_after == pytest.approx(30)
+
+    def test_probe_success_closes_the_circuit(self) -> None:
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=1, reset_seconds=30, clock=clock)
+        breaker.record_failure()
+        clock.now = 31
+
+        assert asyncio.run(call_with_retry(Flaky([]), breaker, FAST)) == "answer 1"
+        assert breaker.state == "closed"
+
+    def test_probe_failure_reopens(self) -> None:
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=1, reset_seconds=30, clock=clock)
+        breaker.record_failure()
+        clock.now = 31
+        breaker.check()  # the probe
+        with pytest.raises(CircuitOpenError):
+            breaker.check()  # others still fail fast meanwhile
+        breaker.record_failure()
+        assert breaker.state == "open"
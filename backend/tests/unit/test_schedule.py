@@ -10,7 +10,7 @@ import pytest
 os.environ.setdefault("SCIOLY_TEST_MODE", "1")
 
 from app.storage.db import init_db, get_db
-from app.storage.schedule_repo import update_schedule, get_study_plan
+from app.storage.schedule_repo import apply_reviews, sm2_step, update_schedule, get_study_plan
 
 
 @pytest.fixture(autouse=True)
@@ -105,3 +105,29 @@ class TestGetStudyPlan:
         assert "upcoming" in plan
         assert "mastered_count" in plan
         assert "study_days_30d" in plan
+
+
+class TestApplyReviews:
+    def test_batch_matches_one_answer_at_a_time(self):
+        reviews = [("Bio", True), ("Chem", False), ("Bio", True), ("Bio", True), ("Chem", True)]
+        for topic, is_correct in reviews:
+            update_schedule("alice@example.com", "Alice", topic, is_correct)
+        with get_db() as conn:
+            apply_reviews(conn, "bob@example.com", "Bob", reviews)
+
+        def schedule(student_id):
+            with get_db() as conn:
+                rows = conn.execute(
+                    """SELECT topic, ease_factor, interval_days, repetitions, next_review
+                       FROM study_schedule WHERE student_id = ? ORDER BY topic""",
+                    (student_id,),
+                ).fetchall()
+            return [tuple(r) for r in rows]
+
+        assert schedule("bob@example.com") == schedule("alice@example.com")
+        assert schedule("bob@example.com")[0][3] == 3  # Bio: three correct in a row
+
+    def test_sm2_step(self):
+        assert sm2_step(2.5, 1, 0, True) == (2.5, 1, 1)
+        assert sm2_step(2.5, 3, 2, True)[1:] == (8, 3)
+        assert sm2_step(2.5, 8, 3, False) == (2.3, 1, 0)
@@ -1,6 +1,7 @@
 """Tests for the BM25 search engine."""
 
 import pytest
+from app.retrieval.index.bm25 import build_index
 from app.retrieval.search import StudySearch
 
 
@@ -125,3 +126,73 @@ class TestStudySearch:
         engine.load_chunks_from_list([])
         assert engine.bm25 is None
         assert engine.chunks == []
+
+    def test_search_with_stats(self, search_engine: StudySearch) -> None:
+        results, docs_scored = search_engine.search_with_stats("cochlea inner ear")
+        assert results[0]["section_title"] == "Inner Ear"
+        assert docs_scored >= len(results)
+
+    def test_replace_source_tombstones_old_chunks(self, search_engine: StudySearch) -> None:
+        new_version = [dict(SAMPLE_CHUNKS[0], id="005", content="The retina has rods and cones.")]
+        search_engine.replace_source("anatomy.docx", "hash-1", new_version)
+
+        assert search_engine.search("cochlea") == []
+        assert search_engine.search("retina")[0]["id"] == "005"
+        assert search_engine.sources["anatomy.docx"] == "hash-1"
+        assert search_engine.get_stats()["total_chunks"] == 3
+
+    def test_compact_drops_tombstones(self, search_engine: StudySearch) -> None:
+        search_engine.replace_source("biology.pdf", "hash-2", [])
+        chunks, bm25, sources = search_engine.compact()
+
+        assert [c["id"] for c in chunks] == ["001", "002"]
+        assert bm25.corpus_size == 2 and not bm25.deleted
+        assert sources == {"biology.pdf": "hash-2"}
+        assert search_engine.get_stats()["files"] == ["anatomy.docx"]
+
+    def test_replace_source_on_empty_index(self) -> None:
+        engine = StudySearch()
+        engine.replace_source("biology.pdf", "hash", SAMPLE_CHUNKS[1:])
+        assert engine.search("mitochondria")[0]["id"] == "003"
+
+
+class TestIndexSnapshot:
+    def test_in_flight_snapshot_is_unchanged_by_updates(self, search_engine: StudySearch) -> None:
+        before = search_engine.snapshot
+        search_engine.replace_source("anatomy.docx", "hash-1", [dict(SAMPLE_CHUNKS[0], id="005")])
+        search_engine.compact()
+
+        assert len(before.chunks) == 4
+        assert not before.bm25.deleted
+        assert before.bm25.corpus_size == 4
+        assert "anatomy.docx" not in before.sources
+        assert before.stats["total_chunks"] == 4
+
+    def test_version_follows_content(self, search_engine: StudySearch) -> None:
+        original = search_engine.version
+        search_engine.replace_source("biology.pdf", "hash-2", [])
+        changed = search_engine.version
+        search_engine.compact()
+        assert changed != original
+        assert search_engine.version == changed
+
+        restarted = StudySearch()
+        restarted.load_chunks_from_list(SAMPLE_CHUNKS)
+        assert restarted.version == original
+
+    def test_compact_discarded_after_concurrent_update(self, search_engine: StudySearch) -> None:
+        def build_with_race(live):
+            search_engine.replace_source("biology.pdf", "hash-2", [])
+            return build_index(live)
+
+        assert search_engine.compact(build=build_with_race) is None
+        assert search_engine.sources["biology.pdf"] == "hash-2"
+
+    def test_incremental_stats_match_full_recount(self, search_engine: StudySearch) -> None:
+        replacement = [dict(SAMPLE_CHUNKS[2], id="006", section_title="Respiration", word_count=40)]
+        search_engine.replace_source("biology.pdf", "hash-2", replacement)
+
+        fresh = StudySearch()
+        fresh.load_chunks_from_list(SAMPLE_CHUNKS[:2] + replacement)
+        assert search_engine.get_stats() == fresh.get_stats()
+        assert search_engine.get_all_topics() == fresh.get_all_topics()
@@ -0,0 +1,235 @@
+"""Tests for streaming, size-bounded uploads and background ingestion jobs."""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.domain.documents import Chunk
+from app.retrieval.search import StudySearch
+from app.retrieval.processor.progress import report_error, report_pages
+from app.services import upload_service
+from app.services.ingest_jobs import get_job
+
+CONTENT = b"The femur is the longest bone in the human body. " * 100
+
+
+class EndlessUpload:
+    """An upload with no declared size that never runs out of bytes."""
+
+    filename = "huge.txt"
+    size = None
+
+    def __init__(self) -> None:
+        self.bytes_read = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        self.bytes_read += n
+        return b"x" * n
+
+
+@pytest.fixture
+def upload_env(tmp_path, monkeypatch):
+    """Uploads land in a temp dir; extraction and compaction are stubbed."""
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(upload_service, "UPLOAD_DIR", upload_dir)
+    monkeypatch.setattr(upload_service, "STAGING_DIR", tmp_path / "staging")
+    monkeypatch.setattr(upload_service, "MAX_UPLOAD_SIZE_MB", 1)
+    monkeypatch.setattr(upload_service, "_UPLOAD_BLOCK_SIZE", 64 * 1024)
+    monkeypatch.setattr(upload_service, "schedule_compaction", lambda engine: None)
+    # the stubbed process_file below can't be pickled for the CPU pool
+    monkeypatch.setattr("app.core.executors.CPU_WORKERS", 0)
+    calls = []
+
+    def fake_process_file(path: str, content_hash: str | None = None) -> list[Chunk]:
+        with open(path, "rb") as f:
+            data = f.read()
+        # (name extracted, hash of the bytes actually read, hash it is cached under)
+        calls.append((os.path.basename(path), hashlib.sha256(data).hexdigest(), content_hash))
+        return [Chunk(source_file="notes.txt", source_type="txt", section_title="All", content=data.decode())]
+
+    monkeypatch.setattr(upload_service, "process_file", fake_process_file)
+    return upload_dir, calls
+
+
+def upload(name: str, content: bytes, size: int | None = None) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name, size=size)
+
+
+def run_upload(files: list, engine: StudySearch) -> dict:
+    """Upload, wait for the ingestion job, and return its final state."""
+    job = asyncio.run(upload_service.handle_upload(files, engine))
+    assert get_job(job["job_id"]).wait(10)
+    return upload_service.get_upload_job(job["job_id"])
+
+
+class TestStreamingUpload:
+    def test_file_is_stored_hashed_and_indexed(self, upload_env) -> None:
+        upload_dir, calls = upload_env
+        engine = StudySearch()
+        result = run_upload([upload("notes.txt", CONTENT)], engine)
+
+        digest = hashlib.sha256(CONTENT).hexdigest()
+        assert result["files"][0]["status"] == "success"
+        assert (upload_dir / "notes.txt").read_bytes() == CONTENT
+        assert calls == [("notes.txt", digest, digest)]
+        assert engine.sources["notes.txt"] == digest
+        assert [p.name for p in upload_dir.iterdir()] == ["notes.txt"]
+
+    def test_same_bytes_again_is_unchanged(self, upload_env) -> None:
+        _, calls = upload_env
+        engine = StudySearch()
+        run_upload([upload("notes.txt", CONTENT)], engine)
+        result = run_upload([upload("notes.txt", CONTENT)], engine)
+
+        assert result["files"][0]["status"] == "unchanged"
+        assert len(calls) == 1
+
+    def test_oversized_stream_is_aborted_early(self, upload_env) -> None:
+        upload_dir, calls = upload_env
+        file = EndlessUpload()
+        result = run_upload([file], StudySearch())
+
+        assert result["files"][0]["status"].startswith("too_large")
+        assert file.bytes_read <= 1024 * 1024 + 64 * 1024
+        assert list(upload_dir.iterdir()) == []
+        assert calls == []
+
+    def test_declared_size_rejected_without_reading(self, upload_env) -> None:
+        upload_dir, _ = upload_env
+        file = upload("big.txt", b"small body", size=2 * 1024 * 1024)
+        result = run_upload([file], StudySearch())
+
+        assert result["files"][0]["status"].startswith("too_large")
+        assert file.file.tell() == 0
+        assert list(upload_dir.iterdir()) == []
+
+    def test_oversized_upload_keeps_previous_version(self, upload_env) -> None:
+        upload_dir, _ = upload_env
+        (upload_dir / "huge.txt").write_bytes(b"previous")
+        run_upload([EndlessUpload()], StudySearch())
+
+        assert (upload_dir / "huge.txt").read_bytes() == b"previous"
+
+
+class TestIngestionJobs:
+    def test_job_reports_pages_and_chunks(self, upload_env, monkeypatch) -> None:
+        def fake_process_file(path: str, content_hash: str | None = None) -> list[Chunk]:
+            for page in range(1, 4):
+                report_pages(page, 3)
+            return [Chunk(source_file="notes.txt", source_type="txt", section_title="All", content="text")] * 2
+
+        monkeypatch.setattr(upload_service, "process_file", fake_process_file)
+        engine = StudySearch()
+        queued = asyncio.run(upload_service.handle_upload([upload("notes.txt", CONTENT)], engine))
+        assert queued["files"][0]["status"] in ("queued", "processing", "success")
+
+        result = run_upload([upload("other.txt", CONTENT)], engine)
+        assert result["status"] == "done"
+        assert result["files"][0] == {
+            "filename": "other.txt", "status": "success", "pages_done": 3, "pages_total": 3,
+            "chunks": 2, "error": None,
+        }
+        assert result["total_chunks"] == result["stats"]["total_chunks"] == 4
+
+    def test_failed_extraction_keeps_indexed_version(self, upload_env, monkeypatch) -> None:
+        upload_dir, _ = upload_env
+        engine = StudySearch()
+        run_upload([upload("notes.txt", CONTENT)], engine)
+        old_hash = engine.sources["notes.txt"]
+
+        def broken(path: str, content_hash: str | None = None) -> list[Chunk]:
+            report_error("corrupt file")
+            return []
+
+        monkeypatch.setattr(upload_service, "process_file", broken)
+        result = run_upload([upload("notes.txt", CONTENT + b"changed")], engine)
+
+        assert result["files"][0]["status"] == "error"
+        assert result["files"][0]["error"] == "corrupt file"
+        assert engine.sources["notes.txt"] == old_hash
+        assert (upload_dir / "notes.txt").read_bytes() == CONTENT
+        assert [p.name for p in upload_dir.iterdir()] == ["notes.txt"]
+        assert engine.get_stats()["total_chunks"] == 1
+
+    def test_crashed_extraction_fails_only_that_file(self, upload_env, monkeypatch) -> None:
+        upload_dir, _ = upload_env
+        extract = upload_service.process_file
+
+        def crash_on_first(path: str, content_hash: str | None = None) -> list[Chunk]:
+            if os.path.basename(path) == "a.txt":
+                raise RuntimeError("A process in the process pool was terminated abruptly")
+            return extract(path, content_hash)
+
+        monkeypatch.setattr(upload_service, "process_file", crash_on_first)
+        result = run_upload([upload("a.txt", CONTENT), upload("b.txt", CONTENT + b"b")], StudySearch())
+
+        assert result["status"] == "done"
+        assert [f["status"] for f in result["files"]] == ["error", "success"]
+        assert "terminated abruptly" in result["files"][0]["error"]
+        assert [p.name for p in upload_dir.iterdir()] == ["b.txt"]
+        assert list((upload_dir.parent / "staging").iterdir()) == []
+
+    def test_stale_staging_is_cleared(self, upload_env) -> None:
+        upload_dir, _ = upload_env
+        staging = upload_dir.parent / "staging"
+        (staging / "upload-crashed").mkdir(parents=True)
+        (staging / "upload-crashed" / "notes.txt").write_bytes(CONTENT)
+        (upload_dir / ".upload-old").mkdir()
+        (upload_dir / "kept.txt").write_bytes(CONTENT)
+
+        upload_service.clear_staging()
+        assert list(staging.iterdir()) == []
+        assert [p.name for p in upload_dir.iterdir()] == ["kept.txt"]
+
+    def test_back_to_back_uploads_of_one_name(self, upload_env, monkeypatch) -> None:
+        upload_dir, calls = upload_env
+        v1, v2 = CONTENT, CONTENT + b"Revised."
+        first_started, release_first = threading.Event(), threading.Event()
+        extract = upload_service.process_file
+
+        def slow_first(path: str, content_hash: str | None = None) -> list[Chunk]:
+            with open(path, "rb") as f:
+                if f.read() == v1:
+                    first_started.set()
+                    release_first.wait(10)
+            return extract(path, content_hash)
+
+        monkeypatch.setattr(upload_service, "process_file", slow_first)
+        engine = StudySearch()
+        first = asyncio.run(upload_service.handle_upload([upload("notes.txt", v1)], engine))
+        assert first_started.wait(10)
+        second = run_upload([upload("notes.txt", v2)], engine)
+        release_first.set()
+        assert get_job(first["job_id"]).wait(10)
+
+        # Each job extracted its own bytes under their own hash
+        assert all(read == cached for _, read, cached in calls)
+        assert second["files"][0]["status"] == "success"
+        assert upload_service.get_upload_job(first["job_id"])["files"][0]["status"] == "superseded"
+        assert (upload_dir / "notes.txt").read_bytes() == v2
+        assert engine.sources["notes.txt"] == hashlib.sha256(v2).hexdigest()
+        assert engine.get_stats()["total_chunks"] == 1
+        assert engine.chunks[-1]["content"].endswith("Revised.")
+        assert [p.name for p in upload_dir.iterdir()] == ["notes.txt"]
+
+    def test_unknown_job_is_404(self) -> None:
+        from app.core.errors import AppError
+
+        with pytest.raises(AppError) as exc:
+            upload_service.get_upload_job("missing")
+        assert exc.value.status_code == 404
+
+    def test_event_stream_ends_with_done(self, upload_env) -> None:
+        async def collect() -> list[str]:
+            job = await upload_service.handle_upload([upload("notes.txt", CONTENT)], StudySearch())
+            return [event async for event in upload_service.upload_job_events(job["job_id"])]
+
+        events = asyncio.run(collect())
+        assert '"type": "done"' in events[-1]
+        assert '"status": "success"' in events[-1]
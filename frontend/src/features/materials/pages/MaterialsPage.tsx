@@ -5,9 +5,9 @@ import CategoryIcon from '@mui/icons-material/Category'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import UploadPanel from '../components/UploadPanel'
 import SearchPanel from '../components/SearchPanel'
-import { uploadFiles } from '../../../lib/api/upload'
+import { uploadFiles, waitForUploadJob } from '../../../lib/api/upload'
 import { getTopics } from '../../../lib/api/topics'
-import type { TopicsResponse, UploadResult } from '../../../shared/types'
+import type { TopicsResponse, UploadJob } from '../../../shared/types'
 import { useToast } from '../../../shared/ui/ToastProvider'
 
 interface Props {
@@ -16,26 +16,30 @@ interface Props {
 
 export default function MaterialsPage({ onUploadComplete }: Props) {
   const [uploading, setUploading] = useState(false)
-  const [result, setResult] = useState<UploadResult | null>(null)
+  const [result, setResult] = useState<UploadJob | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [topics, setTopics] = useState<TopicsResponse | null>(null)
   const toast = useToast()
 
   useEffect(() => {
     getTopics().then(setTopics).catch(() => {})
-  }, [result])
+  }, [result?.status])
 
   const handleUpload = async (files: File[]) => {
     setUploading(true)
     setError(null)
     setResult(null)
     try {
-      const res = await uploadFiles(files)
-      setResult(res)
+      const queued = await uploadFiles(files)
+      setResult(queued)
+      const res = await waitForUploadJob(queued.job_id, setResult)
+      if (res.status === 'failed') {
+        throw new Error(res.error || 'Processing failed')
+      }
       onUploadComplete?.()
       toast({
         severity: 'success',
-        message: `Processed ${res.files_processed?.length ?? 0} file${(res.files_processed?.length ?? 0) !== 1 ? 's' : ''}.`,
+        message: `Processed ${res.files.length} file${res.files.length !== 1 ? 's' : ''}.`,
       })
     } catch (err) {
       const msg = err instanceof Error ? err.message : 'Upload failed'
@@ -73,27 +77,29 @@ export default function MaterialsPage({ onUploadComplete }: Props) {
             <SearchPanel />
           </Box>
 
-          {result && (
+          {result?.status === 'done' && (
             <Alert severity="success" icon={<CheckCircleIcon />} sx={{ borderRadius: '12px' }}>
-              <Typography variant="body2" sx={{ fontWeight: 600 }}>Processed {result.files_processed?.length ?? 0} file(s)</Typography>
+              <Typography variant="body2" sx={{ fontWeight: 600 }}>Processed {result.files.length} file(s)</Typography>
               <Typography variant="caption" sx={{ color: '#166534' }}>{result.total_chunks} chunks created and indexed</Typography>
             </Alert>
           )}
           {error && <Alert severity="error" sx={{ borderRadius: '12px' }}>{error}</Alert>}
 
-          {result?.files_processed?.length ? (
+          {result?.files.length ? (
             <Paper elevation={0} sx={{ border: '1px solid #e2e8f0', borderRadius: '12px', overflow: 'hidden', boxShadow: '0 1px 3px rgba(15,23,42,0.04)' }}>
               <Box className="px-4 py-3 flex items-center gap-2" sx={{ bgcolor: '#f8fafc' }}>
                 <Typography variant="body2" sx={{ fontWeight: 600, color: '#334155' }}>Processing Details</Typography>
               </Box>
               <Divider />
               <Box className="p-4 flex flex-col gap-2">
-                {result.files_processed.map((file, i) => {
+                {result.files.map((file, i) => {
                   const status = file.status?.toLowerCase() ?? 'unknown'
                   const isOk = status.includes('ok') || status.includes('success') || status.includes('processed')
-                  const color = isOk ? '#16a34a' : status.includes('skip') ? '#f59e0b' : '#dc2626'
-                  const bg = isOk ? '#f0fdf4' : status.includes('skip') ? '#fffbeb' : '#fef2f2'
-                  const border = isOk ? '#bbf7d0' : status.includes('skip') ? '#fde68a' : '#fecaca'
+                  const isPending = status === 'queued' || status === 'processing'
+                  const isSkip = status.includes('skip') || status === 'unchanged'
+                  const color = isOk ? '#16a34a' : isPending ? '#2563eb' : isSkip ? '#f59e0b' : '#dc2626'
+                  const bg = isOk ? '#f0fdf4' : isPending ? '#eff6ff' : isSkip ? '#fffbeb' : '#fef2f2'
+                  const border = isOk ? '#bbf7d0' : isPending ? '#bfdbfe' : isSkip ? '#fde68a' : '#fecaca'
                   return (
                     <Box key={i} className="flex items-center gap-2">
                       <Typography variant="body2" sx={{ fontSize: '0.85rem', color: '#334155', flex: 1 }}>
@@ -105,7 +111,9 @@ export default function MaterialsPage({ onUploadComplete }: Props) {
                         sx={{ height: 22, fontSize: '0.65rem', bgcolor: bg, color, border: `1px solid ${border}` }}
                       />
                       <Typography variant="caption" sx={{ color: '#94a3b8', fontSize: '0.65rem' }}>
-                        {file.chunks} chunks
+                        {file.pages_total > 0 && status === 'processing'
+                          ? `${file.pages_done}/${file.pages_total} pages`
+                          : file.error ?? `${file.chunks} chunks`}
                       </Typography>
                     </Box>
                   )
@@ -1,10 +1,28 @@
 import { http } from '../http/client'
-import type { UploadResult } from '../../shared/types'
+import type { UploadJob } from '../../shared/types'
 
-export function uploadFiles(files: File[]): Promise<UploadResult> {
+export function uploadFiles(files: File[]): Promise<UploadJob> {
   const formData = new FormData()
   for (const file of files) {
     formData.append('files', file)
   }
-  return http.post<UploadResult>('/upload', formData)
+  return http.post<UploadJob>('/upload', formData)
+}
+
+export function getUploadJob(jobId: string): Promise<UploadJob> {
+  return http.get<UploadJob>(`/upload/jobs/${encodeURIComponent(jobId)}`)
+}
+
+/** Poll an ingestion job until it finishes, reporting each update. */
+export async function waitForUploadJob(
+  jobId: string,
+  onUpdate?: (job: UploadJob) => void,
+  intervalMs = 1000,
+): Promise<UploadJob> {
+  for (;;) {
+    const job = await getUploadJob(jobId)
+    onUpdate?.(job)
+    if (job.status === 'done' || job.status === 'failed') return job
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
 }
@@ -56,10 +56,22 @@ export interface TopicsResponse {
   stats: MaterialStats
 }
 
-export interface UploadResult {
-  files_processed: { filename: string; status: string; chunks: number }[]
+export interface UploadFileProgress {
+  filename: string
+  status: string
+  chunks: number
+  pages_done: number
+  pages_total: number
+  error: string | null
+}
+
+export interface UploadJob {
+  job_id: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  files: UploadFileProgress[]
   total_chunks: number
-  stats: MaterialStats
+  stats: MaterialStats | null
+  error: string | null
 }
 
 export interface QuizSubmission {
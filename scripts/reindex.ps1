@@ -1,18 +1,25 @@
 # Re-process all uploaded files and rebuild the search index.
+# Usage: scripts\reindex.ps1 [-Jobs N]   (N worker processes, 0 = one per CPU)
+param([int]$Jobs = 1)
+
 $ErrorActionPreference = "Stop"
 
 Push-Location "$PSScriptRoot\..\backend"
 & venv\Scripts\Activate.ps1
 
 python -c @"
-from app.retrieval.processor import process_directory, save_chunks
-from app.settings import UPLOAD_DIR, CHUNKS_PATH
+from app.retrieval.index.store import persist_index
+from app.retrieval.processor import directory_sources, process_directory, save_chunks
+from app.settings import UPLOAD_DIR, CHUNKS_PATH, SEARCH_INDEX_PATH
+from dataclasses import asdict
 import os
 
 os.makedirs(str(CHUNKS_PATH.parent), exist_ok=True)
-chunks = process_directory(str(UPLOAD_DIR))
+chunks = process_directory(str(UPLOAD_DIR), jobs=$Jobs)
 if chunks:
     save_chunks(chunks, str(CHUNKS_PATH))
+    persist_index([asdict(c) for c in chunks], str(CHUNKS_PATH), str(SEARCH_INDEX_PATH),
+                  sources=directory_sources(str(UPLOAD_DIR)))
     print(f'Done: {len(chunks)} chunks indexed')
 else:
     print('No files found in uploads directory')
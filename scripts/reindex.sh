@@ -1,19 +1,34 @@
 #!/usr/bin/env bash
 # Re-process all uploaded files and rebuild the search index.
+# Usage: scripts/reindex.sh [--jobs N]   (N worker processes, 0 = one per CPU)
 set -euo pipefail
 
+JOBS=1
+while [[ $# -gt 0 ]]; do
+  case "$1" in
+    -j|--jobs) JOBS="$2"; shift 2 ;;
+    --jobs=*) JOBS="${1#*=}"; shift ;;
+    *) echo "Usage: $0 [--jobs N]" >&2; exit 1 ;;
+  esac
+done
+[[ "$JOBS" =~ ^[0-9]+$ ]] || { echo "--jobs expects a number" >&2; exit 1; }
+
 cd "$(dirname "$0")/../backend"
 source venv/bin/activate 2>/dev/null || source venv/Scripts/activate 2>/dev/null
 
 python -c "
-from app.retrieval.processor import process_directory, save_chunks
-from app.settings import UPLOAD_DIR, CHUNKS_PATH
+from app.retrieval.index.store import persist_index
+from app.retrieval.processor import directory_sources, process_directory, save_chunks
+from app.settings import UPLOAD_DIR, CHUNKS_PATH, SEARCH_INDEX_PATH
+from dataclasses import asdict
 import os
 
 os.makedirs(str(CHUNKS_PATH.parent), exist_ok=True)
-chunks = process_directory(str(UPLOAD_DIR))
+chunks = process_directory(str(UPLOAD_DIR), jobs=$JOBS)
 if chunks:
     save_chunks(chunks, str(CHUNKS_PATH))
+    persist_index([asdict(c) for c in chunks], str(CHUNKS_PATH), str(SEARCH_INDEX_PATH),
+                  sources=directory_sources(str(UPLOAD_DIR)))
     print(f'Done: {len(chunks)} chunks indexed')
 else:
     print('No files found in uploads directory')